@@ -0,0 +1,175 @@
+# 异步信号流水线 - 排行榜、实时估值、历史净值的下载相互重叠，打分放到工作池，输出同 check_signals
+import asyncio
+import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, List
+import pandas as pd
+from data_fetcher import fetch_fund_data, fetch_fund_rankings, RealtimeEstimationClient
+from monitor import analyze_fund_safe, load_holdings_info
+from strategy import select_best_funds
+
+# 每日海选的排行榜类型 (同 monitor.py)
+RANKING_CATEGORIES = ("股票型", "指数型", "混合型")
+
+
+class AsyncSignalPipeline:
+    """
+    异步信号流水线
+
+    顺序版本 (排行榜 -> 观察列表 -> 逐只历史净值 -> 实时估值 -> 打分) 的大部分时间在等网络，
+    这里把各阶段拆成按基金的任务:
+      1. 持仓基金和固定列表立即开始拉取历史净值和实时估值
+      2. 三个排行榜并发下载，每个下载完成后其入选基金立即加入 (不等其他排行榜)
+      3. 历史净值在信号量限制下并发拉取，每批新基金的实时估值作为一个请求批次
+      4. 某只基金的历史和估值都到齐后即在工作池中打分 (CPU密集，不阻塞事件循环)
+    """
+
+    def __init__(self, held_info: Dict = None, fund_list: Iterable[str] = (),
+                 categories: Iterable[str] = RANKING_CATEGORIES, top_n: int = 15,
+                 max_concurrency: int = 8, history_days: int = 365,
+                 client: RealtimeEstimationClient = None, use_processes: bool = False):
+        """
+        Args:
+            held_info: 持仓信息 {code: {cost: ...}}，默认读取 load_holdings_info()
+            fund_list: 固定观察的基金 (除持仓和排行榜之外)
+            categories: 海选的排行榜类型，为空时不拉取排行榜
+            top_n: 每个排行榜选出的基金数
+            max_concurrency: 同时拉取历史净值的最大数量
+            history_days: 打分使用的历史天数
+            client: 实时估值客户端，默认新建并在结束时释放
+            use_processes: 打分使用进程池 (基金很多时更快)
+        """
+        self.held_info = load_holdings_info() if held_info is None else held_info
+        self.fund_list = list(fund_list)
+        self.categories = list(categories)
+        self.top_n = top_n
+        self.max_concurrency = max_concurrency
+        self.history_days = history_days
+        self.client = client
+        self.use_processes = use_processes
+
+        self.watch_list: List[str] = []
+        self.timings: Dict[str, float] = {}   # 各阶段从开始到完成的时间 (秒)
+
+    # ---------- 单个阶段 ----------
+
+    async def _ranking(self, category: str) -> List[str]:
+        """下载一个排行榜并选出前 top_n 只"""
+        loop = asyncio.get_running_loop()
+        try:
+            rankings = await loop.run_in_executor(self._io_pool, fetch_fund_rankings, category)
+            codes = select_best_funds(rankings, top_n=self.top_n)['基金代码'].tolist()
+        except Exception as e:
+            print(f"⚠️ 获取 {category} 排行榜出错: {e}")
+            codes = []
+        self._mark(f"ranking:{category}")
+        return codes
+
+    async def _realtime(self, codes: List[str]) -> Dict[str, Dict]:
+        """一批基金的实时估值 {code: rt_row}"""
+        loop = asyncio.get_running_loop()
+        try:
+            rt_df = await loop.run_in_executor(self._io_pool, self._client.fetch, codes)
+        except Exception as e:
+            print(f"⚠️ 获取实时估值出错: {e}")
+            return {}
+        self._mark("realtime")
+        rows = {}
+        for row in (rt_df.to_dict(orient='records') if not rt_df.empty else []):
+            rows.setdefault(row['基金代码'], row)
+        return rows
+
+    async def _score(self, code: str, realtime: asyncio.Task):
+        """拉取历史净值，等待所在批次的估值，然后在工作池中打分"""
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            df = await loop.run_in_executor(self._io_pool, fetch_fund_data,
+                                            code, self._start, self._end)
+        self._mark("history")
+        rt_rows = await realtime
+        try:
+            row, error = await loop.run_in_executor(
+                self._score_pool, analyze_fund_safe, code, df, rt_rows.get(code), self.held_info)
+        except Exception as e:
+            row, error = None, e
+        if error is not None:
+            print(f"解析 {code} 出错: {error}")
+        self._mark("score")
+        return row
+
+    def _mark(self, stage: str):
+        self.timings[stage] = time.perf_counter() - self._started
+
+    def _add_funds(self, codes: Iterable[str]):
+        """新基金: 一个实时估值批次 + 每只基金一个打分任务"""
+        new = [code for code in dict.fromkeys(codes) if code not in self._tasks]
+        if not new:
+            return
+        realtime = asyncio.ensure_future(self._realtime(new))
+        for code in new:
+            self._tasks[code] = asyncio.ensure_future(self._score(code, realtime))
+
+    # ---------- 运行 ----------
+
+    async def run(self) -> pd.DataFrame:
+        """
+        运行流水线
+
+        Returns:
+            信号 DataFrame (格式同 check_signals)，顺序: 持仓、固定列表、各排行榜 (按 categories 顺序)
+        """
+        self._started = time.perf_counter()
+        today = datetime.date.today()
+        self._end = today.strftime('%Y-%m-%d')
+        self._start = (today - datetime.timedelta(days=self.history_days)).strftime('%Y-%m-%d')
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tasks: Dict[str, asyncio.Future] = {}
+        # IO线程: 历史净值 (受信号量限制) + 排行榜 + 估值批次
+        self._io_pool = ThreadPoolExecutor(max_workers=self.max_concurrency + len(self.categories) + 2,
+                                           thread_name_prefix="pipeline-io")
+        executor_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+        self._score_pool = executor_cls(max_workers=self.max_concurrency)
+        owns_client = self.client is None
+        self._client = self.client or RealtimeEstimationClient(max_workers=self.max_concurrency)
+
+        rankings: Dict[str, asyncio.Future] = {}
+        try:
+            fixed = list(self.held_info) + self.fund_list
+            self._add_funds(fixed)
+
+            rankings = {category: asyncio.ensure_future(self._ranking(category))
+                        for category in self.categories}
+            for finished in asyncio.as_completed(list(rankings.values())):
+                self._add_funds(await finished)
+
+            self.watch_list = list(dict.fromkeys(
+                fixed + [code for task in rankings.values() for code in task.result()]))
+            print(f"海选完成：共有 {len(self.watch_list)} 只基金进入深度分析池。")
+
+            rows = dict(zip(self._tasks, await asyncio.gather(*self._tasks.values())))
+        finally:
+            # 出错退出时取消尚未完成的任务；排队中的下载直接取消，正在进行的下载等其结束
+            for task in [*rankings.values(), *self._tasks.values()]:
+                task.cancel()
+            self._io_pool.shutdown(wait=True, cancel_futures=True)
+            self._score_pool.shutdown(wait=True, cancel_futures=True)
+            if owns_client:
+                self._client.close()
+
+        self.timings['total'] = time.perf_counter() - self._started
+        return pd.DataFrame([rows[code] for code in self.watch_list if rows.get(code) is not None])
+
+
+async def check_signals_async(held_info: Dict = None, fund_list: Iterable[str] = (),
+                              **kwargs) -> pd.DataFrame:
+    """异步版本的每日海选 + check_signals (参数见 AsyncSignalPipeline)"""
+    return await AsyncSignalPipeline(held_info, fund_list, **kwargs).run()
+
+
+if __name__ == "__main__":
+    pipeline = AsyncSignalPipeline()
+    signals = asyncio.run(pipeline.run())
+    print(signals.to_string(index=False))
+    for stage, seconds in pipeline.timings.items():
+        print(f"{stage}: {seconds:.2f}s")
@@ -1,26 +1,43 @@
 # 自动化交易智能体 - 主程序
 import datetime
 import json
+from contextlib import nullcontext
 from typing import Dict, List
 from virtual_trading import VirtualTradingEngine, TradeSignal
 from strategy_evolution import AdaptiveStrategyOptimizer
 from scheduler import DailyScheduler, schedule_monitor_task
+from trading_session import TradingSession
 
 
 class AutoTradingAgent:
     """自动化交易智能体"""
     
-    def __init__(self, initial_cash: float = 100000):
+    def __init__(self, initial_cash: float = 100000, engine: VirtualTradingEngine = None,
+                 optimizer: AdaptiveStrategyOptimizer = None, clock=None, timer=None,
+                 session: TradingSession = None):
         """
         初始化智能体
         
         Args:
             initial_cash: 初始资金
+            engine: 虚拟交易引擎，默认按配置新建
+            optimizer: 策略优化器，默认新建并与智能体共用同一个引擎
+            clock: 时钟 (回放时为模拟时钟)，默认系统时间
+            timer: 分阶段计时器 (需提供 stage(name) 上下文)，用于回放时分析耗时
+            session: 交易会话，传入时忽略 engine/optimizer/clock，使用会话中的共享实例
         """
-        self.engine = VirtualTradingEngine(initial_cash)
-        self.optimizer = AdaptiveStrategyOptimizer()
+        self.session = session or TradingSession(initial_cash, engine=engine,
+                                                 optimizer=optimizer, clock=clock)
+        self.clock = self.session.clock
+        self.engine = self.session.engine
+        self.optimizer = self.session.optimizer
         self.scheduler = DailyScheduler()
         self.signal_log = "agent_signals.json"
+        self.timer = timer
+    
+    def _stage(self, name: str):
+        """计时阶段 (未设置计时器时不计时)"""
+        return self.timer.stage(name) if self.timer is not None else nullcontext()
     
     def on_monitor_completion(self, monitor_results: Dict) -> Dict:
         """
@@ -47,33 +64,34 @@ class AutoTradingAgent:
         Returns:
             包含处理结果的字典
         """
-        signal_date = monitor_results.get('date', 
-                                         datetime.date.today().strftime('%Y-%m-%d'))
+        signal_date = monitor_results.get('date', self.clock.today_str())
         
         # 1. 处理从monitor获得的信号
         processed_signals = []
         
-        for signal_data in monitor_results.get('signals', []):
-            # 创建TradeSignal对象
-            signal = TradeSignal(
-                date=signal_date,
-                fund_code=signal_data['fund_code'],
-                fund_name=signal_data.get('fund_name', ''),
-                signal_type=signal_data['signal'].upper(),  # BUY/SELL/HOLD
-                signal_score=signal_data.get('score', 0),
-                nav_price=signal_data.get('current_price', 0),
-                suggested_amount=signal_data.get('suggested_amount', 0),
-                reason=signal_data.get('reason', '')
-            )
+        # 当日信号整批写入，只落盘一次
+        with self._stage('ingest'), self.engine.batch():
+            for signal_data in monitor_results.get('signals', []):
+                # 创建TradeSignal对象
+                signal = TradeSignal(
+                    date=signal_date,
+                    fund_code=signal_data['fund_code'],
+                    fund_name=signal_data.get('fund_name', ''),
+                    signal_type=signal_data['signal'].upper(),  # BUY/SELL/HOLD
+                    signal_score=signal_data.get('score', 0),
+                    nav_price=signal_data.get('current_price', 0),
+                    suggested_amount=signal_data.get('suggested_amount', 0),
+                    reason=signal_data.get('reason', '')
+                )
             
-            # 添加到虚拟引擎
-            self.engine.add_signal(signal)
-            processed_signals.append({
-                'code': signal.fund_code,
-                'type': signal.signal_type,
-                'score': signal.signal_score,
-                'amount': signal.suggested_amount
-            })
+                # 添加到虚拟引擎
+                self.engine.add_signal(signal)
+                processed_signals.append({
+                    'code': signal.fund_code,
+                    'type': signal.signal_type,
+                    'score': signal.signal_score,
+                    'amount': signal.suggested_amount
+                })
         
         # 2. 执行虚拟交易
         # 这一步通常在第二天执行，因为今天生成的信号，明天才能真正成交
@@ -82,10 +100,12 @@ class AutoTradingAgent:
         current_prices = self._extract_prices(monitor_results)
         
         # 4. 运行策略优化
-        optimization_result = self.optimizer.run_daily_optimization(current_prices)
+        with self._stage('optimize'):
+            optimization_result = self.optimizer.run_daily_optimization(current_prices, signal_date)
         
         # 5. 获取性能仪表板
-        dashboard = self.optimizer.get_performance_dashboard(current_prices)
+        with self._stage('dashboard'):
+            dashboard = self.optimizer.get_performance_dashboard(current_prices)
         
         return {
             'status': 'success',
@@ -97,7 +117,7 @@ class AutoTradingAgent:
         }
     
     def _extract_prices(self, monitor_results: Dict) -> Dict[str, float]:
-        """从monitor结果中提取基金价格"""
+        """从monitor结果中提取基金价格 (显式给出的 'prices' 字段优先)"""
         prices = {}
         
         for signal in monitor_results.get('signals', []):
@@ -106,6 +126,7 @@ class AutoTradingAgent:
             if price > 0:
                 prices[code] = price
         
+        prices.update(monitor_results.get('prices', {}))
         return prices
     
     def _generate_actions(self, dashboard: Dict) -> List[str]:
@@ -134,13 +155,15 @@ class AutoTradingAgent:
         
         return actions
     
-    def execute_pending_signals(self, execution_prices: Dict[str, float]) -> Dict:
+    def execute_pending_signals(self, execution_prices: Dict[str, float],
+                                execution_date: str = None) -> Dict:
         """
         执行待执行的交易信号
         这通常在第二天调用，执行昨天生成的信号
         
         Args:
             execution_prices: 成交价格
+            execution_date: 成交日期，默认时钟的今天 (补跑错过的交易日时为该日)
             
         Returns:
             执行结果
@@ -148,15 +171,16 @@ class AutoTradingAgent:
         executed = []
         failed = []
         
-        for signal in self.engine.signals_history:
-            if not signal.execution_date:  # 未执行的信号
+        execution_date = execution_date or self.clock.today_str()
+        with self._stage('execute'), self.engine.batch():
+            for signal in self.engine.get_pending_signals():  # 未执行的信号
                 if signal.fund_code in execution_prices:
                     success = self.engine.execute_signal(
                         signal,
-                        execution_date=datetime.date.today().strftime('%Y-%m-%d'),
+                        execution_date=execution_date,
                         execution_price=execution_prices[signal.fund_code]
                     )
-                    
+                
                     if success:
                         executed.append({
                             'code': signal.fund_code,
@@ -178,7 +202,7 @@ class AutoTradingAgent:
         dashboard = self.optimizer.get_performance_dashboard(current_prices)
         
         return {
-            'date': datetime.datetime.now().isoformat(),
+            'date': self.clock.now().isoformat(),
             'performance': dashboard['metrics'],
             'current_holdings': self.engine.current_holdings,
             'cash': self.engine.current_cash,
@@ -191,19 +215,24 @@ class AutoTradingAgent:
         self.scheduler.schedule_daily_job(
             job_name="每日14:30 策略执行",
             time_str="14:30",
-            job_func=self.run_daily_cycle
+            job_func=self.run_daily_cycle,
+            overlap="skip",
+            catch_up=True
         )
         
         # 安排每天15:00执行虚拟成交（模拟第二天的成交价）
         self.scheduler.schedule_daily_job(
             job_name="虚拟交易执行",
             time_str="15:00",
-            job_func=self.execute_daily_trades
+            job_func=self.execute_daily_trades,
+            overlap="queue",    # 成交不能跳过，上次未完成时排队
+            catch_up=True       # 停机期间错过的交易日重启后按顺序补跑
         )
     
-    def run_daily_cycle(self) -> Dict:
+    def run_daily_cycle(self, run_date: datetime.date = None) -> Dict:
         """运行每日周期（需要与你的monitor整合）"""
-        print(f"[{datetime.datetime.now()}] 开始每日循环...")
+        run_date = run_date or self.clock.today()
+        print(f"[{datetime.datetime.now()}] 开始每日循环 ({run_date})...")
         
         # 这里需要调用你的monitor函数获取结果
         # 示例：
@@ -217,21 +246,23 @@ class AutoTradingAgent:
             'message': '需要集成实际的monitor函数'
         }
     
-    def execute_daily_trades(self) -> Dict:
+    def execute_daily_trades(self, run_date: datetime.date = None) -> Dict:
         """执行每日交易"""
-        print(f"[{datetime.datetime.now()}] 执行虚拟交易...")
+        run_date = run_date or self.clock.today()
+        print(f"[{datetime.datetime.now()}] 执行虚拟交易 ({run_date})...")
         
         # 这里执行前一天生成的信号
-        # execution_prices需要从实际数据获取
+        # execution_prices需要从实际数据获取 (补跑时应取 run_date 当日的净值)
         execution_prices = {}
         
-        return self.execute_pending_signals(execution_prices)
+        return self.execute_pending_signals(execution_prices, run_date.strftime('%Y-%m-%d'))
 
 
 # 集成脚本 - 将此代码添加到你的main.py中
-def create_auto_agent(initial_cash: float = 100000) -> AutoTradingAgent:
-    """创建自动化交易智能体"""
-    return AutoTradingAgent(initial_cash)
+def create_auto_agent(initial_cash: float = 100000,
+                      session: TradingSession = None) -> AutoTradingAgent:
+    """创建自动化交易智能体 (传入 session 时与其他组件共享引擎)"""
+    return AutoTradingAgent(initial_cash, session=session)
 
 
 def integrate_with_monitor(agent: AutoTradingAgent, monitor_results: Dict):
@@ -1,32 +1,212 @@
 # 回测系统框架
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+import numpy as np
 import pandas as pd
-from strategy import simple_dca_strategy, ma_timing_strategy, calculate_rsi
+from strategy import simple_dca_strategy, ma_timing_strategy, rsi_timing_strategy
 from data_fetcher import fetch_fund_data
+from config import Config
 
-def run_backtest(fund_code: str, start: str, end: str, invest_amount: float, strategy_type: str = 'simple'):
-    fund_data = fetch_fund_data(fund_code, start, end)
-    
+# 每种策略使用的参数 (参数扫描时只对这些参数做组合，避免重复计算)
+STRATEGY_PARAMS = {
+    'simple': ('invest_amount',),
+    'ma': ('invest_amount', 'ma_window'),
+    'rsi_low': ('invest_amount', 'rsi_window', 'rsi_oversold'),
+}
+
+TRADING_DAYS_PER_YEAR = 250
+
+
+def run_strategy(fund_data: pd.DataFrame, strategy_type: str, params: Dict) -> pd.DataFrame:
+    """
+    按策略类型运行回测
+
+    Args:
+        fund_data: 包含 date, nav 的DataFrame
+        strategy_type: 'simple' / 'ma' / 'rsi_low'
+        params: 策略参数，缺省项取 Config.DEFAULT_STRATEGY_PARAMS
+    """
+    p = {**Config.DEFAULT_STRATEGY_PARAMS, **params}
     if strategy_type == 'simple':
-        results = simple_dca_strategy(fund_data, invest_amount)
+        return simple_dca_strategy(fund_data, p['invest_amount'])
     elif strategy_type == 'ma':
-        results = ma_timing_strategy(fund_data, invest_amount)
+        return ma_timing_strategy(fund_data, p['invest_amount'], ma_window=int(p['ma_window']))
     elif strategy_type == 'rsi_low':
-        # 示例：RSI < 30 时买入
-        fund_data = calculate_rsi(fund_data)
-        # 简单改写逻辑：这里只是演示，可以根据需要扩展
-        print("RSI 策略回测逻辑触发（示例）")
-        results = ma_timing_strategy(fund_data, invest_amount) # 暂时复用框架
-    else:
-        print(f"未知策略类型: {strategy_type}")
+        # RSI < 超卖点时买入
+        return rsi_timing_strategy(fund_data, p['invest_amount'],
+                                   rsi_window=int(p['rsi_window']),
+                                   rsi_oversold=p['rsi_oversold'])
+    raise ValueError(f"未知策略类型: {strategy_type}")
+
+
+def summarize_backtest(results: pd.DataFrame) -> Dict:
+    """
+    汇总回测结果
+
+    收益率按资金流调整 (扣除当日新增投入) 计算日收益，
+    再由日收益得到年化波动率和最大回撤
+    """
+    if results is None or results.empty:
+        return {}
+    return summarize_arrays(results['total_invest'].to_numpy(dtype=float),
+                            results['market_value'].to_numpy(dtype=float))
+
+
+def summarize_arrays(invest: np.ndarray, value: np.ndarray) -> Dict:
+    """
+    由累计投入和市值序列计算回测指标 (summarize_backtest 的数组版本)
+
+    Args:
+        invest: 每日累计投入
+        value: 每日市值 (含卖出后留存的现金)
+    """
+    if len(value) == 0:
+        return {}
+    prev_value = value[:-1]
+    inflow = np.diff(invest)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily = np.where(prev_value > 0, (value[1:] - inflow) / prev_value - 1, 0.0)
+    growth = np.cumprod(1 + daily)
+    peak = np.maximum.accumulate(np.concatenate([[1.0], growth]))[1:]
+    drawdown = 1 - growth / peak if len(growth) else np.zeros(0)
+    std = float(np.std(daily)) if len(daily) else 0.0
+
+    return {
+        'total_invest': invest[-1],
+        'final_value': value[-1],
+        'total_return': (value[-1] - invest[-1]) / invest[-1] if invest[-1] > 0 else 0.0,
+        'volatility': std * np.sqrt(TRADING_DAYS_PER_YEAR),
+        'sharpe': float(np.mean(daily) / std * np.sqrt(TRADING_DAYS_PER_YEAR)) if std > 0 else 0.0,
+        'max_drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+        'days': len(value),
+    }
+
+
+def run_backtest(fund_code: str, start: str, end: str, invest_amount: float,
+                 strategy_type: str = 'simple', params: Dict = None,
+                 fund_data: pd.DataFrame = None):
+    """
+    单只基金、单个策略的回测
+    传入 fund_data 时直接使用，不再重新拉取净值
+    """
+    if fund_data is None:
+        fund_data = fetch_fund_data(fund_code, start, end)
+
+    try:
+        results = run_strategy(fund_data, strategy_type,
+                               {**(params or {}), 'invest_amount': invest_amount})
+    except ValueError as e:
+        print(e)
         return
 
     # print(results)
     # 可根据需要输出收益率等汇总信息
     if not results.empty:
+        summary = summarize_backtest(results)
         print(f"策略类型: {strategy_type}")
-        print(f"累计投入: {results['total_invest'].iloc[-1]:.2f}")
-        print(f"期末市值: {results['market_value'].iloc[-1]:.2f}")
-        print(f"总收益率: {results['return'].iloc[-1]*100:.2f}%")
+        print(f"累计投入: {summary['total_invest']:.2f}")
+        print(f"期末市值: {summary['final_value']:.2f}")
+        print(f"总收益率: {summary['total_return']*100:.2f}%")
+        return summary
+
+
+# ==========================================
+# 参数扫描 (基金 × 策略 × 参数 网格)
+# ==========================================
+
+# 工作进程中只读共享的净值数据 {code: (dates, navs)}
+_SWEEP_NAV: Dict[str, tuple] = {}
+
+
+def _init_sweep_worker(nav_arrays: Dict[str, tuple]):
+    """工作进程初始化：每个进程只接收一次净值数组 (fork时直接共享父进程内存)"""
+    global _SWEEP_NAV
+    _SWEEP_NAV = nav_arrays
+
+
+def _run_sweep_task(task: tuple) -> Dict:
+    """执行一个 (基金, 策略, 参数) 组合"""
+    fund_code, strategy_type, params = task
+    dates, navs = _SWEEP_NAV[fund_code]
+    row = {'fund_code': fund_code, 'strategy': strategy_type, **params}
+    try:
+        fund_data = pd.DataFrame({'date': dates, 'nav': navs})
+        row.update(summarize_backtest(run_strategy(fund_data, strategy_type, params)))
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+def build_sweep_tasks(fund_codes: List[str], strategies: List[str], param_grid: Dict[str, list]) -> List[tuple]:
+    """
+    展开参数网格，每个策略只组合它实际用到的参数
+    """
+    grid = {k: [v] for k, v in Config.DEFAULT_STRATEGY_PARAMS.items()}
+    grid.setdefault('invest_amount', [1000.0])
+    grid.update({k: list(v) for k, v in (param_grid or {}).items()})
+
+    tasks = []
+    for strategy_type in strategies:
+        keys = STRATEGY_PARAMS[strategy_type]
+        for values in itertools.product(*(grid[k] for k in keys)):
+            params = dict(zip(keys, values))
+            for code in fund_codes:
+                tasks.append((code, strategy_type, params))
+    return tasks
+
+
+def run_parameter_sweep(fund_codes: List[str], start: str, end: str,
+                        strategies: List[str] = ('simple', 'ma', 'rsi_low'),
+                        param_grid: Dict[str, list] = None,
+                        max_workers: int = None,
+                        nav_data: Dict[str, pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    批量参数扫描回测
+
+    Args:
+        fund_codes: 基金代码列表
+        start, end: 回测区间
+        strategies: 参与扫描的策略类型
+        param_grid: 参数网格，如 {'ma_window': [10, 20, 60], 'rsi_oversold': [25, 30, 35],
+                    'invest_amount': [500, 1000]}，未给出的参数使用默认值
+        max_workers: 进程数，默认CPU核数；为1时在当前进程内顺序执行
+        nav_data: 已有的净值数据 {code: DataFrame}，不传则每只基金拉取一次
+
+    Returns:
+        每个 (基金, 策略, 参数) 组合一行的结果表，包含收益率、波动率和最大回撤
+    """
+    # 每只基金只加载一次净值
+    nav_arrays = {}
+    for code in fund_codes:
+        df = nav_data[code] if nav_data is not None else fetch_fund_data(code, start, end)
+        if df is None or df.empty:
+            print(f"⚠️ {code} 无净值数据，跳过")
+            continue
+        df = df.sort_values('date')
+        nav_arrays[code] = (df['date'].to_numpy(), df['nav'].to_numpy(dtype=float))
+
+    tasks = build_sweep_tasks(list(nav_arrays), list(strategies), param_grid)
+    if not tasks:
+        return pd.DataFrame()
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1:
+        _init_sweep_worker(nav_arrays)
+        rows = [_run_sweep_task(t) for t in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker,
+                                 initargs=(nav_arrays,)) as pool:
+            rows = list(pool.map(_run_sweep_task, tasks, chunksize=chunksize))
+
+    # 整理列顺序: 基金、策略、参数、指标
+    result = pd.DataFrame(rows)
+    param_cols = [k for k in dict.fromkeys(k for s in strategies for k in STRATEGY_PARAMS[s])]
+    front = ['fund_code', 'strategy'] + param_cols
+    return result[front + [c for c in result.columns if c not in front]]
+
 
 if __name__ == "__main__":
     fund_code = "513500"  # 纳指100ETF
@@ -0,0 +1,116 @@
+# 策略性能基准 - 向量化定投策略 vs 原逐行循环实现
+import time
+import numpy as np
+import pandas as pd
+from strategy import simple_dca_strategy, ma_timing_strategy
+
+
+def simple_dca_strategy_loop(fund_data: pd.DataFrame, invest_amount: float):
+    """简单定投策略的原逐行循环实现 (作为对照基准)"""
+    fund_data = fund_data.sort_values('date').reset_index(drop=True)
+    shares = []
+    total_shares = 0
+    total_invest = 0
+    market_values = []
+    returns = []
+    for i, row in fund_data.iterrows():
+        nav = row['nav']
+        buy_share = invest_amount / nav
+        total_shares += buy_share
+        total_invest += invest_amount
+        market_value = total_shares * nav
+        ret = (market_value - total_invest) / total_invest if total_invest > 0 else 0
+        shares.append(total_shares)
+        market_values.append(market_value)
+        returns.append(ret)
+    result = fund_data.copy()
+    result['total_shares'] = shares
+    result['total_invest'] = invest_amount * (result.index + 1)
+    result['market_value'] = market_values
+    result['return'] = returns
+    return result
+
+
+def ma_timing_strategy_loop(fund_data: pd.DataFrame, invest_amount: float, ma_window: int = 20):
+    """均线择时定投的原逐行循环实现 (作为对照基准)"""
+    df = fund_data.sort_values('date').copy().reset_index(drop=True)
+    df['ma'] = df['nav'].rolling(window=ma_window).mean()
+    shares_list = []
+    total_shares = 0
+    total_invest_list = []
+    total_invest = 0
+    market_values = []
+    returns = []
+
+    for i, row in df.iterrows():
+        nav = row['nav']
+        ma = row['ma']
+        if not pd.isna(ma) and nav > ma:
+            buy_share = invest_amount / nav
+            total_shares += buy_share
+            total_invest += invest_amount
+
+        current_value = total_shares * nav
+        ret = (current_value - total_invest) / total_invest if total_invest > 0 else 0
+
+        shares_list.append(total_shares)
+        total_invest_list.append(total_invest)
+        market_values.append(current_value)
+        returns.append(ret)
+
+    df['total_shares'] = shares_list
+    df['total_invest'] = total_invest_list
+    df['market_value'] = market_values
+    df['return'] = returns
+    return df
+
+
+def make_nav_history(years: int = 12, seed: int = 42) -> pd.DataFrame:
+    """生成 years 年的模拟日净值 (交易日)"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2026-01-01', periods=years * 250)
+    nav = np.cumprod(1 + rng.normal(0.0003, 0.012, len(dates)))
+    return pd.DataFrame({'date': dates, 'nav': nav})
+
+
+def assert_identical(expected: pd.DataFrame, actual: pd.DataFrame):
+    """逐列比较结果，要求数值完全相同 (只允许整数/浮点类型差异)"""
+    assert list(expected.columns) == list(actual.columns)
+    for col in expected.columns:
+        a = expected[col].to_numpy()
+        b = actual[col].to_numpy()
+        if col == 'date':
+            assert (a == b).all(), col
+        else:
+            assert np.array_equal(a.astype(float), b.astype(float), equal_nan=True), col
+
+
+def _best_of(func, repeat: int = 3) -> float:
+    """多次运行取最短耗时"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run_benchmark(years: int = 12, invest_amount: float = 1000.0):
+    """对比两种实现的耗时并校验结果一致"""
+    data = make_nav_history(years)
+    print(f"模拟数据: {len(data)} 个交易日 (约 {years} 年)")
+    print(f"{'策略':<16} {'循环(ms)':>10} {'向量化(ms)':>12} {'加速比':>8}")
+
+    cases = [
+        ('simple_dca', simple_dca_strategy_loop, simple_dca_strategy),
+        ('ma_timing', ma_timing_strategy_loop, ma_timing_strategy),
+    ]
+    for name, loop_func, vec_func in cases:
+        assert_identical(loop_func(data, invest_amount), vec_func(data, invest_amount))
+        loop_t = _best_of(lambda: loop_func(data, invest_amount))
+        vec_t = _best_of(lambda: vec_func(data, invest_amount))
+        print(f"{name:<16} {loop_t * 1000:>10.1f} {vec_t * 1000:>12.2f} {loop_t / vec_t:>7.0f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,48 @@
+# 时钟 - 实盘使用系统时间，回放时由回放引擎推进的模拟时间
+import datetime
+
+
+class SystemClock:
+    """系统时钟"""
+
+    def today(self) -> datetime.date:
+        return datetime.date.today()
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+    def today_str(self) -> str:
+        """今天的日期 YYYY-MM-DD"""
+        return self.today().strftime('%Y-%m-%d')
+
+
+class SimulatedClock(SystemClock):
+    """模拟时钟: 日期由调用方设置，now() 为该日期的指定时刻 (默认14:30)"""
+
+    def __init__(self, start=None, time_of_day: datetime.time = datetime.time(14, 30)):
+        """
+        Args:
+            start: 起始日期 (date / datetime / 'YYYY-MM-DD')，默认今天
+            time_of_day: now() 返回的时刻
+        """
+        self.time_of_day = time_of_day
+        self._date = datetime.date.today()
+        if start is not None:
+            self.set(start)
+
+    def set(self, date):
+        """设置当前日期"""
+        if isinstance(date, str):
+            date = datetime.date.fromisoformat(date[:10])
+        elif isinstance(date, datetime.datetime):   # 包括 pandas.Timestamp
+            date = date.date()
+        self._date = date
+
+    def advance(self, days: int = 1):
+        self._date += datetime.timedelta(days=days)
+
+    def today(self) -> datetime.date:
+        return self._date
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.combine(self._date, self.time_of_day)
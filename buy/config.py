@@ -7,6 +7,7 @@ class Config:
     
     # 虚拟账户配置
     INITIAL_CASH = 100000  # 初始资金 (¥)
+    LOT_METHOD = "fifo"    # 持仓成本核算方式: "fifo" (先进先出) / "average" (加权平均)
     
     # 策略参数（默认值）
     DEFAULT_STRATEGY_PARAMS = {
@@ -24,15 +25,23 @@ class Config:
     # 定时任务配置
     MONITOR_TIME = "14:30"             # 每日运行时间
     TIMEZONE = "Asia/Shanghai"         # 时区
+    MAX_CATCHUP_DAYS = 10              # 重启后最多补跑最近几个错过的交易日
+    MARKET_CLOSE_TIME = "15:00"        # 收盘时间 (排行榜等日频接口的缓存在此时过期)
+    FETCH_CACHE_STALE_SECONDS = 300    # 缓存过期后仍先返回旧值并后台刷新的时长 (超过后同步下载)
     
     # 数据文件
     DATA_FILES = {
         'signals': 'virtual_signals.json',
         'positions': 'virtual_positions.json',
         'snapshots': 'virtual_snapshots.json',
+        'journal': 'virtual_journal.jsonl',
         'evolution': 'strategy_evolution.json',
         'execution': 'scheduler_execution.json',
+        'scheduler_state': 'scheduler_state.json',
+        'trading_calendar': 'trading_holidays.json',
         'integration': 'integration_report.json',
+        'nav_store': 'fund_nav.db',
+        'fetch_cache': 'fetch_cache',
     }
     
     # 报告配置
@@ -42,6 +51,14 @@ class Config:
     # 风险管理
     MAX_POSITION_SIZE = 0.50          # 单只基金最大持仓比例
     TOTAL_POSITION_LIMIT = 0.90       # 总仓位上限
+    MAX_DRAWDOWN_LIMIT = 0.25         # 回撤警戒线 (历史最大回撤 / 模拟回撤95%分位)
+    
+    # 风险模拟 (块自助法)
+    RISK_SIMULATION_ENABLED = False   # 每日评估附带持仓的模拟VaR/CVaR和回撤分位 (较耗时，按需开启)
+    RISK_HORIZON_DAYS = 60            # 模拟未来交易日数
+    RISK_PATHS = 10000                # 模拟路径数
+    RISK_BLOCK_SIZE = 5               # 每次抽取的连续交易日数 (保留收益的短期相关性)
+    RISK_LOOKBACK_DAYS = 750          # 抽样使用的历史交易日数
     
     # 性能评估
     MIN_WIN_RATE_THRESHOLD = 0.45     # 最低胜率阈值
@@ -116,7 +133,10 @@ class DatabaseConfig:
     # SQLite配置
     DB_TYPE = "sqlite"  # 或 "mysql", "postgresql"
     DB_PATH = "trading_system.db"
-    
+
+    # 虚拟交易状态的存储后端: "json" (JSON快照+日志文件) 或 "sqlite" (DB_PATH)
+    STORAGE_BACKEND = "json"
+
     # MySQL配置 (如果使用)
     # DB_HOST = "localhost"
     # DB_PORT = 3306
@@ -0,0 +1,19 @@
+# 测试公共夹具 - 各模块测试共用的合成净值数据
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _synthetic_nav(seed: int, periods: int = 250) -> pd.DataFrame:
+    """生成测试用的随机游走净值 (截至今天的工作日)"""
+    rng = np.random.default_rng(seed)
+    nav = 1.0 * np.cumprod(1 + rng.normal(0, 0.012, periods))
+    dates = pd.bdate_range(end=pd.Timestamp(datetime.date.today()), periods=periods)
+    return pd.DataFrame({'date': dates, 'nav': nav})
+
+
+@pytest.fixture
+def synthetic_nav():
+    """随机游走净值生成函数: synthetic_nav(seed, periods=250)"""
+    return _synthetic_nav
@@ -168,13 +168,20 @@ def print_evolution_history(evolution_log: str = "strategy_evolution.json", num_
         pass
 
 
-def generate_full_dashboard(current_prices: Dict[str, float] = None):
-    """生成完整仪表板"""
+def generate_full_dashboard(current_prices: Dict[str, float] = None, session=None):
+    """
+    生成完整仪表板
+    
+    Args:
+        current_prices: 当前价格
+        session: 交易会话 (trading_session.TradingSession)，传入时直接使用其中的引擎和进化器，
+                 不再重新加载文件
+    """
     if current_prices is None:
         current_prices = {}
     
     # 加载数据
-    engine = VirtualTradingEngine()
+    engine = session.engine if session is not None else VirtualTradingEngine()
     
     print_header("🤖 自动化交易智能体 - 性能仪表板")
     print(f"更新时间: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -189,8 +196,11 @@ def generate_full_dashboard(current_prices: Dict[str, float] = None):
     print_signal_summary(engine)
     
     # 加载策略参数
-    from strategy_evolution import StrategyEvolver
-    evolver = StrategyEvolver()
+    if session is not None:
+        evolver = session.evolver
+    else:
+        from strategy_evolution import StrategyEvolver
+        evolver = StrategyEvolver()
     current_params = evolver.get_current_params()
     print_strategy_params(current_params)
     
@@ -4,59 +4,168 @@ import akshare as ak
 import requests
 import json
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from nav_store import NavStore, get_nav_store
+from fetch_cache import cached
 
-def fetch_fund_data(fund_code: str, start: str, end: str) -> pd.DataFrame:
-    """获取基金历史净值"""
+def _fetch_nav_history(fund_code: str) -> pd.DataFrame:
+    """从上游下载基金全部历史净值 (接口不支持按日期区间查询)"""
+    df = ak.fund_open_fund_info_em(symbol=fund_code, indicator="单位净值走势")
+    df['净值日期'] = pd.to_datetime(df['净值日期'])
+    df = df.rename(columns={'净值日期': 'date', '单位净值': 'nav'})
+    return df[['date', 'nav']]
+
+def fetch_fund_data(fund_code: str, start: str, end: str, store: NavStore = None) -> pd.DataFrame:
+    """
+    获取基金历史净值
+    优先读取本地净值库，只有库中缺少 end 之前的新数据时才访问网络，
+    并且只把最后一条已存储日期之后的净值写入本地库
+    """
     try:
-        df = ak.fund_open_fund_info_em(symbol=fund_code, indicator="单位净值走势")
-        df['净值日期'] = pd.to_datetime(df['净值日期'])
-        start_dt = pd.to_datetime(start)
-        end_dt = pd.to_datetime(end)
-        df = df[(df['净值日期'] >= start_dt) & (df['净值日期'] <= end_dt)]
-        df = df.rename(columns={'净值日期': 'date', '单位净值': 'nav'})
-        df = df[['date', 'nav']].reset_index(drop=True)
-        return df
+        store = store or get_nav_store()
+        if store.needs_sync(fund_code, end):
+            try:
+                df = _fetch_nav_history(fund_code)
+                last = store.last_date(fund_code)
+                if last is not None:
+                    df = df[df['date'] > pd.Timestamp(last)]
+                store.append(fund_code, df)
+            except Exception:
+                # 网络失败时退回本地已有数据
+                pass
+        return store.load(fund_code, start, end)
     except Exception:
         return pd.DataFrame(columns=['date', 'nav'])
 
+@cached("fund_rankings", ttl="close")
 def fetch_fund_rankings(symbol: str = "股票型") -> pd.DataFrame:
     """
-    获取基金排行榜
+    获取基金排行榜 (缓存到下一个收盘时间，见 fetch_cache)
     symbol: "全部", "股票型", "混合型", "债券型", "指数型", "QDII", "LOF", "FOF"
     """
     df = ak.fund_open_fund_rank_em(symbol=symbol)
     return df
 
+@cached("index_valuation", ttl="close")
 def fetch_index_valuation(symbol: str = "沪深300") -> pd.DataFrame:
     """
-    获取主流指数估值数据
+    获取主流指数估值数据 (缓存到下一个收盘时间)
     """
     # 获取指数估值数据
     df = ak.index_value_hist_funddb(symbol=symbol, indicator="等权市盈率")
     return df
 
-def fetch_realtime_estimation(fund_list: list) -> pd.DataFrame:
+class RealtimeEstimationClient:
     """
-    高效获取指定基金列表的实时估值 (极速版)
+    实时估值批量抓取客户端
+    复用同一个带连接池的HTTP会话，按并发上限并行请求，单个请求超时后自动重试
     """
-    results = []
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    for code in fund_list:
-        try:
-            url = f"http://fundgz.1234567.com.cn/js/{code}.js"
-            response = requests.get(url, headers=headers, timeout=5)
-            if response.status_code == 200:
-                match = re.search(r'jsonpgz\((.*)\);', response.text)
-                if match:
+    
+    BASE_URL = "http://fundgz.1234567.com.cn/js/{code}.js"
+    
+    def __init__(self, max_workers: int = 8, timeout: float = 5, retries: int = 2,
+                 backoff: float = 0.2, base_url: str = None):
+        """
+        初始化客户端
+        
+        Args:
+            max_workers: 最大并发请求数
+            timeout: 单次请求超时 (秒)
+            retries: 失败后的重试次数
+            backoff: 重试间隔基数 (秒)，第n次重试等待 backoff * n
+            base_url: 估值接口地址模板，需包含 {code} (测试时可指向本地服务)
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.base_url = base_url or self.BASE_URL
+        
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="fundgz")
+    
+    def fetch_one(self, code: str, deadline: float = None):
+        """
+        获取单只基金的实时估值
+        
+        Returns:
+            {基金代码, 基金名称, 估算涨跌幅}，失败返回None
+        """
+        url = self.base_url.format(code=code)
+        for attempt in range(self.retries + 1):
+            timeout = self.timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    return None
+            try:
+                response = self.session.get(url, timeout=timeout)
+                if response.status_code == 200:
+                    match = re.search(r'jsonpgz\((.*)\);', response.text)
+                    if not match or not match.group(1).strip():
+                        # 基金无估值 (如货币基金) 时接口返回空的jsonpgz()，重试无意义
+                        return None
                     data = json.loads(match.group(1))
-                    results.append({
+                    return {
                         "基金代码": data['fundcode'],
                         "基金名称": data['name'],
                         "估算涨跌幅": data['gszzl']
-                    })
-        except Exception:
-            pass
-    return pd.DataFrame(results)
+                    }
+            except Exception:
+                pass
+            if attempt < self.retries:
+                time.sleep(self.backoff * (attempt + 1))
+        return None
+    
+    def fetch(self, fund_list: list, deadline: float = None) -> pd.DataFrame:
+        """
+        并发获取基金列表的实时估值
+        
+        Args:
+            fund_list: 基金代码列表
+            deadline: 整批的截止时间 (秒)，超时未完成的基金直接跳过
+            
+        Returns:
+            DataFrame，列为 基金代码/基金名称/估算涨跌幅，顺序与fund_list一致
+        """
+        abs_deadline = time.monotonic() + deadline if deadline else None
+        futures = [self._executor.submit(self.fetch_one, code, abs_deadline)
+                   for code in fund_list]
+        results = []
+        for future in futures:
+            try:
+                row = future.result()
+            except Exception:
+                row = None
+            if row:
+                results.append(row)
+        return pd.DataFrame(results)
+    
+    def close(self):
+        """释放线程池和连接池"""
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+def fetch_realtime_estimation(fund_list: list, max_workers: int = 8, timeout: float = 5,
+                              retries: int = 2, client: RealtimeEstimationClient = None) -> pd.DataFrame:
+    """
+    高效获取指定基金列表的实时估值 (极速版)
+    传入client时复用其连接池，否则临时创建一个客户端
+    """
+    if client is not None:
+        return client.fetch(fund_list)
+    client = RealtimeEstimationClient(max_workers=max_workers, timeout=timeout, retries=retries)
+    try:
+        return client.fetch(fund_list)
+    finally:
+        client.close()
 
 if __name__ == "__main__":
     # 示例：测试获取某只基金的历史净值
@@ -0,0 +1,159 @@
+# 权益曲线 - 每日资产快照的列式存储与增量风险指标
+import math
+from array import array
+from collections import deque
+from typing import Dict, List
+
+
+class EquityCurve:
+    """
+    每日权益曲线
+
+    日期、现金、总资产按列存放；最大回撤、波动率、夏普比率在追加时增量更新，
+    每新增一天只需 O(1) 计算，不再回扫历史
+    """
+
+    def __init__(self, window: int = 60, periods_per_year: int = 250,
+                 risk_free_rate: float = 0.03):
+        """
+        Args:
+            window: 滚动夏普/波动率的窗口长度 (交易日)
+            periods_per_year: 年化用的每年周期数
+            risk_free_rate: 年化无风险利率
+        """
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self.risk_free_rate = risk_free_rate
+
+        self.dates: List[str] = []
+        self.cash = array('d')
+        self.total_asset = array('d')
+
+        self._reset_stats()
+        self._undo = None  # 追加最后一个点之前的统计状态 (同日重复记录时回退用)
+
+    def _reset_stats(self):
+        self.peak = 0.0               # 历史最高总资产
+        self.max_drawdown = 0.0       # 最大回撤
+        self._n = 0                   # 日收益个数
+        self._mean = 0.0              # 日超额收益均值 (Welford)
+        self._m2 = 0.0                # 日超额收益离差平方和 (Welford)
+        self._window_returns = deque()
+        self._window_sum = 0.0
+        self._window_sumsq = 0.0
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _save_stats(self) -> tuple:
+        return (self.peak, self.max_drawdown, self._n, self._mean, self._m2,
+                deque(self._window_returns), self._window_sum, self._window_sumsq)
+
+    def _restore_stats(self, state: tuple):
+        (self.peak, self.max_drawdown, self._n, self._mean, self._m2,
+         self._window_returns, self._window_sum, self._window_sumsq) = state
+
+    def append(self, date: str, cash: float, total_asset: float):
+        """
+        追加一天的快照；与最后一个点同日时覆盖该点 (盘中多次记录只保留最新值)
+
+        Raises:
+            ValueError: 日期早于最后一个点 (增量统计只能按时间顺序追加)
+        """
+        if self.dates and date < self.dates[-1]:
+            raise ValueError(f"快照日期 {date} 早于权益曲线最后一天 {self.dates[-1]}")
+        if self.dates and self.dates[-1] == date:
+            self._restore_stats(self._undo)
+            self.dates.pop()
+            self.cash.pop()
+            self.total_asset.pop()
+
+        self._undo = self._save_stats()
+        if self.total_asset and self.total_asset[-1] > 0:
+            self._add_return(total_asset / self.total_asset[-1] - 1)
+
+        self.peak = max(self.peak, total_asset)
+        if self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, 1 - total_asset / self.peak)
+
+        self.dates.append(date)
+        self.cash.append(cash)
+        self.total_asset.append(total_asset)
+
+    def _add_return(self, daily_return: float):
+        """增量更新全样本与滚动窗口统计"""
+        excess = daily_return - self.risk_free_rate / self.periods_per_year
+        self._n += 1
+        delta = excess - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (excess - self._mean)
+
+        self._window_returns.append(excess)
+        self._window_sum += excess
+        self._window_sumsq += excess * excess
+        if len(self._window_returns) > self.window:
+            old = self._window_returns.popleft()
+            self._window_sum -= old
+            self._window_sumsq -= old * old
+
+    @property
+    def current_drawdown(self) -> float:
+        """当前回撤"""
+        if not self.total_asset or self.peak <= 0:
+            return 0.0
+        return 1 - self.total_asset[-1] / self.peak
+
+    @property
+    def volatility(self) -> float:
+        """全样本年化波动率"""
+        if self._n < 2:
+            return 0.0
+        return math.sqrt(self._m2 / self._n * self.periods_per_year)
+
+    @property
+    def sharpe_ratio(self) -> float:
+        """全样本年化夏普比率"""
+        if self._n < 2 or self._m2 <= 0:
+            return 0.0
+        return self._mean / math.sqrt(self._m2 / self._n) * math.sqrt(self.periods_per_year)
+
+    def _window_moments(self) -> tuple:
+        n = len(self._window_returns)
+        mean = self._window_sum / n
+        var = max(self._window_sumsq / n - mean * mean, 0.0)
+        return mean, var
+
+    @property
+    def rolling_volatility(self) -> float:
+        """最近 window 日的年化波动率"""
+        if len(self._window_returns) < 2:
+            return 0.0
+        _, var = self._window_moments()
+        return math.sqrt(var * self.periods_per_year)
+
+    @property
+    def rolling_sharpe(self) -> float:
+        """最近 window 日的年化夏普比率"""
+        if len(self._window_returns) < 2:
+            return 0.0
+        mean, var = self._window_moments()
+        if var <= 1e-18:
+            return 0.0
+        return mean / math.sqrt(var) * math.sqrt(self.periods_per_year)
+
+    def to_columns(self) -> Dict[str, list]:
+        """列式导出 (用于持久化)"""
+        return {
+            'date': list(self.dates),
+            'cash': self.cash.tolist(),
+            'total_asset': self.total_asset.tolist(),
+        }
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, list], **kwargs) -> 'EquityCurve':
+        """由列式数据重建权益曲线 (按顺序重放一次以恢复增量统计)"""
+        curve = cls(**kwargs)
+        for date, cash, total in zip(columns.get('date', []), columns.get('cash', []),
+                                     columns.get('total_asset', [])):
+            curve.append(date, cash, total)
+        return curve
@@ -0,0 +1,260 @@
+# 接口缓存 - 内存LRU + 磁盘pickle两级缓存，按收盘时间过期，过期后先返回旧值并在后台刷新
+import contextlib
+import datetime
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import pandas as pd
+import pytz
+from config import Config
+from trading_calendar import TradingCalendar
+
+
+def _copy(value):
+    """DataFrame 返回副本，避免调用方修改缓存中的数据"""
+    return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+
+class CacheEntry:
+    def __init__(self, value, fetched_at: float, expires_at: float):
+        self.value = value
+        self.fetched_at = fetched_at    # 下载时间 (时间戳)
+        self.expires_at = expires_at    # 过期时间 (时间戳)
+
+
+class FetchCache:
+    """
+    两级接口缓存
+
+    - 内存层: 最多 max_entries 条，按最近使用淘汰 (LRU)
+    - 磁盘层: 每条缓存一个 pickle 文件，跨进程共享，内存未命中时读取
+    - 过期时间: ttl='close' 时为下载后的下一个收盘时间 (交易日 Config.MARKET_CLOSE_TIME)，
+      也可以是秒数
+    - 过期后 stale_seconds 内仍返回旧值，同时在后台线程刷新 (stale-while-revalidate)；
+      超过该时间或没有缓存时同步下载，下载失败时有旧值则退回旧值
+    - 同一条缓存同时只有一个线程下载，并发未命中的调用方等待并复用其结果
+    """
+
+    def __init__(self, directory: str = None, max_entries: int = 128,
+                 stale_seconds: float = None, calendar: TradingCalendar = None,
+                 now: Callable[[], float] = None):
+        """
+        Args:
+            directory: 磁盘缓存目录，为 None 时只用内存 (默认缓存使用 Config.DATA_FILES['fetch_cache'])
+            max_entries: 内存层最大条数
+            stale_seconds: 过期后仍可先返回旧值的时长，默认 Config.FETCH_CACHE_STALE_SECONDS
+            calendar: 交易日历 (计算收盘过期时间)
+            now: 当前时间戳函数 (测试用)，默认 time.time
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.stale_seconds = Config.FETCH_CACHE_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self.calendar = calendar or TradingCalendar.default()
+        self.timezone = pytz.timezone(Config.TIMEZONE)
+        self.now = now or time.time
+
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._key_locks: Dict[str, list] = {}   # key -> [锁, 使用中的线程数]
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    # ---------- 统计 ----------
+
+    def _count(self, endpoint: str, key: str):
+        with self._lock:
+            counters = self.stats.setdefault(endpoint, {
+                'hits': 0, 'disk_hits': 0, 'misses': 0, 'stale': 0, 'refreshes': 0, 'errors': 0})
+            counters[key] += 1
+
+    # ---------- 过期时间 ----------
+
+    def next_close(self, timestamp: float) -> float:
+        """timestamp 之后的第一个收盘时间 (交易日)"""
+        close = datetime.time(*[int(p) for p in Config.MARKET_CLOSE_TIME.split(':')])
+        local = datetime.datetime.fromtimestamp(timestamp, self.timezone)
+        day = self.calendar.next_trading_day(local.date(), inclusive=True)
+        while True:
+            candidate = self.timezone.localize(datetime.datetime.combine(day, close))
+            if candidate.timestamp() > timestamp:
+                return candidate.timestamp()
+            day = self.calendar.next_trading_day(day)
+
+    def _expires_at(self, ttl, fetched_at: float) -> float:
+        return self.next_close(fetched_at) if ttl == 'close' else fetched_at + float(ttl)
+
+    # ---------- 存取 ----------
+
+    def _path(self, key: str) -> str:
+        endpoint = key.split('|', 1)[0]
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"{endpoint}_{digest}.pkl")
+
+    def _get(self, key: str, endpoint: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                entry = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ 读取缓存 {key} 失败: {e}")
+            return None
+        self._count(endpoint, 'disk_hits')
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: CacheEntry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _put(self, key: str, entry: CacheEntry):
+        self._remember(key, entry)
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._path(key) + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))   # 原子替换，其他进程不会读到半个文件
+        except Exception as e:
+            print(f"⚠️ 写入缓存 {key} 失败: {e}")
+
+    @contextlib.contextmanager
+    def _key_lock(self, key: str):
+        """按缓存 key 加锁 (下载完成后没有线程使用时移除)"""
+        with self._lock:
+            holder = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            holder[1] += 1
+        try:
+            with holder[0]:
+                yield
+        finally:
+            with self._lock:
+                holder[1] -= 1
+                if holder[1] == 0:
+                    del self._key_locks[key]
+
+    def _fetch(self, key: str, endpoint: str, ttl, func: Callable, args, kwargs) -> CacheEntry:
+        fetched_at = self.now()
+        entry = CacheEntry(func(*args, **kwargs), fetched_at, self._expires_at(ttl, fetched_at))
+        self._put(key, entry)
+        return entry
+
+    def _refresh(self, key: str, endpoint: str, ttl, func: Callable, args, kwargs):
+        """后台刷新 (同一条缓存同时只刷新一次)"""
+        with self._lock:
+            if key in self._refreshing:
+                return None
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                with self._key_lock(key):
+                    self._fetch(key, endpoint, ttl, func, args, kwargs)
+                self._count(endpoint, 'refreshes')
+            except Exception as e:
+                self._count(endpoint, 'errors')
+                print(f"⚠️ 后台刷新 {endpoint} 失败，继续使用旧数据: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        thread = threading.Thread(target=run, daemon=True, name=f"cache-refresh-{endpoint}")
+        thread.start()
+        return thread
+
+    def get_or_fetch(self, endpoint: str, ttl, func: Callable, args=(), kwargs=None):
+        """按缓存策略返回 func(*args, **kwargs) 的结果"""
+        kwargs = kwargs or {}
+        key = f"{endpoint}|{args!r}|{sorted(kwargs.items())!r}"
+        entry = self._get(key, endpoint)
+        now = self.now()
+
+        if entry is not None and now < entry.expires_at:
+            self._count(endpoint, 'hits')
+            return _copy(entry.value)
+        if entry is not None and now < entry.expires_at + self.stale_seconds:
+            self._count(endpoint, 'stale')
+            self._refresh(key, endpoint, ttl, func, args, kwargs)
+            return _copy(entry.value)
+
+        with self._key_lock(key):
+            # 等锁期间其他线程可能已下载完成
+            latest = self._get(key, endpoint)
+            if latest is not None and self.now() < latest.expires_at:
+                self._count(endpoint, 'hits')
+                return _copy(latest.value)
+            entry = latest or entry
+
+            self._count(endpoint, 'misses')
+            try:
+                entry = self._fetch(key, endpoint, ttl, func, args, kwargs)
+            except Exception:
+                if entry is None:
+                    raise
+                self._count(endpoint, 'errors')
+                fetched = datetime.datetime.fromtimestamp(entry.fetched_at, self.timezone)
+                print(f"⚠️ 获取 {endpoint} 失败，使用 {fetched:%Y-%m-%d %H:%M} 的缓存")
+            return _copy(entry.value)
+
+    def clear(self, memory_only: bool = False):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+        if not memory_only and self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.directory, name))
+
+
+_default_cache: Optional[FetchCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_fetch_cache() -> FetchCache:
+    """获取默认接口缓存 (进程内单例)"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = FetchCache(Config.DATA_FILES['fetch_cache'])
+        return _default_cache
+
+
+def cached(endpoint: str, ttl='close', cache: FetchCache = None):
+    """
+    接口缓存装饰器
+
+    Args:
+        endpoint: 接口名称 (缓存文件名前缀和统计分组)
+        ttl: 'close' 表示到下一个收盘时间过期，或有效秒数
+        cache: 使用的缓存，默认 get_fetch_cache()
+
+    被装饰函数的 __wrapped__ 为原函数 (不经过缓存)
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # 按参数名归一化 (位置参数、关键字参数、默认值对应同一条缓存)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return (cache or get_fetch_cache()).get_or_fetch(
+                endpoint, ttl, func, kwargs=dict(bound.arguments))
+        return wrapper
+    return decorator
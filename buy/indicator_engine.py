@@ -0,0 +1,289 @@
+# 横截面指标引擎 - 将多只基金对齐成 日期×基金 矩阵，一次性向量化计算全部指标
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from data_fetcher import fetch_fund_data, fetch_fund_rankings
+
+
+def align_nav_matrix(nav_data: Dict[str, pd.DataFrame]) -> Tuple[pd.DatetimeIndex, List[str], np.ndarray]:
+    """
+    将多只基金的净值序列按日期对齐
+
+    Args:
+        nav_data: {code: DataFrame(date, nav)}
+
+    Returns:
+        (dates, codes, matrix)，matrix 形状为 (日期数, 基金数)
+        某只基金在某日没有净值 (未成立、QDII节假日等) 时为NaN
+    """
+    dates, codes, matrix, _ = _align(nav_data)
+    return dates, codes, matrix
+
+
+def _align(nav_data: Dict[str, pd.DataFrame]):
+    """align_nav_matrix 的实现，额外返回每只基金最后一条净值所在的行号"""
+    codes, columns = [], []
+    for code, df in nav_data.items():
+        if df is None or df.empty:
+            continue
+        codes.append(code)
+        dates = df['date'].to_numpy()
+        if not np.issubdtype(dates.dtype, np.datetime64):
+            dates = pd.to_datetime(df['date']).to_numpy()
+        columns.append((dates.astype('datetime64[D]'), df['nav'].to_numpy(dtype=float)))
+    if not codes:
+        return pd.DatetimeIndex([]), [], np.empty((0, 0)), np.empty(0, dtype=int)
+
+    all_dates = np.unique(np.concatenate([d for d, _ in columns]))
+    matrix = np.full((len(all_dates), len(codes)), np.nan)
+    last_row = np.empty(len(codes), dtype=int)
+    for j, (d, v) in enumerate(columns):
+        rows = np.searchsorted(all_dates, d)
+        matrix[rows, j] = v   # 同一日期重复时保留后出现的值
+        last_row[j] = rows.max()
+    return pd.DatetimeIndex(all_dates), codes, matrix, last_row
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """逐列前值填充 (用于估值等需要每个日期都有价格的场景)"""
+    valid = ~np.isnan(matrix)
+    idx = np.where(valid, np.arange(matrix.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return matrix[idx, np.arange(matrix.shape[1])]
+
+
+def _compact(matrix: np.ndarray) -> np.ndarray:
+    """
+    把每列的有效值按原顺序压到底部、NaN移到顶部，返回排列下标
+    滑动窗口在压缩后的矩阵上计算，就等价于逐只基金只按自己的净值序列计算
+    """
+    return np.argsort(~np.isnan(matrix), axis=0, kind='stable')
+
+
+def _window_diff(cum: np.ndarray, window: int) -> np.ndarray:
+    """由累计和求滑动窗口和，前 window-1 行为NaN"""
+    out = np.full(cum.shape, np.nan)
+    if cum.shape[0] >= window:
+        out[window - 1:] = cum[window - 1:]
+        out[window:] -= cum[:-window]
+    return out
+
+
+def _column_offset(valid: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """每列有效值的均值，用于在累计求和前平移数据以减小浮点误差"""
+    counts = valid.sum(axis=0)
+    sums = np.where(valid, matrix, 0.0).sum(axis=0)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), 0.0)
+
+
+def rolling_mean(matrix: np.ndarray, window: int) -> np.ndarray:
+    """
+    逐列滑动平均 (与 pandas rolling(window).mean() 一致：窗口内有NaN则结果为NaN)
+    """
+    valid = ~np.isnan(matrix)
+    offset = _column_offset(valid, matrix)
+    x = np.where(valid, matrix - offset, 0.0)
+    sums = _window_diff(np.cumsum(x, axis=0), window)
+    counts = _window_diff(np.cumsum(valid, axis=0, dtype=np.int64), window)
+    return np.where(counts == window, sums / window + offset, np.nan)
+
+
+def rolling_std(matrix: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """逐列滑动标准差 (默认样本标准差，与 pandas rolling(window).std() 一致)"""
+    valid = ~np.isnan(matrix)
+    offset = _column_offset(valid, matrix)
+    x = np.where(valid, matrix - offset, 0.0)
+    sums = _window_diff(np.cumsum(x, axis=0), window)
+    sq_sums = _window_diff(np.cumsum(x * x, axis=0), window)
+    counts = _window_diff(np.cumsum(valid, axis=0, dtype=np.int64), window)
+    var = (sq_sums - sums * sums / window) / (window - ddof)
+    return np.where(counts == window, np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+
+def rsi(matrix: np.ndarray, window: int = 14) -> np.ndarray:
+    """
+    逐列RSI (与 strategy.calculate_rsi 一致：涨跌幅的简单滑动平均)
+    """
+    valid = ~np.isnan(matrix)
+    delta = np.full(matrix.shape, np.nan)
+    delta[1:] = matrix[1:] - matrix[:-1]
+    delta = np.where(np.isnan(delta), 0.0, delta)
+
+    # 基金成立前的位置保持NaN，成立首日的涨跌记为0 (与逐只计算时 diff 的首行一致)
+    gain = np.where(valid, np.maximum(delta, 0.0), np.nan)
+    loss = np.where(valid, np.maximum(-delta, 0.0), np.nan)
+    avg_gain = rolling_mean(gain, window)
+    avg_loss = rolling_mean(loss, window)
+
+    # 窗口内没有上涨/下跌时精确取0，避免累计和相减留下的浮点残差
+    up_days = _window_diff(np.cumsum(gain > 0, axis=0, dtype=np.int64), window)
+    down_days = _window_diff(np.cumsum(loss > 0, axis=0, dtype=np.int64), window)
+    avg_gain = np.where(up_days == 0, np.where(np.isnan(avg_gain), np.nan, 0.0), avg_gain)
+    avg_loss = np.where(down_days == 0, np.where(np.isnan(avg_loss), np.nan, 0.0), avg_loss)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def bollinger_bands(matrix: np.ndarray, window: int = 20, num_std: int = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """逐列布林带，返回 (中轨, 上轨, 下轨)"""
+    mid = rolling_mean(matrix, window)
+    std = rolling_std(matrix, window)
+    return mid, mid + std * num_std, mid - std * num_std
+
+
+def composite_score(nav, ma20, rsi_values, bb_lower):
+    """
+    综合评分 (与 strategy.composite_signal_strategy 的打分规则一致)
+    参数可以是标量，也可以是任意形状的数组
+    """
+    nav = np.asarray(nav, dtype=float)
+    rsi_values = np.asarray(rsi_values, dtype=float)
+    score = np.zeros(np.broadcast(nav, ma20, rsi_values, bb_lower).shape, dtype=int)
+    score += nav > ma20
+    score += np.where(rsi_values < 30, 2, np.where(rsi_values < 40, 1, 0))
+    score += 2 * (nav < bb_lower)
+    score -= 2 * (rsi_values > 70)
+    return score
+
+
+def trend_bonus(nav, ma5, ma10, ma20, rsi_values):
+    """
+    趋势追涨加分 (与 monitor.check_signals 的多头排列规则一致)：
+    价格在20日线上方、均线多头排列且RSI处于50-73强势区间时加2分
+    """
+    rsi_values = np.asarray(rsi_values, dtype=float)
+    trending = (nav > ma20) & (ma5 > ma10) & (ma10 > ma20)
+    strong = (rsi_values >= 50) & (rsi_values <= 73)
+    return np.where(trending & strong, 2, 0)
+
+
+def score_to_suggestion(score) -> np.ndarray:
+    """评分转换为操作建议"""
+    score = np.asarray(score)
+    return np.select(
+        [score >= 3, score >= 1, score <= -1],
+        ["强烈推荐买入", "建议买入/定投", "建议卖出/减仓"],
+        default="观望"
+    )
+
+
+def compute_indicators(matrix: np.ndarray, rsi_window: int = 14, bb_window: int = 20) -> Dict[str, np.ndarray]:
+    """
+    一次性计算全部指标
+    每只基金的滑动窗口只覆盖它自己的净值序列，与逐只计算的结果一致
+
+    Returns:
+        {nav, ma5, ma10, ma20, rsi, bb_mid, bb_upper, bb_lower, score, trend_score}
+        每个数组形状均为 (日期数, 基金数)，没有净值的位置为NaN (评分为0)
+    """
+    order = _compact(matrix)
+    packed = np.take_along_axis(matrix, order, axis=0)
+    ind = _compute_packed(packed, rsi_window, bb_window)
+
+    result = {}
+    for key, values in ind.items():
+        out = np.empty_like(values)
+        np.put_along_axis(out, order, values, axis=0)
+        result[key] = out
+    return result
+
+
+def _compute_packed(matrix: np.ndarray, rsi_window: int, bb_window: int) -> Dict[str, np.ndarray]:
+    """在已压缩 (NaN全部位于顶部) 的矩阵上计算指标"""
+    ma5 = rolling_mean(matrix, 5)
+    ma10 = rolling_mean(matrix, 10)
+    ma20 = rolling_mean(matrix, 20)
+    rsi_values = rsi(matrix, rsi_window)
+    bb_mid, bb_upper, bb_lower = bollinger_bands(matrix, bb_window)
+
+    score = composite_score(matrix, ma20, rsi_values, bb_lower)
+    return {
+        'nav': matrix,
+        'ma5': ma5,
+        'ma10': ma10,
+        'ma20': ma20,
+        'rsi': rsi_values,
+        'bb_mid': bb_mid,
+        'bb_upper': bb_upper,
+        'bb_lower': bb_lower,
+        'score': score,
+        'trend_score': score + trend_bonus(matrix, ma5, ma10, ma20, rsi_values),
+    }
+
+
+def scan_latest(nav_data: Dict[str, pd.DataFrame], min_history: int = 30) -> pd.DataFrame:
+    """
+    对多只基金的最新一天统一打分
+
+    Args:
+        nav_data: {code: DataFrame(date, nav)}
+        min_history: 最少历史净值条数，不足的基金不参与排名
+
+    Returns:
+        每只基金一行，按综合评分(含趋势加分)从高到低排序
+    """
+    dates, codes, matrix, last_row = _align(nav_data)
+    if not codes:
+        return pd.DataFrame()
+
+    ind = compute_indicators(matrix)
+    history_len = (~np.isnan(matrix)).sum(axis=0)
+    last = (last_row, np.arange(len(codes)))
+
+    result = pd.DataFrame({
+        '基金代码': codes,
+        '净值日期': dates[last_row],
+        '最新净值': ind['nav'][last],
+        'MA5': ind['ma5'][last],
+        'MA10': ind['ma10'][last],
+        'MA20': ind['ma20'][last],
+        'RSI(14)': ind['rsi'][last],
+        '布林上轨': ind['bb_upper'][last],
+        '布林下轨': ind['bb_lower'][last],
+        '基础评分': ind['score'][last],
+        '综合评分': ind['trend_score'][last],
+        '操作建议': score_to_suggestion(ind['score'][last]),
+    })
+    result = result[history_len >= min_history]
+    return result.sort_values('综合评分', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def scan_fund_universe(symbol: str = "全部", days: int = 365, max_workers: int = 16,
+                       limit: int = None) -> pd.DataFrame:
+    """
+    扫描整个排行榜基金池
+
+    Args:
+        symbol: 排行榜类别，见 fetch_fund_rankings
+        days: 参与计算的历史天数
+        max_workers: 并发拉取历史净值的线程数 (本地净值库命中时几乎不走网络)
+        limit: 只扫描前N只基金 (调试用)
+    """
+    rankings = fetch_fund_rankings(symbol)
+    codes = rankings['基金代码'].astype(str).tolist()
+    if limit:
+        codes = codes[:limit]
+
+    end = datetime.date.today().strftime('%Y-%m-%d')
+    start = (datetime.date.today() - datetime.timedelta(days=days)).strftime('%Y-%m-%d')
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = pool.map(lambda code: fetch_fund_data(code, start, end), codes)
+        nav_data = dict(zip(codes, frames))
+
+    result = scan_latest(nav_data)
+    if not result.empty and '基金简称' in rankings.columns:
+        names = dict(zip(rankings['基金代码'].astype(str), rankings['基金简称']))
+        result.insert(1, '基金名称', result['基金代码'].map(names))
+    return result
+
+
+if __name__ == "__main__":
+    import time
+    t0 = time.time()
+    ranking = scan_fund_universe("全部")
+    print(ranking.head(20).to_markdown(index=False))
+    print(f"\n共扫描 {len(ranking)} 只基金，用时 {time.time() - t0:.1f} 秒")
@@ -14,9 +14,10 @@ class MonitorIntegration:
         初始化集成器
         
         Args:
-            agent: AutoTradingAgent实例
+            agent: AutoTradingAgent实例 (集成器与智能体共用同一个交易会话)
         """
         self.agent = agent
+        self.session = agent.session
     
     def convert_monitor_output_to_signals(self, monitor_output: str) -> Dict:
         """
@@ -0,0 +1,223 @@
+# 盘中轮询监控 - 定时拉取实时估值，只对估值变化的基金增量重新打分并输出信号变化事件
+import datetime
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from clock import SystemClock
+from data_fetcher import fetch_fund_data, RealtimeEstimationClient
+from monitor import analyze_fund_state, load_holdings_info
+from streaming_indicators import FundIndicatorState, seed_states
+
+
+@dataclass
+class SignalEvent:
+    """信号变化事件"""
+    time: str                 # 发生时间
+    fund_code: str
+    fund_name: str
+    previous: Optional[str]   # 之前的操作建议 (首次打分为None)
+    current: str              # 新的操作建议
+    score: float              # 新的综合评分
+    est_change: str           # 触发本次打分的估值涨跌幅
+    row: Dict = field(default_factory=dict, repr=False)   # 完整的信号行 (同 analyze_fund)
+
+
+def _suggestion_key(row: Dict) -> tuple:
+    """
+    判断信号是否变化的依据: 操作建议 (去掉盈亏百分比等数字) + 建议仓位
+    避免 "止盈落袋 (盈12.3%)" 这类建议随估值小幅波动反复触发事件
+    """
+    suggestion = re.sub(r'[-+]?\d+(?:\.\d+)?%?', '', str(row.get('操作建议', '')))
+    return suggestion, row.get('建议仓位')
+
+
+class IntradayMonitor:
+    """
+    盘中轮询监控
+
+    开盘前 (或启动时) 用历史净值初始化每只基金的增量指标状态，之后每隔 interval 秒:
+      1. 用同一个带连接池的客户端批量拉取观察列表的实时估值
+      2. 只对估算涨跌幅与上次不同的基金重新打分: 估值作为今日净值并入指标 (O(1))，
+         打分规则同 analyze_fund
+      3. 操作建议发生变化时产生 SignalEvent，例如 建议买入/定投 -> 大跌捡漏机会
+    """
+
+    def __init__(self, fund_list: List[str], held_info: Dict = None,
+                 client: RealtimeEstimationClient = None, interval: float = 60,
+                 history_days: int = 365, on_event: Callable[[SignalEvent], None] = None,
+                 nav_data: Dict[str, pd.DataFrame] = None, clock=None, max_workers: int = 8,
+                 fold_estimate: bool = True):
+        """
+        Args:
+            fund_list: 观察列表
+            held_info: 持仓信息 {code: {cost: ...}}，默认读取 load_holdings_info()
+            client: 实时估值客户端 (需提供 fetch(fund_list, deadline))，默认新建并在 close() 时释放
+            interval: 轮询间隔 (秒)
+            history_days: 初始化指标使用的历史天数
+            on_event: 信号变化回调，默认打印
+            nav_data: 已有的历史净值 {code: DataFrame}，传入时不再拉取
+            clock: 时钟，默认系统时间
+            max_workers: 拉取历史净值和实时估值的并发数
+            fold_estimate: 是否把估值并入均线/RSI/布林带 (False 时指标停在昨日收盘，同每日监控)
+        """
+        self.fund_list = list(dict.fromkeys(fund_list))
+        self.held_info = load_holdings_info() if held_info is None else held_info
+        self._owns_client = client is None
+        self.client = client or RealtimeEstimationClient(max_workers=max_workers)
+        self.interval = interval
+        self.history_days = history_days
+        self.on_event = on_event or self._print_event
+        self.clock = clock or SystemClock()
+        self.max_workers = max_workers
+        self.fold_estimate = fold_estimate
+
+        self.states: Dict[str, FundIndicatorState] = {}
+        self.rows: Dict[str, Dict] = {}             # 每只基金当前的信号行
+        self._last_est: Dict[str, str] = {}         # 上次打分使用的估值
+        self.events: List[SignalEvent] = []
+        self.stats = {'polls': 0, 'rescored': 0, 'unchanged': 0, 'events': 0}
+        self._stop = threading.Event()
+
+        self.seed(nav_data)
+
+    # ---------- 初始化 ----------
+
+    def seed(self, nav_data: Dict[str, pd.DataFrame] = None):
+        """
+        用历史净值初始化 (或收盘后重新初始化) 指标状态，并以无估值时的信号作为基准
+        """
+        if nav_data is None:
+            end = self.clock.today()
+            start = end - datetime.timedelta(days=self.history_days)
+            nav_data = {}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {code: pool.submit(fetch_fund_data, code, start.isoformat(), end.isoformat())
+                           for code in self.fund_list}
+                for code, future in futures.items():
+                    try:
+                        nav_data[code] = future.result()
+                    except Exception as e:
+                        print(f"获取 {code} 历史净值出错: {e}")
+
+        self.states = seed_states({c: df for c, df in nav_data.items() if c in self.fund_list})
+        self.rows.clear()
+        self._last_est.clear()
+        for code, state in self.states.items():
+            row = analyze_fund_state(code, state, None, self.held_info)
+            if row is not None:
+                self.rows[code] = row
+        print(f"✓ 盘中监控初始化完成: {len(self.rows)}/{len(self.fund_list)} 只基金")
+
+    # ---------- 轮询 ----------
+
+    def poll_once(self, deadline: float = None) -> List[SignalEvent]:
+        """
+        拉取一次实时估值并增量重新打分
+
+        Args:
+            deadline: 本次拉取的截止时间 (秒)，默认为轮询间隔的80%
+
+        Returns:
+            本次产生的信号变化事件
+        """
+        if deadline is None and self.interval:
+            deadline = self.interval * 0.8
+        rt_df = self.client.fetch(list(self.states), deadline=deadline)
+        self.stats['polls'] += 1
+
+        events = []
+        now = self.clock.now().strftime('%Y-%m-%d %H:%M:%S')
+        for rt_row in (rt_df.to_dict(orient='records') if not rt_df.empty else []):
+            code = rt_row['基金代码']
+            state = self.states.get(code)
+            if state is None:
+                continue
+            est = str(rt_row['估算涨跌幅'])
+            if self._last_est.get(code) == est:
+                self.stats['unchanged'] += 1
+                continue
+            self._last_est[code] = est
+
+            row = analyze_fund_state(code, state, rt_row, self.held_info, self.fold_estimate)
+            self.stats['rescored'] += 1
+            if row is None:
+                continue
+            previous = self.rows.get(code)
+            self.rows[code] = row
+            if previous is None or _suggestion_key(previous) != _suggestion_key(row):
+                events.append(SignalEvent(
+                    time=now, fund_code=code, fund_name=row['基金名称'],
+                    previous=previous['操作建议'] if previous else None,
+                    current=row['操作建议'], score=row['综合评分'],
+                    est_change=row['今日估值'], row=row))
+
+        self.events.extend(events)
+        self.stats['events'] += len(events)
+        for event in events:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"⚠️ 事件回调出错: {e}")
+        return events
+
+    def run(self, until: datetime.time = datetime.time(15, 0), max_polls: int = None):
+        """
+        持续轮询，直到 until (时钟时间)、达到 max_polls 次或调用 stop()
+
+        每次轮询的耗时计入间隔，轮询出错时打印后继续
+        """
+        polls = 0
+        while not self._stop.is_set():
+            if until is not None and self.clock.now().time() >= until:
+                print(f"[{self.clock.now()}] 已到 {until}，盘中监控结束")
+                break
+            started = time.monotonic()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"⚠️ 盘中轮询出错: {e}")
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                break
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0))
+
+    def stop(self):
+        """停止轮询 (可从其他线程调用)"""
+        self._stop.set()
+
+    def close(self):
+        """停止轮询并释放自建的估值客户端"""
+        self.stop()
+        if self._owns_client:
+            self.client.close()
+
+    # ---------- 结果 ----------
+
+    def results(self) -> pd.DataFrame:
+        """当前全部基金的信号 (格式同 check_signals，顺序同观察列表)"""
+        return pd.DataFrame([self.rows[c] for c in self.fund_list if c in self.rows])
+
+    @staticmethod
+    def _print_event(event: SignalEvent):
+        print(f"[{event.time}] {event.fund_code} {event.fund_name} 估值 {event.est_change}: "
+              f"{event.previous or '-'} -> {event.current} (评分 {event.score})")
+
+
+if __name__ == "__main__":
+    import sys
+
+    holdings = load_holdings_info()
+    watch_list = list(holdings) + sys.argv[1:]
+    print(f"盘中监控 {len(watch_list)} 只基金，每60秒轮询一次")
+    monitor = IntradayMonitor(watch_list, held_info=holdings, interval=60)
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.close()
+        print(monitor.results().to_string(index=False))
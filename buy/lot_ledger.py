@@ -0,0 +1,171 @@
+# 持仓批次账本 - 先进先出 / 加权平均成本核算
+import datetime
+from collections import deque
+from typing import Dict, Optional
+
+
+def _ordinal(date: str) -> int:
+    """YYYY-MM-DD -> 日序号"""
+    return datetime.date.fromisoformat(date[:10]).toordinal()
+
+
+class FundLots:
+    """
+    单只基金的持仓批次
+
+    份额、成本、份额加权买入日都随成交增量维护，
+    查询成本、盈亏、持有天数均为 O(1)
+    """
+
+    def __init__(self, method: str = "fifo"):
+        self.method = method
+        self.lots = deque()           # [份额, 单位成本, 买入日序号] (加权平均模式只有一个批次)
+        self.shares = 0.0             # 持有份额
+        self.cost = 0.0               # 持有份额的总成本
+        self.date_weight = 0.0        # sum(份额 × 买入日序号)，用于平均持有天数
+        self.realized_pnl = 0.0       # 已实现盈亏
+        self.bought_amount = 0.0      # 累计买入金额
+        self.sold_amount = 0.0        # 累计卖出金额
+
+    def buy(self, shares: float, price: float, date: str):
+        """买入一批份额"""
+        if shares <= 0:
+            return
+        day = _ordinal(date)
+        amount = shares * price
+        self.shares += shares
+        self.cost += amount
+        self.date_weight += shares * day
+        self.bought_amount += amount
+
+        if self.method == "average":
+            # 合并为一个批次: 单位成本和买入日均按份额加权
+            self.lots.clear()
+            self.lots.append([self.shares, self.cost / self.shares, self.date_weight / self.shares])
+        else:
+            self.lots.append([shares, price, day])
+
+    def sell(self, shares: float, price: float) -> float:
+        """
+        卖出份额 (超出持有份额的部分忽略)
+
+        Returns:
+            本次已实现盈亏
+        """
+        shares = min(shares, self.shares)
+        if shares <= 0:
+            return 0.0
+
+        if self.method == "average":
+            avg_cost = self.cost / self.shares
+            avg_day = self.date_weight / self.shares
+            released_cost = shares * avg_cost
+            released_days = shares * avg_day
+            remaining = self.shares - shares
+            self.lots.clear()
+            if remaining > 1e-12:
+                self.lots.append([remaining, avg_cost, avg_day])
+        else:
+            # 先进先出: 依次消耗最早的批次 (每个批次最多被弹出一次，均摊 O(1))
+            released_cost = 0.0
+            released_days = 0.0
+            left = shares
+            while left > 1e-12 and self.lots:
+                lot = self.lots[0]
+                take = min(left, lot[0])
+                released_cost += take * lot[1]
+                released_days += take * lot[2]
+                lot[0] -= take
+                left -= take
+                if lot[0] <= 1e-12:
+                    self.lots.popleft()
+
+        proceeds = shares * price
+        pnl = proceeds - released_cost
+        self.shares -= shares
+        self.cost -= released_cost
+        self.date_weight -= released_days
+        if self.shares <= 1e-12 or not self.lots:
+            self.shares = 0.0
+            self.cost = 0.0
+            self.date_weight = 0.0
+        self.realized_pnl += pnl
+        self.sold_amount += proceeds
+        return pnl
+
+    @property
+    def avg_cost(self) -> float:
+        """持有份额的单位成本"""
+        return self.cost / self.shares if self.shares > 0 else 0.0
+
+    def unrealized_pnl(self, price: float) -> float:
+        """按当前价格计算的未实现盈亏"""
+        return self.shares * price - self.cost
+
+    def holding_days(self, as_of: str) -> float:
+        """持有份额的份额加权平均持有天数"""
+        if self.shares <= 0:
+            return 0.0
+        return _ordinal(as_of) - self.date_weight / self.shares
+
+    @property
+    def turnover(self) -> float:
+        """累计成交金额 (买入 + 卖出)"""
+        return self.bought_amount + self.sold_amount
+
+
+class LotLedger:
+    """所有基金的批次账本"""
+
+    METHODS = ("fifo", "average")
+
+    def __init__(self, method: str = "fifo"):
+        """
+        Args:
+            method: "fifo" 先进先出 / "average" 加权平均成本
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"未知成本核算方式: {method}")
+        self.method = method
+        self.funds: Dict[str, FundLots] = {}
+
+    def _fund(self, fund_code: str) -> FundLots:
+        lots = self.funds.get(fund_code)
+        if lots is None:
+            lots = self.funds[fund_code] = FundLots(self.method)
+        return lots
+
+    def buy(self, fund_code: str, shares: float, price: float, date: str):
+        self._fund(fund_code).buy(shares, price, date)
+
+    def sell(self, fund_code: str, shares: float, price: float) -> float:
+        return self._fund(fund_code).sell(shares, price)
+
+    def get(self, fund_code: str) -> Optional[FundLots]:
+        return self.funds.get(fund_code)
+
+    def position(self, fund_code: str, price: float, as_of: str = None) -> Dict:
+        """
+        单只基金的持仓明细 (O(1))
+
+        Args:
+            fund_code: 基金代码
+            price: 当前价格
+            as_of: 计算持有天数的日期，默认今天
+        """
+        lots = self.funds.get(fund_code) or FundLots(self.method)
+        as_of = as_of or datetime.date.today().isoformat()
+        return {
+            'shares': lots.shares,
+            'cost_price': lots.avg_cost,
+            'total_cost': lots.cost,
+            'unrealized_pnl': lots.unrealized_pnl(price),
+            'realized_pnl': lots.realized_pnl,
+            'holding_days': lots.holding_days(as_of),
+            'turnover': lots.turnover,
+        }
+
+    @property
+    def realized_pnl(self) -> float:
+        """全部基金的已实现盈亏"""
+        return sum(lots.realized_pnl for lots in self.funds.values())
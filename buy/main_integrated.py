@@ -13,10 +13,14 @@ from integration import MonitorIntegration, setup_auto_trading_system
 from auto_agent import create_auto_agent
 from scheduler import DailyScheduler
 from virtual_trading import VirtualTradingEngine
-from strategy_evolution import AdaptiveStrategyOptimizer
+from strategy_evolution import StrategyEvolver
+from trading_session import TradingSession
+from async_pipeline import AsyncSignalPipeline, RANKING_CATEGORIES
 
+import asyncio
 import json
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 
 def get_fund_list():
@@ -29,17 +33,37 @@ def get_fund_list():
     ]
 
 
-def run_traditional_monitor():
-    """运行传统的monitor逻辑"""
+def build_watch_list(held_info, fund_list, categories=(), top_n=15):
+    """
+    当日观察列表: 持仓、固定列表、各排行榜前 top_n 只 (按 categories 顺序，去重)
+    与 AsyncSignalPipeline.watch_list 的选取规则和顺序相同
+    """
+    ranked = []
+    for category in categories:
+        try:
+            rankings = fetch_fund_rankings(category)
+            ranked.extend(select_best_funds(rankings, top_n=top_n)['基金代码'].tolist())
+        except Exception as e:
+            print(f"⚠️ 获取 {category} 排行榜出错: {e}")
+    return list(dict.fromkeys(list(held_info) + list(fund_list) + ranked))
+
+
+def run_traditional_monitor(categories=()):
+    """
+    运行传统的monitor逻辑
+
+    Args:
+        categories: 海选的排行榜类型，默认不海选 (只看持仓和固定列表)
+    """
     print("\n" + "="*60)
     print("📊 运行传统Monitor程序...")
     print("="*60)
     
-    fund_list = get_fund_list()
     held_info = load_holdings_info()
+    watch_list = build_watch_list(held_info, get_fund_list(), categories)
     
     # 调用你现有的check_signals函数
-    results = check_signals(fund_list, held_info)
+    results = check_signals(watch_list, held_info, parallel=True)
     
     return results
 
@@ -168,22 +192,26 @@ def print_agent_report(response):
         print(f"   {key}: {value}")
 
 
-def run_auto_trading_system_once():
+def run_auto_trading_system_once(categories=()):
     """
     运行一次完整的自动化交易循环
     （适合每日定时执行）
+
+    Args:
+        categories: 海选的排行榜类型，默认不海选 (与异步版本相同参数时观察列表相同)
     """
     print("\n" + "="*60)
     print("🚀 启动自动化交易系统 (单次执行)")
     print("="*60)
     
     try:
-        # 1. 创建智能体
-        agent = create_auto_agent(initial_cash=100000)
+        # 1. 创建交易会话 (只加载一次账户状态)，智能体和集成器共用
+        session = TradingSession(initial_cash=100000)
+        agent = create_auto_agent(initial_cash=100000, session=session)
         integration = MonitorIntegration(agent)
         
         # 2. 运行传统monitor逻辑
-        monitor_results = run_traditional_monitor()
+        monitor_results = run_traditional_monitor(categories)
         
         # 3. 转换格式
         signals = convert_monitor_results_to_signals(monitor_results)
@@ -207,6 +235,62 @@ def run_auto_trading_system_once():
         return None
 
 
+async def run_auto_trading_system_once_async(categories=(), max_concurrency=8, storage=None):
+    """
+    异步版本的完整自动化交易循环
+
+    排行榜海选、实时估值、历史净值并发下载 (见 AsyncSignalPipeline)，
+    同时在专用线程中加载交易会话；信号到齐后在同一个线程中由智能体处理
+    (引擎、账本、监听器只在这一个线程中访问)
+
+    Args:
+        categories: 海选的排行榜类型，默认不海选 (观察列表与同参数的同步版本相同)
+        max_concurrency: 同时拉取历史净值的最大数量
+        storage: 存储后端，默认按配置创建
+    """
+    print("\n" + "="*60)
+    print("🚀 启动自动化交易系统 (单次执行, 异步流水线)")
+    print("="*60)
+    
+    def build_integration():
+        session = TradingSession(initial_cash=100000, storage=storage)
+        agent = create_auto_agent(initial_cash=100000, session=session)
+        return MonitorIntegration(agent)
+    
+    loop = asyncio.get_running_loop()
+    agent_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent")
+    try:
+        # 1. 加载账户状态与下载数据同时进行
+        integration_future = loop.run_in_executor(agent_thread, build_integration)
+        pipeline = AsyncSignalPipeline(load_holdings_info(), get_fund_list(),
+                                       categories=categories, max_concurrency=max_concurrency)
+        monitor_results = await pipeline.run()
+        integration = await integration_future
+        
+        # 2. 转换格式并通过集成器处理
+        signals = convert_monitor_results_to_signals(monitor_results)
+        response = await loop.run_in_executor(agent_thread, integration.process_monitor_results,
+                                              signals)
+        
+        # 3. 打印报告并保存结果
+        print_agent_report(response)
+        save_daily_results(response)
+        
+        print("\n⏱️ 各阶段完成时间:")
+        for stage, seconds in pipeline.timings.items():
+            print(f"   {stage}: {seconds:.2f}s")
+        print("\n✅ 自动化流程完成")
+        return response
+        
+    except Exception as e:
+        print(f"\n❌ 错误: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+    finally:
+        agent_thread.shutdown(wait=True)
+
+
 def run_auto_trading_system_continuous():
     """
     启动自动化交易系统（连续运行）
@@ -268,7 +352,7 @@ def view_strategy_evolution():
     print("📈 策略参数演进历史")
     print("="*60)
     
-    evolver = AdaptiveStrategyOptimizer().evolver
+    evolver = StrategyEvolver()
     
     for record in evolver.get_params_evolution()[-5:]:  # 显示最近5次
         print(f"\n时间: {record['timestamp']}")
@@ -289,22 +373,32 @@ if __name__ == "__main__":
           "║  Automated Quantitative Trading Agent System                ║\n"
           "╚════════════════════════════════════════════════════════════╝\n")
     
+    # --screen: once/async/traditional 先从排行榜海选 (两种方式观察列表相同，便于对比)
+    categories = RANKING_CATEGORIES if "--screen" in sys.argv else ()
+    args = [arg for arg in sys.argv[1:] if arg != "--screen"]
+    
     # 菜单选项
-    if len(sys.argv) > 1:
-        command = sys.argv[1]
+    if args:
+        command = args[0]
     else:
         print("使用方法:")
         print("  python main.py once      - 运行一次自动化流程")
+        print("  python main.py async     - 运行一次自动化流程 (异步并发下载)")
         print("  python main.py continuous- 启动连续运行（14:30自动执行）")
         print("  python main.py portfolio - 查看虚拟账户")
         print("  python main.py evolution - 查看策略演进")
         print("  python main.py traditional - 运行传统monitor")
+        print("  加 --screen 时 once/async/traditional 先从排行榜海选基金")
         print("")
-        command = input("请选择操作 (once/continuous/portfolio/evolution/traditional): ").strip()
+        command = input("请选择操作 (once/async/continuous/portfolio/evolution/traditional): ").strip()
     
     if command == "once":
         # 运行一次自动化流程
-        response = run_auto_trading_system_once()
+        response = run_auto_trading_system_once(categories)
+    
+    elif command == "async":
+        # 异步流水线运行一次
+        response = asyncio.run(run_auto_trading_system_once_async(categories))
     
     elif command == "continuous":
         # 启动连续运行
@@ -320,7 +414,7 @@ if __name__ == "__main__":
     
     elif command == "traditional":
         # 运行传统的monitor
-        results = run_traditional_monitor()
+        results = run_traditional_monitor(categories)
         print("\n结果:")
         if hasattr(results, 'to_dict'):
             # DataFrame -> dict
@@ -332,4 +426,4 @@ if __name__ == "__main__":
         # 默认：运行一次自动化流程
         print(f"未知命令: {command}")
         print("使用默认模式运行一次...")
-        response = run_auto_trading_system_once()
+        response = run_auto_trading_system_once(categories)
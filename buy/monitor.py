@@ -3,8 +3,10 @@ import datetime
 import json
 import os
 import re  # 引入正则模块
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from data_fetcher import fetch_fund_data, fetch_fund_rankings, fetch_realtime_estimation
 from strategy import ma_timing_strategy, select_best_funds, composite_signal_strategy
+from indicator_engine import composite_score, score_to_suggestion
 import pandas as pd
 
 # ==========================================
@@ -84,15 +86,204 @@ def load_holdings_info():
     
     return {}
 
-def check_signals(fund_list, held_info=None):
+def analyze_fund(fund_code, df, rt_row=None, held_info=None):
+    """
+    分析单只基金，生成一行信号结果
+    df: 历史净值 (date, nav)
+    rt_row: 实时估值 {基金代码, 基金名称, 估算涨跌幅}，无估值时为None
+    held_info: dict {code: {cost: ...}}
+    返回: 结果字典，数据不足时返回None
+    """
+    if held_info is None: held_info = {}
+    if df.empty or len(df) < 30:
+        return None
+    
+    # 综合历史信号
+    suggestion, score, rsi = composite_signal_strategy(df)
+    
+    # === 新增: 趋势追踪策略 (防止踏空白银等主升浪) ===
+    # 计算简单均线
+    if len(df) >= 20: # 确保数据够长
+        ma5 = df['nav'].rolling(window=5).mean().iloc[-1]
+        ma10 = df['nav'].rolling(window=10).mean().iloc[-1]
+        ma20 = df['nav'].rolling(window=20).mean().iloc[-1]
+        curr_nav = df['nav'].iloc[-1]
+        suggestion, score = apply_trend_bonus(suggestion, score, rsi, curr_nav, ma5, ma10, ma20)
+    # ===============================================
+
+    return build_signal_row(fund_code, df.iloc[-1]['nav'], suggestion, score, rsi,
+                            rt_row, held_info)
+
+def analyze_fund_state(fund_code, state, rt_row=None, held_info=None, fold_estimate=False):
+    """
+    用增量指标状态 (streaming_indicators.FundIndicatorState) 分析单只基金
+    每次只需 O(1) 计算，适合盘中每次拿到新估值后重新打分
+    fold_estimate=False: 指标停在最近一个正式净值，结果与对同一段历史调用 analyze_fund 相同
+    fold_estimate=True: 按估算涨跌幅把今日估值并入均线/RSI/布林带后再打分 (不修改状态)
+    """
+    if held_info is None: held_info = {}
+    if state.count < 30:
+        return None
+    
+    ind = state.latest()
+    if fold_estimate and rt_row:
+        try:
+            ind = state.preview_change(float(rt_row['估算涨跌幅']))
+        except (TypeError, ValueError):
+            pass   # 估值缺失或不是数字时按最近一个正式净值打分
+    suggestion, score, rsi = state_signal(ind)
+    suggestion, score = apply_trend_bonus(suggestion, score, rsi, ind['nav'],
+                                          ind['ma5'], ind['ma10'], ind['ma20'])
+    # 持仓盈亏由 build_signal_row 按正式净值和估算涨跌幅计算，这里传正式净值避免重复计入
+    return build_signal_row(fund_code, state.nav, suggestion, score, rsi, rt_row, held_info)
+
+def state_signal(ind):
+    """由最新一天的指标计算综合信号 (与 composite_signal_strategy 相同的规则)"""
+    score = int(composite_score(ind['nav'], ind['ma20'], ind['rsi'], ind['bb_lower']))
+    return str(score_to_suggestion(score)), score, ind['rsi']
+
+def apply_trend_bonus(suggestion, score, rsi, curr_nav, ma5, ma10, ma20):
+    """趋势追踪: 多头排列且RSI处于强势区间时加分并改为追涨"""
+    # 判定: 多头排列 (均线向上发散)
+    # 价格 > 20日线 说明大趋势向上
+    if curr_nav > ma20 and ma5 > ma10 > ma20:
+        # 如果 RSI 处于 50-70 的强势区间 (还没过热)，给予“追涨分”
+        # 原有策略只做反转(低位买)，这里补充趋势(高位买)
+        if 50 <= rsi <= 73: 
+            score += 2   # 既然是确认的趋势，直接给2分
+            # 如果原来是观望，现在改为追涨
+            if "持仓" not in suggestion and score >= 2:
+                suggestion = "🔥 趋势主升浪(追涨)"
+    return suggestion, score
+
+def build_signal_row(fund_code, last_nav, suggestion, score, rsi, rt_row=None, held_info=None):
+    """
+    融合实时估值和持仓盈亏，生成一行信号结果
+    last_nav: 最新净值; suggestion/score/rsi: 历史信号 (已含趋势加分)
+    """
+    if held_info is None: held_info = {}
+
+    # 融合实时估值
+    est_change = "N/A"
+    est_val = 0.0
+    fund_name = "-"
+
+    if rt_row:
+        val = rt_row['估算涨跌幅']
+        # 获取基金名称
+        if '基金名称' in rt_row:
+            fund_name = rt_row['基金名称']
+        
+        est_change = f"{val}%"
+        try: 
+            est_val = float(val)
+        except: pass
+        # 如果今日大跌且历史处于低位，评分增加
+        try:
+            if float(val) < -1.5 and rsi < 40:
+                score += 1
+                suggestion = "大跌捡漏机会"
+        except: pass
+    
+    # 优化逻辑: 买多少? 卖不卖?
+    is_held = fund_code in held_info
+    buy_amt = "-"
+    profit_pct_str = "-"
+    
+    # 针对持仓: 检查卖出信号
+    if is_held:
+        # 计算持仓收益率
+        cost = held_info[fund_code].get('cost', 0.0)
+        profit_pct = 0.0
+        if cost > 0:
+            # 如果有今日估值，用估值算更准，否则用昨日净值
+            current_val = last_nav * (1 + est_val/100) if (est_val != 0) else last_nav
+            profit_pct = (current_val - cost) / cost * 100
+            profit_pct_str = f"{profit_pct:+.2f}%"
+
+        # 基础建议
+        reason = ""
+        if rsi > 75: 
+            reason = "严重超买"
+            score = -1 
+        elif rsi > 70 and est_val > 0.5:
+            reason = "高位震荡"
+        elif score < 2 and est_val < -2.0:
+            reason = "破位大跌"
+        elif suggestion == "大跌捡漏机会":
+            reason = "补仓机会"
+
+        # 结合盈亏修正建议
+        if cost > 0:
+            if profit_pct > 10 and rsi > 70:
+                suggestion = f"💰 止盈落袋 (盈{profit_pct:.1f}%)"
+            elif profit_pct < -10 and reason == "补仓机会":
+                suggestion = f"📉 深跌摊薄 (亏{profit_pct:.1f}%)"
+            elif profit_pct < -15:
+                 suggestion = f"🚑 深度被套 (亏{profit_pct:.1f}%)"
+            elif reason:
+                suggestion = f"持仓({reason})"
+            else:
+                suggestion = "持仓观望"
+        else:
+            # 无成本数据时的默认逻辑
+            if reason == "严重超买": suggestion = "⚠️ 建议止盈"
+            elif reason == "高位震荡": suggestion = "⚠️ 考虑减仓"
+            elif reason == "破位大跌": suggestion = "🛑 警戒"
+            elif reason == "补仓机会": suggestion = "💰 补仓"
+            else: suggestion = "持仓"
+    
+    # 针对新机会: 给出仓位建议
+    else:
+        if score >= 3:
+            buy_amt = "积极 (2-3份)" # 重仓
+        elif score >= 2:
+            buy_amt = "稳健 (1份)"   # 标准
+        elif score >= 1:
+            buy_amt = "轻仓 (0.5份)" # 试探
+    
+    return {
+        "基金代码": fund_code,
+        "基金名称": fund_name,
+        "类型": "★持仓" if is_held else "观察",
+        "最新净值": last_nav,
+        "持仓成本": held_info.get(fund_code, {}).get('cost', 0) if is_held else "-", 
+        "预估盈亏": profit_pct_str,
+        "今日估值": est_change,
+        "RSI(14)": f"{rsi:.1f}",
+        "综合评分": score,
+        "操作建议": suggestion,
+        "建议仓位": buy_amt
+    }
+
+def analyze_fund_safe(fund_code, df, rt_row, held_info):
+    """
+    analyze_fund 的错误隔离包装，单只基金出错不影响其他基金
+    返回 (信号行, None) 或 (None, 异常)；模块级函数，可提交到进程池
+    """
+    try:
+        return analyze_fund(fund_code, df, rt_row, held_info), None
+    except Exception as e:
+        return None, e
+
+def print_progress(stage, done, total, fund_code):
+    """默认进度回调：每完成一只基金打印一行"""
+    print(f"   -> [{stage}] {done}/{total} {fund_code}")
+
+def check_signals(fund_list, held_info=None, parallel=False, max_workers=8,
+                  use_processes=False, progress_callback=None):
     """
     检查指定基金列表的买卖信号
     held_info: dict {code: {cost: ...}} 用于计算盈亏给出针对性建议
+    parallel: 是否并行模式 (并发拉取历史净值，再在线程池/进程池中打分)
+    max_workers: 并行模式下的并发数
+    use_processes: 并行打分时使用进程池 (基金数很多时更快)
+    progress_callback: 进度回调 callback(stage, done, total, fund_code)，
+                       stage 为 "fetch" 或 "score"
+    返回结果的顺序与 fund_list 一致
     """
     if held_info is None: held_info = {}
-    held_codes = list(held_info.keys())
     
-    results = []
     end_date = datetime.date.today().strftime('%Y-%m-%d')
     start_date = (datetime.date.today() - datetime.timedelta(days=365)).strftime('%Y-%m-%d')
     
@@ -100,146 +291,63 @@ def check_signals(fund_list, held_info=None):
     
     # 获实时估值数据
     print("1/2: 正在获取全市场实时估值数据 (请稍候)...")
-    rt_df = fetch_realtime_estimation(fund_list)
+    rt_df = fetch_realtime_estimation(fund_list, max_workers=max_workers)
+    rt_rows = {}
+    if not rt_df.empty:
+        for row in rt_df.to_dict(orient='records'):
+            rt_rows.setdefault(row['基金代码'], row)
     
     print(f"2/2: 开始分析具体基金 (共 {len(fund_list)} 只)...")
-    for fund_code in fund_list:
-        try:
-            print(f"   -> 正在分析 {fund_code} ...", end="\r")
-            df = fetch_fund_data(fund_code, start_date, end_date)
-            if df.empty or len(df) < 30:
-                continue
-            
-            # 综合历史信号
-            suggestion, score, rsi = composite_signal_strategy(df)
-            
-            # === 新增: 趋势追踪策略 (防止踏空白银等主升浪) ===
-            # 计算简单均线
-            if len(df) >= 20: # 确保数据够长
-                ma5 = df['nav'].rolling(window=5).mean().iloc[-1]
-                ma10 = df['nav'].rolling(window=10).mean().iloc[-1]
-                ma20 = df['nav'].rolling(window=20).mean().iloc[-1]
-                curr_nav = df['nav'].iloc[-1]
-                
-                # 判定: 多头排列 (均线向上发散)
-                # 价格 > 20日线 说明大趋势向上
-                if curr_nav > ma20 and ma5 > ma10 > ma20:
-                    # 如果 RSI 处于 50-70 的强势区间 (还没过热)，给予“追涨分”
-                    # 原有策略只做反转(低位买)，这里补充趋势(高位买)
-                    if 50 <= rsi <= 73: 
-                        score += 2   # 既然是确认的趋势，直接给2分
-                        # 如果原来是观望，现在改为追涨
-                        if "持仓" not in suggestion and score >= 2:
-                            suggestion = "🔥 趋势主升浪(追涨)"
-            # ===============================================
-
-            # 融合实时估值
-            est_change = "N/A"
-            est_val = 0.0
-            fund_name = "-"
-
-            if not rt_df.empty:
-                matches = rt_df[rt_df['基金代码'] == fund_code]
-                if not matches.empty:
-                    val = matches.iloc[0]['估算涨跌幅']
-                    # 获取基金名称
-                    if '基金名称' in matches.columns:
-                        fund_name = matches.iloc[0]['基金名称']
-                    
-                    est_change = f"{val}%"
-                    try: 
-                        est_val = float(val)
-                    except: pass
-                    # 如果今日大跌且历史处于低位，评分增加
-                    try:
-                        if float(val) < -1.5 and rsi < 40:
-                            score += 1
-                            suggestion = "大跌捡漏机会"
-                    except: pass
-            
-            # 尝试兜底获取名称 (如果实时数据里没有)
-            if fund_name == "-" and not df.empty and 'name' in df.columns:
-                 # 假设fetch_fund_data返回的df可能包含name列(具体取决于API实现，这里做一种可能性兼容)
-                 # 如果API没返回name，这行不起作用
-                 pass
-                 
-            latest_row = df.iloc[-1]
-            last_nav = latest_row['nav']
-            
-            # === 优化逻辑: 买多少? 卖不卖? ===
-            is_held = fund_code in held_codes
-            buy_amt = "-"
-            profit_pct_str = "-"
-            
-            # 针对持仓: 检查卖出信号
-            if is_held:
-                # 计算持仓收益率
-                cost = held_info[fund_code].get('cost', 0.0)
-                profit_pct = 0.0
-                if cost > 0:
-                    # 如果有今日估值，用估值算更准，否则用昨日净值
-                    current_val = last_nav * (1 + est_val/100) if (est_val != 0) else last_nav
-                    profit_pct = (current_val - cost) / cost * 100
-                    profit_pct_str = f"{profit_pct:+.2f}%"
-
-                # 基础建议
-                reason = ""
-                if rsi > 75: 
-                    reason = "严重超买"
-                    score = -1 
-                elif rsi > 70 and est_val > 0.5:
-                    reason = "高位震荡"
-                elif score < 2 and est_val < -2.0:
-                    reason = "破位大跌"
-                elif suggestion == "大跌捡漏机会":
-                    reason = "补仓机会"
-
-                # 结合盈亏修正建议
-                if cost > 0:
-                    if profit_pct > 10 and rsi > 70:
-                        suggestion = f"💰 止盈落袋 (盈{profit_pct:.1f}%)"
-                    elif profit_pct < -10 and reason == "补仓机会":
-                        suggestion = f"📉 深跌摊薄 (亏{profit_pct:.1f}%)"
-                    elif profit_pct < -15:
-                         suggestion = f"🚑 深度被套 (亏{profit_pct:.1f}%)"
-                    elif reason:
-                        suggestion = f"持仓({reason})"
-                    else:
-                        suggestion = "持仓观望"
-                else:
-                    # 无成本数据时的默认逻辑
-                    if reason == "严重超买": suggestion = "⚠️ 建议止盈"
-                    elif reason == "高位震荡": suggestion = "⚠️ 考虑减仓"
-                    elif reason == "破位大跌": suggestion = "🛑 警戒"
-                    elif reason == "补仓机会": suggestion = "💰 补仓"
-                    else: suggestion = "持仓"
-            
-            # 针对新机会: 给出仓位建议
-            else:
-                if score >= 3:
-                    buy_amt = "积极 (2-3份)" # 重仓
-                elif score >= 2:
-                    buy_amt = "稳健 (1份)"   # 标准
-                elif score >= 1:
-                    buy_amt = "轻仓 (0.5份)" # 试探
-            
-            results.append({
-                "基金代码": fund_code,
-                "基金名称": fund_name,
-                "类型": "★持仓" if is_held else "观察",
-                "最新净值": last_nav,
-                "持仓成本": held_info.get(fund_code, {}).get('cost', 0) if is_held else "-", 
-                "预估盈亏": profit_pct_str,
-                "今日估值": est_change,
-                "RSI(14)": f"{rsi:.1f}",
-                "综合评分": score,
-                "操作建议": suggestion,
-                "建议仓位": buy_amt
-            })
-        except Exception as e:
-            print(f"解析 {fund_code} 出错: {e}")
-            
-    return pd.DataFrame(results)
+    total = len(fund_list)
+    rows = [None] * total
+    
+    if not parallel:
+        for i, fund_code in enumerate(fund_list):
+            try:
+                df = fetch_fund_data(fund_code, start_date, end_date)
+                rows[i] = analyze_fund(fund_code, df, rt_rows.get(fund_code), held_info)
+            except Exception as e:
+                print(f"解析 {fund_code} 出错: {e}")
+            if progress_callback:
+                progress_callback("score", i + 1, total, fund_code)
+    else:
+        # 阶段一: 并发拉取历史净值 (IO密集)
+        histories = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(fetch_fund_data, code, start_date, end_date): code
+                       for code in fund_list}
+            for done, future in enumerate(as_completed(futures), 1):
+                code = futures[future]
+                try:
+                    histories[code] = future.result()
+                except Exception as e:
+                    print(f"获取 {code} 历史净值出错: {e}")
+                if progress_callback:
+                    progress_callback("fetch", done, total, code)
+        
+        # 阶段二: 在工作池中打分 (CPU密集)
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_cls(max_workers=max_workers) as pool:
+            futures = {}
+            for i, code in enumerate(fund_list):
+                if code in histories:
+                    future = pool.submit(analyze_fund_safe, code, histories[code],
+                                         rt_rows.get(code), held_info)
+                    futures[future] = i
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                code = fund_list[i]
+                try:
+                    row, error = future.result()
+                except Exception as e:
+                    row, error = None, e
+                if error is not None:
+                    print(f"解析 {code} 出错: {error}")
+                rows[i] = row
+                if progress_callback:
+                    progress_callback("score", done, len(futures), code)
+    
+    return pd.DataFrame([row for row in rows if row is not None])
 
 if __name__ == "__main__":
     # 0. 读取持仓
@@ -265,7 +373,8 @@ if __name__ == "__main__":
     print(f"海选完成：共有 {len(watch_list)} 只基金进入深度分析池。")
     
     # 2. 进行深度信号分析
-    signals = check_signals(watch_list, held_info=my_holdings_map)
+    signals = check_signals(watch_list, held_info=my_holdings_map, parallel=True,
+                            progress_callback=print_progress)
     
     print("\n" + "="*50)
     print("--- 每日资金体检报告 ---")
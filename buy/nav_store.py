@@ -0,0 +1,148 @@
+# 本地基金净值库 - 持久化历史净值，避免每次全量下载
+import sqlite3
+import datetime
+import threading
+from typing import Optional
+import pandas as pd
+from config import Config
+
+
+class NavStore:
+    """基金净值本地存储 (SQLite)"""
+
+    def __init__(self, db_path: str = "fund_nav.db"):
+        """
+        初始化净值库
+
+        Args:
+            db_path: SQLite数据库文件路径 (":memory:" 表示仅内存)
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS nav (
+                fund_code TEXT NOT NULL,
+                date TEXT NOT NULL,
+                nav REAL NOT NULL,
+                PRIMARY KEY (fund_code, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sync_log (
+                fund_code TEXT PRIMARY KEY,
+                synced_on TEXT NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def load(self, fund_code: str, start: str = None, end: str = None) -> pd.DataFrame:
+        """
+        读取指定日期区间的净值
+
+        Returns:
+            包含 date, nav 两列的DataFrame (按日期升序)
+        """
+        sql = "SELECT date, nav FROM nav WHERE fund_code = ?"
+        params = [fund_code]
+        if start:
+            sql += " AND date >= ?"
+            params.append(pd.to_datetime(start).strftime('%Y-%m-%d'))
+        if end:
+            sql += " AND date <= ?"
+            params.append(pd.to_datetime(end).strftime('%Y-%m-%d'))
+        sql += " ORDER BY date"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        df = pd.DataFrame(rows, columns=['date', 'nav'])
+        df['date'] = pd.to_datetime(df['date'])
+        df['nav'] = df['nav'].astype(float)
+        return df
+
+    def last_date(self, fund_code: str) -> Optional[datetime.date]:
+        """最后一条已存储净值的日期，无数据时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(date) FROM nav WHERE fund_code = ?", (fund_code,)
+            ).fetchone()
+        if row and row[0]:
+            return datetime.date.fromisoformat(row[0])
+        return None
+
+    def synced_on(self, fund_code: str) -> Optional[datetime.date]:
+        """最近一次从上游同步的日期"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_on FROM sync_log WHERE fund_code = ?", (fund_code,)
+            ).fetchone()
+        if row:
+            return datetime.date.fromisoformat(row[0])
+        return None
+
+    def append(self, fund_code: str, df: pd.DataFrame, synced_on: datetime.date = None) -> int:
+        """
+        追加净值数据 (已存在的日期会被覆盖)
+
+        Args:
+            fund_code: 基金代码
+            df: 包含 date, nav 两列的DataFrame
+            synced_on: 同步日期，默认今天
+
+        Returns:
+            写入的行数
+        """
+        synced_on = synced_on or datetime.date.today()
+        rows = [
+            (fund_code, pd.Timestamp(d).strftime('%Y-%m-%d'), float(v))
+            for d, v in zip(df['date'], df['nav'])
+            if pd.notna(v)
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO nav (fund_code, date, nav) VALUES (?, ?, ?)",
+                    rows
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_log (fund_code, synced_on) VALUES (?, ?)",
+                    (fund_code, synced_on.isoformat())
+                )
+        return len(rows)
+
+    def needs_sync(self, fund_code: str, end: str) -> bool:
+        """
+        判断请求到 end 日期的数据是否需要访问网络
+
+        - 已存储数据覆盖到 end: 不需要
+        - end 之后已同步过 (当天的净值晚间才公布，同步日之前的数据视为完整): 不需要
+        - 今天已同步过: 不需要，避免盘中重复下载
+        """
+        last = self.last_date(fund_code)
+        if last is None:
+            return True
+        end_date = pd.to_datetime(end).date()
+        if last >= end_date:
+            return False
+        synced = self.synced_on(fund_code)
+        if synced is None:
+            return True
+        return synced < min(end_date + datetime.timedelta(days=1), datetime.date.today())
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+_default_store: Optional[NavStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_nav_store() -> NavStore:
+    """获取默认净值库 (进程内单例)"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = NavStore(Config.DATA_FILES['nav_store'])
+        return _default_store
@@ -0,0 +1,320 @@
+# 策略参数优化器 - 在历史净值上搜索 DEFAULT_STRATEGY_PARAMS (随机搜索 / 遗传算法)
+import hashlib
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from config import Config
+from rule_backtest import IndicatorCache, evaluate_rules
+
+# 参数搜索空间 (离散取值，便于缓存命中和遗传算法的变异)
+PARAM_SPACE = {
+    'rsi_window': [6, 9, 14, 20, 30],
+    'rsi_oversold': [20, 25, 30, 35, 40],
+    'rsi_overbought': [65, 70, 75, 80, 85],
+    'ma_window': [10, 20, 30, 60],
+    'buy_score_threshold': [1, 2, 3],
+    'sell_threshold': [70, 75, 80, 85, 90],
+    'profit_take_threshold': [0.05, 0.08, 0.10, 0.15, 0.20, 0.30],
+    'loss_cut_threshold': [-0.30, -0.25, -0.20, -0.15, -0.10],
+    'dca_loss_threshold': [-0.15, -0.10, -0.07, -0.05],
+}
+
+OBJECTIVES = ('sharpe', 'total_return', 'calmar')
+
+
+def param_hash(params: Dict) -> str:
+    """参数字典的稳定哈希 (键排序后序列化)"""
+    text = json.dumps(params, sort_keys=True, default=float)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def objective_value(summary: Dict, objective: str) -> float:
+    """单只基金回测结果的目标值"""
+    if not summary:
+        return float('-inf')
+    if objective == 'total_return':
+        return summary['total_return']
+    if objective == 'calmar':
+        return summary['total_return'] / max(summary['max_drawdown'], 0.01)
+    return summary['sharpe']
+
+
+# ==========================================
+# 工作进程
+# ==========================================
+
+# 工作进程中只读共享的指标缓存 {code: IndicatorCache}
+_OPT_FUNDS: Dict[str, IndicatorCache] = {}
+_OPT_SETTINGS: Dict = {}
+
+
+def _init_optimizer_worker(nav_arrays: Dict[str, np.ndarray], settings: Dict):
+    """工作进程初始化：每个进程只接收一次净值，指标在进程内按窗口缓存"""
+    _set_optimizer_state({code: IndicatorCache(nav) for code, nav in nav_arrays.items()}, settings)
+
+
+def _set_optimizer_state(caches: Dict[str, IndicatorCache], settings: Dict):
+    global _OPT_FUNDS, _OPT_SETTINGS
+    _OPT_FUNDS = caches
+    _OPT_SETTINGS = settings
+
+
+def _evaluate_candidate(params: Dict) -> float:
+    """评估一组参数: 各基金目标值的平均 (settings['ranges'] 给出时只在对应行区间上模拟)"""
+    ranges = _OPT_SETTINGS.get('ranges') or {}
+    values = []
+    for code, cache in _OPT_FUNDS.items():
+        start, end = ranges.get(code, (0, None))
+        if end is not None and end - start < 2:
+            continue
+        values.append(objective_value(
+            evaluate_rules(cache, params, _OPT_SETTINGS['invest_amount'], start, end),
+            _OPT_SETTINGS['objective']))
+    values = [v for v in values if np.isfinite(v)]
+    return float(np.mean(values)) if values else float('-inf')
+
+
+class ParameterOptimizer:
+    """策略参数优化器"""
+
+    def __init__(self, nav_data: Dict[str, pd.DataFrame] = None, objective: str = 'sharpe',
+                 invest_amount: float = 1000.0, space: Dict[str, list] = None,
+                 max_workers: int = None, cache_file: str = None, seed: int = None,
+                 caches: Dict[str, IndicatorCache] = None, ranges: Dict[str, tuple] = None):
+        """
+        Args:
+            nav_data: 历史净值 {code: DataFrame(date, nav)}
+            objective: 优化目标 'sharpe' / 'total_return' / 'calmar'
+            invest_amount: 每次买入金额
+            space: 参数搜索空间，默认 PARAM_SPACE
+            max_workers: 进程数，默认CPU核数；为1时在当前进程内顺序评估
+            cache_file: 评估结果缓存文件 (JSON)，不传则只在内存中缓存
+            seed: 随机种子
+            caches: 已计算好的指标缓存 {code: IndicatorCache}，传入时忽略 nav_data
+            ranges: 只在指定行区间上评估 {code: (start, end)}，指标仍使用全区间数据
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"未知优化目标: {objective}")
+        self.objective = objective
+        self.invest_amount = invest_amount
+        self.space = space or PARAM_SPACE
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_file = cache_file
+        self.rng = random.Random(seed)
+
+        if caches is None:
+            caches = {}
+            for code, df in (nav_data or {}).items():
+                if df is None or df.empty:
+                    continue
+                caches[code] = IndicatorCache.from_frame(df)
+        if not caches:
+            raise ValueError("没有可用的净值数据")
+        self.caches = caches
+        self.nav_arrays = {code: cache.nav for code, cache in caches.items()}
+        self.ranges = ranges
+
+        # 缓存键包含数据指纹、评估区间和目标，这些变化后旧结果不会被误用
+        fingerprint = {code: [len(nav), float(nav[-1])] for code, nav in sorted(self.nav_arrays.items())}
+        self._context = param_hash({'data': fingerprint, 'objective': objective,
+                                    'invest_amount': invest_amount,
+                                    'ranges': sorted((ranges or {}).items())})
+        self.cache: Dict[str, float] = {}
+        self.evaluations = 0
+        self.cache_hits = 0
+        self._pool = None
+        self._load_cache()
+
+    # ---------- 缓存 ----------
+
+    def _key(self, params: Dict) -> str:
+        return self._context + ':' + param_hash(params)
+
+    def _load_cache(self):
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.cache = json.load(f)
+            except:
+                pass
+
+    def _save_cache(self):
+        if self.cache_file:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f)
+
+    # ---------- 评估 ----------
+
+    def evaluate(self, candidates: List[Dict]) -> List[float]:
+        """
+        评估一批候选参数，已缓存的直接返回，其余分发到进程池
+        """
+        keys = [self._key(c) for c in candidates]
+        todo = {}
+        for key, params in zip(keys, candidates):
+            if key in self.cache or key in todo:
+                self.cache_hits += 1
+            else:
+                todo[key] = params
+
+        if todo:
+            if self._pool is not None:
+                scores = list(self._pool.map(_evaluate_candidate, todo.values()))
+            else:
+                _set_optimizer_state(self.caches, self._settings())
+                scores = [_evaluate_candidate(p) for p in todo.values()]
+            self.evaluations += len(todo)
+            self.cache.update(zip(todo.keys(), scores))
+        return [self.cache[k] for k in keys]
+
+    def _settings(self) -> Dict:
+        return {'objective': self.objective, 'invest_amount': self.invest_amount,
+                'ranges': self.ranges}
+
+    def _open_pool(self):
+        if self.max_workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             initializer=_init_optimizer_worker,
+                                             initargs=(self.nav_arrays, self._settings()))
+
+    def _close_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._save_cache()
+
+    # ---------- 搜索 ----------
+
+    def _sample(self) -> Dict:
+        return {k: self.rng.choice(v) for k, v in self.space.items()}
+
+    def _result(self, best_params: Dict, best_score: float, history: List[float],
+                method: str) -> Dict:
+        print(f"✓ {method} 完成: 最优{self.objective}={best_score:.4f}, "
+              f"评估 {self.evaluations} 次, 缓存命中 {self.cache_hits} 次")
+        return {
+            'method': method,
+            'objective': self.objective,
+            'best_params': {**Config.DEFAULT_STRATEGY_PARAMS, **(best_params or {})},
+            'best_score': best_score,
+            'history': history,
+            'evaluations': self.evaluations,
+            'cache_hits': self.cache_hits,
+        }
+
+    def random_search(self, n_iter: int = 200, batch_size: int = None,
+                      patience: int = 5, min_delta: float = 1e-4) -> Dict:
+        """
+        随机搜索
+
+        Args:
+            n_iter: 最多评估的候选数
+            batch_size: 每批候选数，默认进程数的4倍
+            patience: 连续多少批没有提升 min_delta 就提前停止
+        """
+        batch_size = batch_size or self.max_workers * 4
+        best_params, best_score = None, float('-inf')
+        history, stale, done = [], 0, 0
+        self._open_pool()
+        try:
+            while done < n_iter and stale < patience:
+                batch = [self._sample() for _ in range(min(batch_size, n_iter - done))]
+                done += len(batch)
+                scores = self.evaluate(batch)
+                i = int(np.argmax(scores))
+                if scores[i] > best_score + min_delta:
+                    best_params, best_score, stale = batch[i], scores[i], 0
+                else:
+                    stale += 1
+                history.append(best_score)
+        finally:
+            self._close_pool()
+        return self._result(best_params, best_score, history, 'random')
+
+    def _mutate(self, params: Dict, rate: float) -> Dict:
+        """每个参数以 rate 的概率移动到相邻取值"""
+        child = dict(params)
+        for k, values in self.space.items():
+            if self.rng.random() < rate:
+                i = values.index(child[k]) if child[k] in values else 0
+                j = min(max(i + self.rng.choice((-1, 1)), 0), len(values) - 1)
+                child[k] = values[j]
+        return child
+
+    def _crossover(self, a: Dict, b: Dict) -> Dict:
+        """均匀交叉"""
+        return {k: (a[k] if self.rng.random() < 0.5 else b[k]) for k in self.space}
+
+    def genetic_search(self, population: int = 24, generations: int = 20,
+                       mutation_rate: float = 0.2, elite: int = 2,
+                       patience: int = 5, min_delta: float = 1e-4,
+                       seed_params: Dict = None) -> Dict:
+        """
+        遗传算法搜索
+
+        Args:
+            population: 种群大小
+            generations: 最多迭代代数
+            mutation_rate: 每个参数的变异概率
+            elite: 直接保留到下一代的最优个体数
+            patience: 连续多少代最优值没有提升 min_delta 就提前停止
+            seed_params: 加入初始种群的参数 (如当前使用的参数)
+        """
+        pop = [self._sample() for _ in range(population)]
+        if seed_params:
+            pop[0] = {k: seed_params.get(k, pop[0][k]) for k in self.space}
+
+        best_params, best_score = None, float('-inf')
+        history, stale = [], 0
+        self._open_pool()
+        try:
+            for _ in range(generations):
+                scores = self.evaluate(pop)
+                ranked = sorted(zip(scores, range(len(pop))), reverse=True)
+                top_score, top = ranked[0]
+                if top_score > best_score + min_delta:
+                    best_params, best_score, stale = pop[top], top_score, 0
+                else:
+                    stale += 1
+                history.append(best_score)
+                if stale >= patience:
+                    break
+
+                # 锦标赛选择 + 交叉 + 变异
+                def pick():
+                    a, b = self.rng.sample(range(len(pop)), 2)
+                    return pop[a] if scores[a] >= scores[b] else pop[b]
+
+                next_pop = [pop[i] for _, i in ranked[:elite]]
+                while len(next_pop) < population:
+                    next_pop.append(self._mutate(self._crossover(pick(), pick()), mutation_rate))
+                pop = next_pop
+        finally:
+            self._close_pool()
+        return self._result(best_params, best_score, history, 'genetic')
+
+    def optimize(self, method: str = 'genetic', **kwargs) -> Dict:
+        """按方法名运行搜索: 'genetic' / 'random'"""
+        if method == 'random':
+            return self.random_search(**kwargs)
+        if method == 'genetic':
+            return self.genetic_search(**kwargs)
+        raise ValueError(f"未知搜索方法: {method}")
+
+
+if __name__ == "__main__":
+    from data_fetcher import fetch_fund_data
+    import datetime
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * 3)
+    codes = ['110022', '161725', '005827']
+    nav_data = {c: fetch_fund_data(c, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+                for c in codes}
+    optimizer = ParameterOptimizer(nav_data, objective='sharpe')
+    result = optimizer.optimize('genetic')
+    print(json.dumps(result['best_params'], ensure_ascii=False, indent=2))
@@ -0,0 +1,206 @@
+# 组合回测 - 在 日期×基金 矩阵上按实盘规则回放多只基金，共享现金并限制仓位
+from typing import Dict
+import numpy as np
+import pandas as pd
+from config import Config
+from indicator_engine import align_nav_matrix, compute_indicators, forward_fill
+from backtest import summarize_arrays
+
+# 评分对应的买入份数 (与 main_integrated 中 积极/稳健/轻仓 的换算一致)
+UNITS_BY_SCORE = ((3, 3.0), (2, 1.0), (1, 0.5))
+
+
+def estimate_matrix(matrix: np.ndarray) -> np.ndarray:
+    """
+    盘中估值的近似: 当日实际涨跌幅(%)
+    实盘在14:30用估值决策、按当日净值成交，回测时用当日涨跌幅代替估值
+    """
+    est = np.full(matrix.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        est[1:] = (matrix[1:] / forward_fill(matrix)[:-1] - 1) * 100
+    return np.where(np.isnan(est), 0.0, est)
+
+
+def entry_units(ind: Dict[str, np.ndarray], est: np.ndarray) -> np.ndarray:
+    """
+    未持仓基金的买入份数 (与 monitor.analyze_fund + convert_monitor_results_to_signals 一致)
+
+    第t行使用截至t-1日的指标和t日的估值:
+      - 综合评分 (含趋势加分)，估值跌幅 > 1.5% 且 RSI < 40 时再加1分 (大跌捡漏)
+      - 建议为买入类 (评分>=1、趋势追涨、大跌捡漏) 或评分>=2 时买入，
+        份数按评分: >=3 积极3份、>=2 稳健1份、>=1 轻仓0.5份
+    """
+    base = np.zeros(est.shape)
+    score = np.zeros(est.shape)
+    rsi_prev = np.full(est.shape, np.nan)
+    base[1:] = ind['score'][:-1]
+    score[1:] = ind['trend_score'][:-1]
+    rsi_prev[1:] = ind['rsi'][:-1]
+
+    with np.errstate(invalid='ignore'):
+        dip = (est < -1.5) & (rsi_prev < 40)
+        trend = (score > base) & (score >= 2)
+    score = score + dip
+    buy_suggestion = (base >= 1) | trend | dip
+    sell_suggestion = (base <= -1) & ~trend & ~dip
+    is_buy = (buy_suggestion | (score >= 2)) & ~sell_suggestion
+
+    units = np.select([score >= s for s, _ in UNITS_BY_SCORE], [u for _, u in UNITS_BY_SCORE], 0.0)
+    return np.where(is_buy, units, 0.0)
+
+
+def exit_signal(rsi_prev: np.ndarray, profit_pct: np.ndarray) -> np.ndarray:
+    """
+    持仓基金的卖出信号 (与 monitor.analyze_fund 的持仓规则一致):
+      盈利 > 10% 且 RSI > 70 止盈；RSI > 75 严重超买 (深度被套 < -15% 时除外)
+    """
+    with np.errstate(invalid='ignore'):
+        return ((profit_pct > 10) & (rsi_prev > 70)) | ((rsi_prev > 75) & (profit_pct >= -15))
+
+
+def simulate_portfolio(matrix: np.ndarray, initial_cash: float = None, unit_amount: float = 5000.0,
+                       max_position_size: float = None, total_position_limit: float = None,
+                       use_estimates: bool = True, min_history: int = 30) -> Dict[str, np.ndarray]:
+    """
+    在净值矩阵上逐日回放
+
+    每天先处理卖出 (全部卖出，释放现金)，再按评分从高到低分配买入:
+      - 单只基金持仓市值不超过总资产的 max_position_size
+      - 总持仓市值不超过总资产的 total_position_limit
+      - 买入总额不超过可用现金
+    逐日循环只在日期维度上进行，每天的计算在所有基金上向量化完成
+
+    Args:
+        matrix: (日期数, 基金数) 净值矩阵，无净值为NaN
+        initial_cash: 初始现金，默认 Config.INITIAL_CASH
+        unit_amount: 每"份"买入金额
+        max_position_size, total_position_limit: 仓位限制，默认取 Config
+        use_estimates: 是否用当日涨跌幅模拟盘中估值 (False 时只用前一日数据决策)
+        min_history: 至少有多少条历史净值才产生信号 (与 analyze_fund 一致为30)
+
+    Returns:
+        每日 cash, holdings_value, total_asset 数组，以及成交计数和期末持仓份额
+    """
+    initial_cash = Config.INITIAL_CASH if initial_cash is None else initial_cash
+    max_position_size = Config.MAX_POSITION_SIZE if max_position_size is None else max_position_size
+    total_position_limit = Config.TOTAL_POSITION_LIMIT if total_position_limit is None else total_position_limit
+
+    n_dates, n_funds = matrix.shape
+    ind = compute_indicators(matrix)
+    price = forward_fill(matrix)
+    tradable = ~np.isnan(matrix)
+    history = np.zeros(matrix.shape, dtype=np.int64)
+    history[1:] = np.cumsum(tradable, axis=0)[:-1]
+
+    est = estimate_matrix(matrix) if use_estimates else np.zeros(matrix.shape)
+    units = entry_units(ind, est)
+    eligible = tradable & (history >= min_history)
+    units = np.where(eligible, units, 0.0)
+    rsi_prev = np.full(matrix.shape, np.nan)
+    rsi_prev[1:] = ind['rsi'][:-1]
+    # 计算持仓盈亏用的价格: 有估值时为当日净值，否则为前一日净值
+    ref_price = price if use_estimates else np.vstack([np.full((1, n_funds), np.nan), price[:-1]])
+
+    shares = np.zeros(n_funds)
+    cost = np.zeros(n_funds)
+    cash = float(initial_cash)
+    cash_series = np.empty(n_dates)
+    holdings_series = np.empty(n_dates)
+    buys = sells = 0
+
+    for t in range(n_dates):
+        p = np.nan_to_num(price[t])
+        held = shares > 0
+
+        # 1. 卖出
+        if held.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                profit_pct = np.where(held, (shares * ref_price[t] - cost) / cost * 100, np.nan)
+            sell = held & eligible[t] & exit_signal(rsi_prev[t], profit_pct)
+            if sell.any():
+                cash += float(np.sum(shares[sell] * p[sell]))
+                shares[sell] = 0.0
+                cost[sell] = 0.0
+                sells += int(sell.sum())
+                held = shares > 0
+
+        # 2. 买入 (只对未持仓基金，持仓基金的建议仓位为"-")
+        want = np.where(held, 0.0, units[t] * unit_amount)
+        if want.any():
+            position_value = shares * p
+            total_asset = cash + position_value.sum()
+            want = np.minimum(want, np.maximum(max_position_size * total_asset - position_value, 0.0))
+            budget = min(cash, max(total_position_limit * total_asset - position_value.sum(), 0.0))
+
+            order = np.argsort(-units[t], kind='stable')
+            ranked = want[order]
+            before = np.cumsum(ranked) - ranked
+            spend = np.empty(n_funds)
+            spend[order] = np.clip(budget - before, 0.0, ranked)
+            bought = spend > 0
+            if bought.any():
+                shares[bought] += spend[bought] / p[bought]
+                cost[bought] += spend[bought]
+                cash -= float(spend.sum())
+                buys += int(bought.sum())
+
+        cash_series[t] = cash
+        holdings_series[t] = float(np.sum(shares * p))
+
+    return {
+        'cash': cash_series,
+        'holdings_value': holdings_series,
+        'total_asset': cash_series + holdings_series,
+        'buys': buys,
+        'sells': sells,
+        'final_shares': shares,
+    }
+
+
+def run_portfolio_backtest(nav_data: Dict[str, pd.DataFrame], initial_cash: float = None,
+                           unit_amount: float = 5000.0, max_position_size: float = None,
+                           total_position_limit: float = None, use_estimates: bool = True) -> Dict:
+    """
+    多基金组合回测
+
+    Args:
+        nav_data: 历史净值 {code: DataFrame(date, nav)}
+        其余参数见 simulate_portfolio
+
+    Returns:
+        {'daily': 每日资产DataFrame, 'summary': 汇总指标, 'holdings': 期末持仓份额}
+    """
+    initial_cash = Config.INITIAL_CASH if initial_cash is None else initial_cash
+    dates, codes, matrix = align_nav_matrix(nav_data)
+    if not codes:
+        return {'daily': pd.DataFrame(), 'summary': {}, 'holdings': {}}
+    result = simulate_portfolio(matrix, initial_cash, unit_amount, max_position_size,
+                                total_position_limit, use_estimates)
+
+    total = result['total_asset']
+    daily = pd.DataFrame({
+        'date': dates,
+        'cash': result['cash'],
+        'holdings_value': result['holdings_value'],
+        'total_asset': total,
+        'position_ratio': result['holdings_value'] / total,
+    })
+    # 没有外部资金流入，累计投入恒为初始资金
+    summary = summarize_arrays(np.full(len(total), float(initial_cash)), total)
+    summary.update({'buys': result['buys'], 'sells': result['sells'], 'funds': len(codes)})
+    holdings = {code: float(s) for code, s in zip(codes, result['final_shares']) if s > 0}
+    return {'daily': daily, 'summary': summary, 'holdings': holdings}
+
+
+if __name__ == "__main__":
+    from data_fetcher import fetch_fund_data
+    import datetime
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * 5)
+    codes = ['110022', '161725', '005827', '513500']
+    nav_data = {c: fetch_fund_data(c, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+                for c in codes}
+    result = run_portfolio_backtest(nav_data)
+    for key, value in result['summary'].items():
+        print(f"{key}: {value}")
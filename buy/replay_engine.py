@@ -0,0 +1,260 @@
+# 历史回放引擎 - 用本地净值数据按模拟时钟逐日驱动完整的智能体流程
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from config import Config
+from clock import SimulatedClock
+from trading_storage import MemoryStorage
+from virtual_trading import VirtualTradingEngine
+from strategy_evolution import AdaptiveStrategyOptimizer, StrategyEvolver
+from risk_simulator import RiskSimulator
+from auto_agent import AutoTradingAgent
+from monitor import analyze_fund_state
+from streaming_indicators import FundIndicatorState
+from main_integrated import convert_monitor_results_to_signals
+from backtest import summarize_arrays
+
+
+class StageTimer:
+    """分阶段累计耗时 (time.perf_counter)"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def report(self, days: int = None) -> pd.DataFrame:
+        """
+        各阶段耗时汇总
+
+        Returns:
+            DataFrame(stage, calls, total_seconds, ms_per_day, share)，按总耗时降序
+        """
+        total = sum(self.totals.values()) or 1.0
+        days = days or 1
+        rows = [
+            {'stage': name, 'calls': self.counts[name], 'total_seconds': seconds,
+             'ms_per_day': seconds / days * 1000, 'share': seconds / total}
+            for name, seconds in self.totals.items()
+        ]
+        if not rows:
+            return pd.DataFrame(columns=['stage', 'calls', 'total_seconds', 'ms_per_day', 'share'])
+        return pd.DataFrame(rows).sort_values('total_seconds', ascending=False).reset_index(drop=True)
+
+
+class ReplayEngine:
+    """
+    历史回放引擎
+
+    每个模拟日 D (模拟时钟设为D) 依次执行:
+      1. execute  - 按D日净值成交之前生成的待执行信号 (次日成交)
+      2. monitor  - 对每只基金按 analyze_fund 的规则打分: 截至D-1日的历史 + D日涨跌幅作为盘中估值
+                    (指标由增量状态逐日更新，与对整段历史调用 analyze_fund 结果相同)
+      3. convert  - convert_monitor_results_to_signals 转为标准信号
+      4. ingest / optimize / dashboard - AutoTradingAgent.on_monitor_completion
+         (写入信号、记录D日快照并进化参数、生成仪表板)
+    引擎使用内存存储，进化历史不落盘，整个回放过程没有逐日文件读写
+    """
+
+    def __init__(self, nav_data: Dict[str, pd.DataFrame], initial_cash: float = None,
+                 unit_amount: float = 5000.0, start: str = None, end: str = None,
+                 use_estimates: bool = True, include_hold: bool = False,
+                 fund_names: Dict[str, str] = None, risk_simulator: RiskSimulator = None):
+        """
+        Args:
+            nav_data: 历史净值 {code: DataFrame(date, nav)}
+            initial_cash: 初始资金，默认 Config.INITIAL_CASH
+            unit_amount: 每"份"的金额 (建议仓位 积极3份/稳健1份/轻仓0.5份 乘以该金额)
+            start, end: 回放区间 (含两端)，默认全部日期；之前的数据只作为指标历史
+            use_estimates: 是否用当日涨跌幅模拟盘中估值
+            include_hold: 是否把 HOLD 信号也写入引擎
+                (HOLD 永远不会成交，会一直留在待执行列表中，默认不写入)
+            fund_names: 基金名称 {code: name}
+            risk_simulator: 风险模拟器，设置后每日评估附带持仓的模拟风险指标
+                (其 nav_data 每日替换为截至D日的回放净值，不使用未来数据；默认不模拟)
+        """
+        self.initial_cash = Config.INITIAL_CASH if initial_cash is None else initial_cash
+        self.unit_amount = unit_amount
+        self.use_estimates = use_estimates
+        self.include_hold = include_hold
+        self.fund_names = fund_names or {}
+
+        self.frames: Dict[str, pd.DataFrame] = {}
+        self._dates: Dict[str, np.ndarray] = {}
+        self._navs: Dict[str, np.ndarray] = {}
+        for code, df in nav_data.items():
+            if df is None or df.empty:
+                continue
+            df = df.dropna(subset=['nav']).sort_values('date').reset_index(drop=True)
+            df['date'] = pd.to_datetime(df['date'])
+            self.frames[code] = df
+            self._dates[code] = df['date'].to_numpy()
+            self._navs[code] = df['nav'].to_numpy(dtype=float)
+        # 每只基金的增量指标状态 (state.count 即已推入的净值行数)
+        self._states = {code: FundIndicatorState() for code in self.frames}
+
+        all_dates = pd.DatetimeIndex(np.unique(np.concatenate(list(self._dates.values())))) \
+            if self._dates else pd.DatetimeIndex([])
+        if start is not None:
+            all_dates = all_dates[all_dates >= pd.Timestamp(start)]
+        if end is not None:
+            all_dates = all_dates[all_dates <= pd.Timestamp(end)]
+        self.dates = all_dates
+
+        # 模拟时钟 + 内存存储 + 共享同一个引擎的优化器
+        self.clock = SimulatedClock()
+        self.timer = StageTimer()
+        self.engine = VirtualTradingEngine(self.initial_cash, storage=MemoryStorage())
+        optimizer = AdaptiveStrategyOptimizer(
+            engine=self.engine,
+            evolver=StrategyEvolver(evolution_log=None, clock=self.clock),
+            clock=self.clock, risk_simulator=risk_simulator)
+        self.risk_simulator = risk_simulator
+        self.agent = AutoTradingAgent(self.initial_cash, engine=self.engine, optimizer=optimizer,
+                                      clock=self.clock, timer=self.timer)
+
+    # ---------- 单日步骤 ----------
+
+    def _prices_on(self, day: np.datetime64) -> Dict[str, float]:
+        """D日有净值的基金的净值"""
+        prices = {}
+        for code, dates in self._dates.items():
+            i = int(np.searchsorted(dates, day))
+            if i < len(dates) and dates[i] == day:
+                prices[code] = float(self._navs[code][i])
+        return prices
+
+    def _history_until(self, day: np.datetime64) -> Dict[str, pd.DataFrame]:
+        """持仓基金截至D日 (含) 的净值"""
+        history = {}
+        for code in self.engine.current_holdings:
+            if code in self.frames:
+                end = int(np.searchsorted(self._dates[code], day, side='right'))
+                history[code] = self.frames[code].iloc[:end]
+        return history
+
+    def _held_info(self) -> Dict[str, Dict]:
+        """持仓成本 (来自批次账本)，格式同 monitor.load_holdings_info"""
+        info = {}
+        for code in self.engine.current_holdings:
+            lots = self.engine.ledger.get(code)
+            info[code] = {'cost': lots.avg_cost if lots else 0.0}
+        return info
+
+    def _monitor(self, day: np.datetime64) -> List[Dict]:
+        """D日14:30的监控结果: 历史截至D-1日，D日涨跌幅作为估值"""
+        held_info = self._held_info()
+        results = []
+        for code, state in self._states.items():
+            dates = self._dates[code]
+            pos = int(np.searchsorted(dates, day))   # D日之前的行数
+            for i in range(state.count, pos):        # 推入D日之前尚未推入的净值
+                state.update(self._navs[code][i])
+            if pos < 30:
+                continue
+            rt_row = None
+            if self.use_estimates and pos < len(dates) and dates[pos] == day:
+                change = (self._navs[code][pos] / self._navs[code][pos - 1] - 1) * 100
+                rt_row = {'基金代码': code, '基金名称': self.fund_names.get(code, code),
+                          '估算涨跌幅': round(float(change), 2)}
+            row = analyze_fund_state(code, state, rt_row, held_info)
+            if row is not None:
+                results.append(row)
+        return results
+
+    def _to_signals(self, results: List[Dict], date: str, prices: Dict[str, float]) -> Dict:
+        """转为智能体输入: 份数换算成金额，D日净值作为估值价格"""
+        converted = convert_monitor_results_to_signals(results)
+        signals = []
+        for signal in converted['signals']:
+            if signal['signal'] == 'HOLD' and not self.include_hold:
+                continue
+            signal['suggested_amount'] = signal['suggested_amount'] * self.unit_amount
+            signals.append(signal)
+        return {'date': date, 'signals': signals, 'prices': prices}
+
+    def step(self, day) -> Dict:
+        """
+        回放一个模拟日
+
+        Returns:
+            当日记录 {date, signals, executed, cash, total_asset}
+        """
+        day = np.datetime64(pd.Timestamp(day), 'ns')
+        date = str(pd.Timestamp(day).date())
+        self.clock.set(date)
+        prices = self._prices_on(day)
+
+        execution = self.agent.execute_pending_signals(prices)
+        with self.timer.stage('monitor'):
+            results = self._monitor(day)
+        with self.timer.stage('convert'):
+            monitor_results = self._to_signals(results, date, prices)
+        if self.risk_simulator is not None:
+            self.risk_simulator.nav_data = self._history_until(day)
+        self.agent.on_monitor_completion(monitor_results)
+
+        curve = self.engine.equity_curve
+        return {
+            'date': date,
+            'signals': len(monitor_results['signals']),
+            'executed': execution['executed_count'],
+            'cash': self.engine.current_cash,
+            'total_asset': curve.total_asset[-1] if len(curve) else self.engine.current_cash,
+        }
+
+    # ---------- 回放 ----------
+
+    def run(self) -> Dict:
+        """
+        回放全部日期
+
+        Returns:
+            {'daily': 每日记录DataFrame, 'summary': 汇总指标, 'timings': 各阶段耗时}
+        """
+        started = time.perf_counter()
+        rows = [self.step(day) for day in self.dates]
+        elapsed = time.perf_counter() - started
+
+        daily = pd.DataFrame(rows, columns=['date', 'signals', 'executed', 'cash', 'total_asset'])
+        summary = {}
+        if rows:
+            total = daily['total_asset'].to_numpy(dtype=float)
+            summary = summarize_arrays(np.full(len(total), float(self.initial_cash)), total)
+            summary['trades'] = int(daily['executed'].sum())
+        summary['elapsed_seconds'] = elapsed
+        timings = self.timer.report(len(rows))
+
+        print(f"✓ 回放 {len(rows)} 个交易日, 耗时 {elapsed:.2f}s "
+              f"({elapsed / max(len(rows), 1) * 1000:.1f} ms/日), 成交 {summary.get('trades', 0)} 笔")
+        return {'daily': daily, 'summary': summary, 'timings': timings}
+
+
+def replay_history(nav_data: Dict[str, pd.DataFrame], **kwargs) -> Dict:
+    """回放历史 (参数见 ReplayEngine)"""
+    return ReplayEngine(nav_data, **kwargs).run()
+
+
+if __name__ == "__main__":
+    from data_fetcher import fetch_fund_data
+    import datetime
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * 3)
+    codes = ['110022', '161725', '005827']
+    nav_data = {c: fetch_fund_data(c, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+                for c in codes}
+    result = replay_history(nav_data)
+    for key, value in result['summary'].items():
+        print(f"{key}: {value}")
+    print(result['timings'].to_string(index=False))
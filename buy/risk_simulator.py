@@ -0,0 +1,234 @@
+# 风险模拟器 - 对虚拟账户当前持仓做历史收益块自助法 (block bootstrap) 蒙特卡洛模拟
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from config import Config
+from clock import SystemClock
+from indicator_engine import align_nav_matrix, forward_fill
+
+# 每个任务模拟的路径数 (固定分块，结果与进程数无关)
+CHUNK_PATHS = 5000
+
+# VaR/CVaR 置信度与回撤分位
+CONFIDENCE_LEVELS = (0.95, 0.99)
+DRAWDOWN_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def daily_returns(nav_data: Dict[str, pd.DataFrame], lookback: int = None) -> Tuple[List[str], np.ndarray]:
+    """
+    多只基金按日期对齐后的日收益率矩阵
+
+    缺失净值 (节假日不同步等) 按前值填充；任一基金尚未成立的日期整行丢弃，
+    保证同一行是同一天的收益 (抽样时保留基金之间的相关性)
+
+    Returns:
+        (codes, returns)，returns 形状为 (日期数-1, 基金数)，只保留最近 lookback 行
+    """
+    _, codes, matrix = align_nav_matrix(nav_data)
+    if not codes or len(matrix) < 2:
+        return codes, np.empty((0, len(codes)))
+    filled = forward_fill(matrix)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = filled[1:] / filled[:-1] - 1
+    returns = returns[~np.isnan(returns).any(axis=1)]
+    if lookback:
+        returns = returns[-lookback:]
+    return codes, returns
+
+
+def _simulate_chunk(task: tuple) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    模拟一批路径
+
+    Returns:
+        (期末盈亏, 路径最大回撤)，长度均为路径数
+    """
+    returns, position_values, cash, horizon, block_size, n_paths, seed = task
+    rng = np.random.default_rng(seed)
+    n_rows = len(returns)
+    n_blocks = -(-horizon // block_size)
+
+    # 循环块自助: 每条路径随机选 n_blocks 个起点，各取连续 block_size 天 (越界回绕)
+    starts = rng.integers(0, n_rows, size=(n_paths, n_blocks))
+    rows = (starts[:, :, None] + np.arange(block_size)) % n_rows
+    rows = rows.reshape(n_paths, -1)[:, :horizon]
+
+    growth = np.cumprod(1 + returns[rows], axis=1)          # (路径, 天, 基金)
+    initial = cash + position_values.sum()
+    values = np.empty((n_paths, horizon + 1))
+    values[:, 0] = initial
+    values[:, 1:] = cash + growth @ position_values
+
+    peak = np.maximum.accumulate(values, axis=1)
+    drawdown = np.max(1 - values / peak, axis=1)
+    return values[:, -1] - initial, drawdown
+
+
+def simulate_paths(returns: np.ndarray, position_values: np.ndarray, cash: float,
+                   horizon: int = None, n_paths: int = None, block_size: int = None,
+                   seed: int = None, max_workers: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    块自助法模拟组合价值路径
+
+    Args:
+        returns: (日期数, 基金数) 历史日收益率
+        position_values: 各基金当前持仓市值
+        cash: 现金 (不产生收益)
+        horizon: 模拟天数，默认 Config.RISK_HORIZON_DAYS
+        n_paths: 路径数，默认 Config.RISK_PATHS
+        block_size: 块长度，默认 Config.RISK_BLOCK_SIZE
+        seed: 随机种子 (相同种子结果相同，与 max_workers 无关)
+        max_workers: 进程数，路径数很大时可多进程并行
+
+    Returns:
+        (期末盈亏, 路径最大回撤)
+    """
+    horizon = horizon or Config.RISK_HORIZON_DAYS
+    n_paths = n_paths or Config.RISK_PATHS
+    block_size = min(block_size or Config.RISK_BLOCK_SIZE, len(returns))
+    position_values = np.asarray(position_values, dtype=float)
+
+    sizes = [CHUNK_PATHS] * (n_paths // CHUNK_PATHS)
+    if n_paths % CHUNK_PATHS:
+        sizes.append(n_paths % CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(returns, position_values, float(cash), horizon, block_size, size, s)
+             for size, s in zip(sizes, seeds)]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    else:
+        results = [_simulate_chunk(t) for t in tasks]
+    return (np.concatenate([r[0] for r in results]),
+            np.concatenate([r[1] for r in results]))
+
+
+def risk_report(pnl: np.ndarray, drawdown: np.ndarray, initial_value: float) -> Dict:
+    """
+    由模拟结果计算风险指标
+
+    VaR/CVaR 为正数表示损失金额 (pct 为占当前总资产的比例)；
+    回撤分位为各路径最大回撤的分位数
+    """
+    report = {
+        'initial_value': float(initial_value),
+        'expected_pnl': float(pnl.mean()),
+        'prob_loss': float((pnl < 0).mean()),
+    }
+    for level in CONFIDENCE_LEVELS:
+        tag = int(round(level * 100))
+        var = -float(np.quantile(pnl, 1 - level))
+        tail = pnl[pnl <= -var]
+        cvar = -float(tail.mean()) if len(tail) else var
+        report[f'var_{tag}'] = var
+        report[f'cvar_{tag}'] = cvar
+        report[f'var_{tag}_pct'] = var / initial_value if initial_value > 0 else 0.0
+        report[f'cvar_{tag}_pct'] = cvar / initial_value if initial_value > 0 else 0.0
+    for q in DRAWDOWN_QUANTILES:
+        report[f'drawdown_p{int(round(q * 100))}'] = float(np.quantile(drawdown, q))
+    return report
+
+
+class RiskSimulator:
+    """虚拟账户持仓的风险模拟器"""
+
+    def __init__(self, nav_data: Dict[str, pd.DataFrame] = None, store=None,
+                 horizon: int = None, n_paths: int = None, block_size: int = None,
+                 lookback: int = None, seed: int = None, max_workers: int = 1, clock=None):
+        """
+        Args:
+            nav_data: 历史净值 {code: DataFrame(date, nav)}，不传时从净值库读取持仓基金
+            store: 净值库，默认 nav_store.get_nav_store()
+            horizon, n_paths, block_size: 见 simulate_paths
+            lookback: 抽样使用的历史交易日数，默认 Config.RISK_LOOKBACK_DAYS
+            seed: 随机种子
+            max_workers: 模拟进程数
+            clock: 时钟 (从净值库读取的区间截至其今天)，默认由优化器设置为其时钟，否则为系统时间
+        """
+        self.nav_data = nav_data
+        self.store = store
+        self.horizon = horizon or Config.RISK_HORIZON_DAYS
+        self.n_paths = n_paths or Config.RISK_PATHS
+        self.block_size = block_size or Config.RISK_BLOCK_SIZE
+        self.lookback = lookback or Config.RISK_LOOKBACK_DAYS
+        self.seed = seed
+        self.max_workers = max_workers
+        self.clock = clock
+
+    def _history(self, codes: List[str]) -> Dict[str, pd.DataFrame]:
+        """持仓基金的历史净值"""
+        if not codes:
+            return {}   # 空仓时不打开净值库
+        if self.nav_data is not None:
+            return {code: self.nav_data[code] for code in codes if code in self.nav_data}
+        if self.store is None:
+            from nav_store import get_nav_store
+            self.store = get_nav_store()
+        # 交易日约占自然日的 2/3，多取一些保证有 lookback 个交易日
+        today = (self.clock or SystemClock()).today()
+        start = (today - datetime.timedelta(days=int(self.lookback * 1.6))).isoformat()
+        return {code: self.store.load(code, start=start, end=today.isoformat()) for code in codes}
+
+    def simulate(self, holdings: Dict[str, float], cash: float,
+                 prices: Dict[str, float]) -> Dict:
+        """
+        模拟给定持仓的未来价值分布
+
+        Args:
+            holdings: {code: 份额}
+            cash: 现金
+            prices: {code: 当前净值}
+
+        Returns:
+            风险指标 (见 risk_report)，另含 horizon / n_paths / funds
+        """
+        history = self._history([c for c, s in holdings.items() if s > 0])
+        codes, returns = daily_returns(history, self.lookback)
+        missing = [c for c, s in holdings.items() if s > 0 and c not in codes]
+        if missing:
+            print(f"⚠️ 以下持仓没有历史净值，按价格不变处理: {missing}")
+
+        # 没有当前价格时用最后一条历史净值
+        position_values = np.array([
+            holdings[c] * (prices.get(c) or float(history[c]['nav'].iloc[-1])) for c in codes])
+        fixed = sum(holdings[c] * prices.get(c, 0) for c in missing)
+        initial = cash + fixed + position_values.sum()
+
+        if len(codes) == 0 or len(returns) == 0 or position_values.sum() <= 0:
+            pnl = drawdown = np.zeros(1)
+        else:
+            pnl, drawdown = simulate_paths(returns, position_values, cash + fixed,
+                                           self.horizon, self.n_paths, self.block_size,
+                                           self.seed, self.max_workers)
+        report = risk_report(pnl, drawdown, initial)
+        report.update({'horizon': self.horizon, 'n_paths': len(pnl), 'funds': codes})
+        return report
+
+    def simulate_engine(self, engine, current_prices: Dict[str, float] = None) -> Dict:
+        """
+        模拟虚拟交易引擎当前持仓和现金
+
+        Args:
+            engine: VirtualTradingEngine
+            current_prices: 当前价格，缺失时沿用引擎最近一次快照的价格
+        """
+        current_prices = current_prices or {}
+        prices = {
+            code: current_prices.get(code) or engine.last_prices.get(code, 0)
+            for code in engine.current_holdings
+        }
+        return self.simulate(engine.current_holdings, engine.current_cash, prices)
+
+
+if __name__ == "__main__":
+    from virtual_trading import VirtualTradingEngine
+
+    engine = VirtualTradingEngine()
+    report = RiskSimulator(seed=0).simulate_engine(engine)
+    for key, value in report.items():
+        print(f"{key}: {value}")
@@ -0,0 +1,139 @@
+# 规则策略回测 - 按智能体的交易规则 (评分买入、止盈止损、亏损补仓) 逐日模拟
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from config import Config
+from indicator_engine import rolling_mean, rsi, bollinger_bands
+from backtest import summarize_arrays
+
+
+class IndicatorCache:
+    """
+    单只基金的指标缓存
+
+    同一窗口的均线/RSI只计算一次，参数搜索中大量候选共享同一组指标；
+    指标只依赖历史数据，可在全区间上预先计算后按任意子区间切片使用
+    """
+
+    def __init__(self, nav: np.ndarray, dates: np.ndarray = None):
+        self.nav = np.asarray(nav, dtype=float)
+        self.dates = dates
+        self._column = self.nav.reshape(-1, 1)
+        self._ma: Dict[int, np.ndarray] = {}
+        self._rsi: Dict[int, np.ndarray] = {}
+        self._bb_lower: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_frame(cls, fund_data: pd.DataFrame) -> 'IndicatorCache':
+        df = fund_data.dropna(subset=['nav']).sort_values('date')
+        return cls(df['nav'].to_numpy(dtype=float), df['date'].to_numpy())
+
+    def __len__(self) -> int:
+        return len(self.nav)
+
+    def ma(self, window: int) -> np.ndarray:
+        window = int(window)
+        if window not in self._ma:
+            self._ma[window] = rolling_mean(self._column, window)[:, 0]
+        return self._ma[window]
+
+    def rsi(self, window: int) -> np.ndarray:
+        window = int(window)
+        if window not in self._rsi:
+            self._rsi[window] = rsi(self._column, window)[:, 0]
+        return self._rsi[window]
+
+    def bb_lower(self) -> np.ndarray:
+        if self._bb_lower is None:
+            self._bb_lower = bollinger_bands(self._column, 20)[2][:, 0]
+        return self._bb_lower
+
+
+def rule_scores(cache: IndicatorCache, params: Dict) -> np.ndarray:
+    """
+    逐日综合评分 (与 composite_signal_strategy 相同的打分规则，阈值取自参数)
+    """
+    nav = cache.nav
+    rsi_values = cache.rsi(params['rsi_window'])
+    oversold = params['rsi_oversold']
+    with np.errstate(invalid='ignore'):
+        score = (nav > cache.ma(params['ma_window'])).astype(float)
+        score += np.where(rsi_values < oversold, 2.0,
+                          np.where(rsi_values < oversold + 10, 1.0, 0.0))
+        score += np.where(nav < cache.bb_lower(), 2.0, 0.0)
+        score -= np.where(rsi_values > params['rsi_overbought'], 2.0, 0.0)
+    return score
+
+
+def simulate_rules(cache: IndicatorCache, params: Dict = None, invest_amount: float = 1000.0,
+                   start: int = 0, end: int = None) -> Dict[str, np.ndarray]:
+    """
+    按规则逐日模拟单只基金的交易
+
+    规则:
+      - 评分 >= buy_score_threshold 时买入 invest_amount
+      - 持仓收益 >= profit_take_threshold 止盈、<= loss_cut_threshold 止损、
+        RSI > sell_threshold 卖出，均为全部卖出
+      - 持仓收益 <= dca_loss_threshold 时补仓 invest_amount (每日最多买入一份)
+      - 卖出所得留作现金，之后的买入优先使用现金，不足部分为新增投入
+
+    Args:
+        cache: 指标缓存
+        params: 策略参数，缺省项取 Config.DEFAULT_STRATEGY_PARAMS
+        invest_amount: 每次买入金额
+        start, end: 模拟的行区间 [start, end)，指标使用全区间数据计算
+
+    Returns:
+        {'total_invest': 每日累计投入, 'market_value': 每日市值(含现金), 'trades': 成交次数}
+    """
+    p = {**Config.DEFAULT_STRATEGY_PARAMS, **(params or {})}
+    end = len(cache) if end is None else end
+    nav = cache.nav[start:end].tolist()
+    score = rule_scores(cache, p)[start:end].tolist()
+    rsi_values = cache.rsi(p['rsi_window'])[start:end].tolist()
+
+    buy_threshold = p['buy_score_threshold']
+    sell_rsi = p['sell_threshold']
+    take_profit = p['profit_take_threshold']
+    loss_cut = p['loss_cut_threshold']
+    dca_loss = p['dca_loss_threshold']
+
+    total_invest = np.empty(len(nav))
+    market_value = np.empty(len(nav))
+    cash = shares = cost = invested = 0.0
+    trades = 0
+    for t, price in enumerate(nav):
+        buy = score[t] >= buy_threshold
+        sell = False
+        if shares > 0:
+            pnl = shares * price / cost - 1
+            if pnl >= take_profit or pnl <= loss_cut or rsi_values[t] > sell_rsi:
+                sell = True
+            elif pnl <= dca_loss:
+                buy = True
+
+        if sell:
+            cash += shares * price
+            shares = cost = 0.0
+            trades += 1
+        elif buy:
+            from_cash = min(cash, invest_amount)
+            cash -= from_cash
+            invested += invest_amount - from_cash
+            shares += invest_amount / price
+            cost += invest_amount
+            trades += 1
+
+        total_invest[t] = invested
+        market_value[t] = shares * price + cash
+
+    return {'total_invest': total_invest, 'market_value': market_value, 'trades': trades}
+
+
+def evaluate_rules(cache: IndicatorCache, params: Dict = None, invest_amount: float = 1000.0,
+                   start: int = 0, end: int = None) -> Dict:
+    """模拟并汇总指标 (收益率、波动率、夏普、最大回撤、成交次数)"""
+    result = simulate_rules(cache, params, invest_amount, start, end)
+    summary = summarize_arrays(result['total_invest'], result['market_value'])
+    summary['trades'] = result['trades']
+    return summary
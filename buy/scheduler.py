@@ -1,127 +1,490 @@
 # 定时调度器 - 每日自动运行策略
-import schedule
+import heapq
+import inspect
+import itertools
+import threading
 import time
 import datetime
 import pytz
-from typing import Callable, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 import json
+import os
+from config import Config
+from trading_calendar import TradingCalendar
+
+
+# 上一次运行尚未结束时又到执行时间的处理方式
+OVERLAP_POLICIES = ("skip", "queue", "cancel")
+
+
+class ScheduledJob:
+    """一个每日定时任务及其运行状态"""
+
+    def __init__(self, name: str, at: datetime.time, func: Callable, args: tuple,
+                 kwargs: dict, overlap: str, trading_days_only: bool = True,
+                 catch_up: bool = False):
+        self.name = name
+        self.at = at
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.overlap = overlap
+        self.trading_days_only = trading_days_only
+        self.catch_up = catch_up
+        self.next_run: Optional[datetime.datetime] = None   # 下次执行时间 (带时区)
+        self.running = 0             # 正在运行的次数
+        self.queued = deque()        # 排队等待的运行日期 (queue 策略)
+        self.cancel_event: Optional[threading.Event] = None  # 当前运行的取消标志
+        self.catching_up = False     # 正在补跑之前的交易日
+        # 任务函数接受 cancel_event / run_date 参数时传入取消标志 (cancel 策略需要任务自行检查)
+        # 和本次运行对应的日期 (补跑时为错过的交易日)
+        try:
+            params = inspect.signature(func).parameters
+        except (TypeError, ValueError):
+            params = {}
+        self.accepts_cancel = 'cancel_event' in params
+        self.accepts_run_date = 'run_date' in params
 
 
 class DailyScheduler:
-    """每日定时调度器"""
-    
-    def __init__(self, timezone: str = 'Asia/Shanghai'):
+    """
+    每日定时调度器
+
+    按时区计算每个任务的下次执行时间放入最小堆，调度线程睡眠到最早的任务到期
+    (新增任务或停止时立即唤醒)，到期任务交给线程池执行，慢任务不会推迟其他任务。
+    默认只在交易日运行；每个任务成功运行的日期以及失败/跳过/取消的日期记录在状态文件中，
+    重启时 catch_up 任务在线程池中按时间顺序补跑错过的交易日 (不推迟当天的其他任务)
+    """
+
+    def __init__(self, timezone: str = None, max_workers: int = 4,
+                 calendar: TradingCalendar = None):
         """
         初始化调度器
-        
+
         Args:
-            timezone: 时区
+            timezone: 时区，默认 Config.TIMEZONE
+            max_workers: 执行任务的线程数
+            calendar: 交易日历，默认 TradingCalendar.default()
         """
-        self.timezone = pytz.timezone(timezone)
-        self.jobs = {}
+        self.timezone = pytz.timezone(timezone or Config.TIMEZONE)
+        self.calendar = calendar or TradingCalendar.default()
+        self.jobs: Dict[str, ScheduledJob] = {}
         self.execution_log = "scheduler_execution.json"
-    
-    def schedule_daily_job(self, job_name: str, time_str: str, 
-                          job_func: Callable, *args, **kwargs):
+        self.state_file = Config.DATA_FILES['scheduler_state']
+        self.max_workers = max_workers
+        self._state: Optional[Dict[str, Dict]] = None   # 运行记录 (见 _load_state)
+
+        self._heap = []                  # [(下次执行的UTC时间戳, 序号, 任务名)]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._log_lock = threading.Lock()
+        self._stopped = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- 时间 ----------
+
+    def now(self) -> datetime.datetime:
+        """调度时区的当前时间"""
+        return datetime.datetime.now(self.timezone)
+
+    @staticmethod
+    def _parse_time(time_str: str) -> datetime.time:
+        """解析 "HH:MM" 或 "HH:MM:SS" """
+        parts = [int(p) for p in time_str.split(':')]
+        if len(parts) not in (2, 3):
+            raise ValueError(f"时间格式应为 HH:MM 或 HH:MM:SS: {time_str}")
+        return datetime.time(*parts)
+
+    def _next_run(self, job: ScheduledJob, after: datetime.datetime) -> datetime.datetime:
+        """after 之后 (不含) 任务的下一个执行时间 (trading_days_only 时跳过非交易日)"""
+        day = after.astimezone(self.timezone).date()
+        while True:
+            if not job.trading_days_only or self.calendar.is_trading_day(day):
+                # localize 按该日期的时区规则换算，夏令时切换日也正确
+                candidate = self.timezone.localize(datetime.datetime.combine(day, job.at))
+                if candidate > after:
+                    return candidate
+            day += datetime.timedelta(days=1)
+
+    def _push(self, job: ScheduledJob):
+        heapq.heappush(self._heap, (job.next_run.timestamp(), next(self._seq), job.name))
+
+    # ---------- 安排任务 ----------
+
+    def schedule_daily_job(self, job_name: str, time_str: str,
+                          job_func: Callable, *args, overlap: str = "skip",
+                          trading_days_only: bool = True, catch_up: bool = False, **kwargs):
         """
         安排每日定时任务
-        
+
         Args:
             job_name: 任务名称
-            time_str: 执行时间，格式 "HH:MM" (24小时制)
+            time_str: 执行时间，格式 "HH:MM" 或 "HH:MM:SS" (24小时制，调度时区)
             job_func: 要执行的函数
+            overlap: 上次运行未结束时的处理方式
+                     "skip" 跳过本次 / "queue" 上次结束后再运行 /
+                     "cancel" 通知上次运行取消 (任务函数需接受 cancel_event 参数并自行检查) 后立即运行
+            trading_days_only: 只在交易日运行
+            catch_up: 启动时补跑停机期间错过的交易日 (任务函数应接受 run_date 参数，
+                      否则每次补跑都按当天处理)
             *args, **kwargs: 传递给函数的参数
         """
-        def wrapper():
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"未知的重叠处理方式: {overlap}")
+        job = ScheduledJob(job_name, self._parse_time(time_str), job_func, args, kwargs, overlap,
+                           trading_days_only=trading_days_only, catch_up=catch_up)
+        with self._cond:
+            self.jobs[job_name] = job
+            job.next_run = self._next_run(job, self.now())
+            self._push(job)
+            self._cond.notify()
+        print(f"✓ 已安排任务: {job_name} 在每天 {time_str} 执行 ({self.timezone.zone})")
+
+    def cancel_job(self, job_name: str):
+        """取消任务 (堆中的旧条目在到期时被忽略)"""
+        with self._cond:
+            self.jobs.pop(job_name, None)
+            self._cond.notify()
+
+    def next_run_time(self, job_name: str) -> Optional[datetime.datetime]:
+        job = self.jobs.get(job_name)
+        return job.next_run if job else None
+
+    # ---------- 执行 ----------
+
+    def run_job_now(self, job_name: str):
+        """立即按重叠策略提交一次任务 (不影响定时计划)"""
+        with self._cond:
+            job = self.jobs[job_name]
+            self._dispatch(job)
+
+    def _dispatch(self, job: ScheduledJob, run_date: datetime.date = None):
+        """按重叠策略提交任务 (调用方持有 self._cond)"""
+        if job.running:
+            # 正在补跑之前的交易日时排队，保证同一任务按日期顺序运行
+            if job.overlap == "queue" or job.catching_up:
+                job.queued.append(run_date)
+                print(f"[{self.now()}] 任务仍在运行，排队等待: {job.name}")
+                return
+            if job.overlap == "skip":
+                print(f"[{self.now()}] 任务仍在运行，跳过本次: {job.name}")
+                self._log_execution(job.name, "跳过", "上次运行尚未结束")
+                if run_date is not None:
+                    self._record_missed(job.name, run_date)
+                return
+            if job.cancel_event is not None:   # cancel
+                job.cancel_event.set()
+                print(f"[{self.now()}] 已通知上次运行取消: {job.name}")
+
+        cancel_event = threading.Event()
+        job.cancel_event = cancel_event
+        job.running += 1
+        self._submit(self._run, job, cancel_event, run_date)
+
+    def _submit(self, func: Callable, *args):
+        """提交到线程池 (调用方持有 self._cond)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="scheduler")
+        self._executor.submit(func, *args)
+
+    def _run(self, job: ScheduledJob, cancel_event: threading.Event,
+             run_date: datetime.date = None):
+        """执行任务并记录结果 (调用前 job.running 已加1)"""
+        try:
+            self._execute(job, cancel_event, run_date)
+        finally:
+            self._release(job, cancel_event)
+
+    def _execute(self, job: ScheduledJob, cancel_event: threading.Event,
+                 run_date: datetime.date = None):
+        """执行任务函数，记录日志和运行日期 (失败、取消的日期留待补跑)"""
+        kwargs = dict(job.kwargs)
+        if job.accepts_cancel:
+            kwargs['cancel_event'] = cancel_event
+        if job.accepts_run_date:
+            kwargs['run_date'] = run_date
+        label = f"{job.name} ({run_date})" if run_date else job.name
+        try:
+            print(f"[{self.now()}] 开始执行任务: {label}")
+            result = job.func(*job.args, **kwargs)
+            if cancel_event.is_set():
+                self._log_execution(job.name, "已取消", result)
+                if run_date is not None:
+                    self._record_missed(job.name, run_date)
+                print(f"[{self.now()}] 任务已取消: {label}")
+            else:
+                self._log_execution(job.name, "成功", result)
+                if run_date is not None:
+                    self._record_run(job.name, run_date)
+                print(f"[{self.now()}] 任务完成: {label}")
+        except Exception as e:
+            error_msg = str(e)
+            print(f"[{self.now()}] 任务失败: {job.name} - {error_msg}")
+            self._log_execution(job.name, "失败", error_msg)
+            if run_date is not None:
+                self._record_missed(job.name, run_date)
+
+    def _release(self, job: ScheduledJob, cancel_event: threading.Event = None):
+        """一次运行结束: 运行计数减1，没有其他运行时提交排队的下一次"""
+        with self._cond:
+            job.running -= 1
+            if cancel_event is not None and job.cancel_event is cancel_event:
+                job.cancel_event = None
+            if job.queued and not job.running and not self._stopped:
+                self._dispatch(job, job.queued.popleft())
+
+    # ---------- 运行记录与补跑 ----------
+
+    def _load_state(self, reload: bool = False) -> Dict[str, Dict]:
+        """
+        调度状态 {'last_runs': {任务名: 最近成功运行的日期},
+                  'missed': {任务名: [失败/跳过/取消、尚未补跑成功的日期]}}
+        """
+        if self._state is None or reload:
+            self._state = {'last_runs': {}, 'missed': {}}
+            if os.path.exists(self.state_file):
+                try:
+                    with open(self.state_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if 'last_runs' not in data:
+                        data = {'last_runs': data}   # 旧格式: 只有 {任务名: 日期}
+                    self._state['last_runs'].update(data.get('last_runs', {}))
+                    self._state['missed'].update(data.get('missed', {}))
+                except Exception as e:
+                    print(f"⚠️ 调度状态文件读取失败: {e}")
+        return self._state
+
+    def _save_state(self):
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, ensure_ascii=False, indent=2)
+
+    def _record_run(self, job_name: str, run_date: datetime.date):
+        """记录任务成功运行的日期 (最近日期只前进不后退，补跑成功的日期从待补列表移除)"""
+        with self._log_lock:
+            state = self._load_state()
+            day = run_date.isoformat()
+            missed = state['missed'].get(job_name, [])
+            if day in missed:
+                missed.remove(day)
+                if not missed:
+                    del state['missed'][job_name]
+            elif state['last_runs'].get(job_name, '') >= day:
+                return
+            if state['last_runs'].get(job_name, '') < day:
+                state['last_runs'][job_name] = day
+            self._save_state()
+
+    def _record_missed(self, job_name: str, run_date: datetime.date):
+        """记录没有成功完成的运行日期 (重启时补跑，只保留最近 Config.MAX_CATCHUP_DAYS 个)"""
+        with self._log_lock:
+            state = self._load_state()
+            missed = set(state['missed'].get(job_name, []))
+            missed.add(run_date.isoformat())
+            state['missed'][job_name] = sorted(missed)[-Config.MAX_CATCHUP_DAYS:]
+            self._save_state()
+
+    def missed_runs(self) -> List[Tuple[datetime.datetime, str]]:
+        """
+        需要补跑的运行 (catch_up 任务，下次计划执行之前):
+        上次成功运行之后停机错过的交易日，以及之前失败、跳过或取消的日期
+
+        Returns:
+            [(计划执行时间, 任务名)]，按时间升序；每个任务最多 Config.MAX_CATCHUP_DAYS 个
+        """
+        state = self._load_state(reload=True)
+        missed = []
+        for job in list(self.jobs.values()):
+            if not job.catch_up:
+                continue
+            runs = set()
+            for day in state['missed'].get(job.name, []):
+                run = self.timezone.localize(
+                    datetime.datetime.combine(datetime.date.fromisoformat(day), job.at))
+                if run < job.next_run:
+                    runs.add(run)
+            if job.name in state['last_runs']:   # 首次运行没有基准，不补跑停机期间
+                last = datetime.date.fromisoformat(state['last_runs'][job.name])
+                after = self.timezone.localize(datetime.datetime.combine(last, datetime.time.max))
+                while True:
+                    after = self._next_run(job, after)
+                    if after >= job.next_run:
+                        break
+                    runs.add(after)
+            runs = sorted(runs)
+            if len(runs) > Config.MAX_CATCHUP_DAYS:
+                print(f"⚠️ {job.name} 错过 {len(runs)} 次运行，只补跑最近 {Config.MAX_CATCHUP_DAYS} 次")
+                runs = runs[-Config.MAX_CATCHUP_DAYS:]
+            missed.extend((run, job.name) for run in runs)
+        return sorted(missed)
+
+    def catch_up(self, background: bool = False):
+        """
+        按时间顺序逐个补跑错过的运行
+
+        Args:
+            background: 在线程池中补跑 (调度线程不等待)；补跑期间这些任务的新运行排队到补跑之后
+        """
+        missed = self.missed_runs()
+        if not missed:
+            return
+        print(f"⏪ 补跑错过的 {len(missed)} 次运行")
+        remaining = {}
+        with self._cond:
+            if self._stopped:
+                return
+            for _, name in missed:
+                remaining[name] = remaining.get(name, 0) + 1
+            jobs = {name: self.jobs[name] for name in remaining}
+            for job in jobs.values():   # 整个补跑期间视为运行中
+                job.running += 1
+                job.catching_up = True
+
+        def run_all():
             try:
-                print(f"[{datetime.datetime.now()}] 开始执行任务: {job_name}")
-                result = job_func(*args, **kwargs)
-                self._log_execution(job_name, "成功", result)
-                print(f"[{datetime.datetime.now()}] 任务完成: {job_name}")
-                return result
-            except Exception as e:
-                error_msg = str(e)
-                print(f"[{datetime.datetime.now()}] 任务失败: {job_name} - {error_msg}")
-                self._log_execution(job_name, "失败", error_msg)
-                raise
-        
-        job = schedule.every().day.at(time_str).do(wrapper)
-        self.jobs[job_name] = job
-        print(f"✓ 已安排任务: {job_name} 在每天 {time_str} 执行")
-    
+                for scheduled, name in missed:
+                    with self._cond:
+                        if self._stopped or self.jobs.get(name) is not jobs[name]:
+                            break
+                    self._execute(jobs[name], threading.Event(), scheduled.date())
+                    remaining[name] -= 1
+                    if remaining[name] == 0:
+                        self._finish_catch_up(jobs.pop(name))
+            finally:
+                for job in jobs.values():
+                    self._finish_catch_up(job)
+
+        if background:
+            with self._cond:
+                self._submit(run_all)
+        else:
+            run_all()
+
+    def _finish_catch_up(self, job: ScheduledJob):
+        with self._cond:
+            job.catching_up = False
+            self._release(job)
+
+    def _loop(self):
+        """调度线程: 在线程池中补跑错过的运行，同时睡眠到最早的任务到期，提交所有到期任务并排入下一次"""
+        self.catch_up(background=True)
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, name = self._heap[0]
+                delay = due - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                job = self.jobs.get(name)
+                if job is None or abs(job.next_run.timestamp() - due) > 1e-6:
+                    continue   # 已取消或已重新安排的旧条目
+                self._dispatch(job, job.next_run.date())
+                job.next_run = self._next_run(job, job.next_run)
+                self._push(job)
+
     def _log_execution(self, job_name: str, status: str, details: str = ""):
         """记录任务执行"""
         log_entry = {
-            'timestamp': datetime.datetime.now().isoformat(),
+            'timestamp': self.now().isoformat(),
             'job_name': job_name,
             'status': status,
             'details': str(details)[:200]  # 限制长度
         }
-        
-        logs = []
-        try:
-            with open(self.execution_log, 'r', encoding='utf-8') as f:
-                logs = json.load(f)
-        except:
+
+        with self._log_lock:
             logs = []
-        
-        logs.append(log_entry)
-        
-        # 只保留最近1000条日志
-        logs = logs[-1000:]
-        
-        with open(self.execution_log, 'w', encoding='utf-8') as f:
-            json.dump(logs, f, ensure_ascii=False, indent=2)
-    
+            try:
+                with open(self.execution_log, 'r', encoding='utf-8') as f:
+                    logs = json.load(f)
+            except:
+                logs = []
+
+            logs.append(log_entry)
+
+            # 只保留最近1000条日志
+            logs = logs[-1000:]
+
+            with open(self.execution_log, 'w', encoding='utf-8') as f:
+                json.dump(logs, f, ensure_ascii=False, indent=2)
+
+    # ---------- 启动 / 停止 ----------
+
+    def _prepare_start(self):
+        """(重新) 启动前清除停止标志，并从当前时间重新排定各任务 (停止期间错过的运行由补跑处理)"""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("调度器已在运行，请先调用 stop()")
+        with self._cond:
+            self._stopped = False
+            self._heap = []
+            now = self.now()
+            for job in self.jobs.values():
+                job.next_run = self._next_run(job, now)
+                self._push(job)
+
     def start(self):
         """
         启动调度器（阻塞式）
         这会一直运行直到被中断
         """
+        self._prepare_start()
         print("=" * 60)
         print("📅 定时调度器已启动")
         print("=" * 60)
-        
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # 每60秒检查一次是否有任务需要执行
-    
+
+        try:
+            self._loop()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
     def start_background(self):
         """
-        启动调度器（后台进程）
-        需要配合线程或多进程使用
+        启动调度器（后台线程）
         """
-        import threading
-        
-        scheduler_thread = threading.Thread(target=self._background_run, daemon=True)
-        scheduler_thread.start()
+        self._prepare_start()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="scheduler-loop")
+        self._thread.start()
         print("📅 后台调度器已启动")
-    
-    def _background_run(self):
-        """后台运行"""
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
+
+    def stop(self, wait: bool = True):
+        """停止调度并关闭线程池 (wait=True 时等待正在运行的任务结束)，之后可再次 start"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
 
 
 # 便捷函数 - 用于在你的程序中快速集成
 
 def create_scheduler():
     """创建调度器实例"""
-    return DailyScheduler(timezone='Asia/Shanghai')
+    return DailyScheduler(timezone=Config.TIMEZONE)
 
 
 def schedule_monitor_task(scheduler: DailyScheduler, monitor_func: Callable):
     """
     安排monitor程序的每日执行
-    
+
     Args:
         scheduler: DailyScheduler实例
         monitor_func: 你的monitor.py中的main函数或关键函数
     """
     scheduler.schedule_daily_job(
         job_name="每日14:30 Monitor任务",
-        time_str="14:30",
+        time_str=Config.MONITOR_TIME,
         job_func=monitor_func
     )
 
@@ -129,15 +492,15 @@ def schedule_monitor_task(scheduler: DailyScheduler, monitor_func: Callable):
 if __name__ == "__main__":
     # 示例用法
     scheduler = create_scheduler()
-    
+
     # 示例：定义你的monitor函数
     def my_monitor_task():
         print("执行monitor任务...")
         # 这里会调用你的实际monitor逻辑
         return {"status": "success"}
-    
+
     # 安排任务
     schedule_monitor_task(scheduler, my_monitor_task)
-    
+
     # 启动调度器
     scheduler.start()
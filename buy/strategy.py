@@ -9,27 +9,16 @@ def simple_dca_strategy(fund_data: pd.DataFrame, invest_amount: float):
     invest_amount: 每期定投金额
     返回:DataFrame,包含每期日期、买入份额、累计份额、累计投入、当前市值、收益率
     """
-    fund_data = fund_data.sort_values('date').reset_index(drop=True)
-    shares = []
-    total_shares = 0
-    total_invest = 0
-    market_values = []
-    returns = []
-    for i, row in fund_data.iterrows():
-        nav = row['nav']
-        buy_share = invest_amount / nav
-        total_shares += buy_share
-        total_invest += invest_amount
-        market_value = total_shares * nav
-        ret = (market_value - total_invest) / total_invest if total_invest > 0 else 0
-        shares.append(total_shares)
-        market_values.append(market_value)
-        returns.append(ret)
-    result = fund_data.copy()
-    result['total_shares'] = shares
-    result['total_invest'] = invest_amount * (result.index + 1)
-    result['market_value'] = market_values
-    result['return'] = returns
+    result = fund_data.sort_values('date').reset_index(drop=True)
+    nav = result['nav'].to_numpy(dtype=float)
+    # 逐期份额的累计和 (np.cumsum 按顺序累加，与逐行相加结果完全一致)
+    total_shares = np.cumsum(invest_amount / nav)
+    total_invest = invest_amount * (result.index + 1)
+    market_value = total_shares * nav
+    result['total_shares'] = total_shares
+    result['total_invest'] = total_invest
+    result['market_value'] = market_value
+    result['return'] = _cumulative_return(market_value, np.cumsum(np.full(len(nav), invest_amount, dtype=float)))
     return result
 
 def ma_timing_strategy(fund_data: pd.DataFrame, invest_amount: float, ma_window: int = 20):
@@ -38,37 +27,45 @@ def ma_timing_strategy(fund_data: pd.DataFrame, invest_amount: float, ma_window:
     """
     df = fund_data.sort_values('date').copy().reset_index(drop=True)
     df['ma'] = df['nav'].rolling(window=ma_window).mean()
-    shares_list = []
-    total_shares = 0
-    total_invest_list = []
-    total_invest = 0
-    market_values = []
-    returns = []
+    nav = df['nav'].to_numpy(dtype=float)
+    ma = df['ma'].to_numpy(dtype=float)
     
-    for i, row in df.iterrows():
-        nav = row['nav']
-        ma = row['ma']
-        
-        # 价格 > 均线时进行定投，若 ma 只有 NaN 则观望
-        if not pd.isna(ma) and nav > ma:
-            buy_share = invest_amount / nav
-            total_shares += buy_share
-            total_invest += invest_amount
-            
-        current_value = total_shares * nav
-        ret = (current_value - total_invest) / total_invest if total_invest > 0 else 0
-        
-        shares_list.append(total_shares)
-        total_invest_list.append(total_invest)
-        market_values.append(current_value)
-        returns.append(ret)
-        
-    df['total_shares'] = shares_list
-    df['total_invest'] = total_invest_list
-    df['market_value'] = market_values
-    df['return'] = returns
+    # 价格 > 均线时进行定投，若 ma 只有 NaN 则观望 (NaN比较结果为False)
+    buy = nav > ma
+    total_shares = np.cumsum(np.where(buy, invest_amount / nav, 0.0))
+    total_invest = np.cumsum(np.where(buy, float(invest_amount), 0.0))
+    market_value = total_shares * nav
+    
+    df['total_shares'] = total_shares
+    df['total_invest'] = total_invest
+    df['market_value'] = market_value
+    df['return'] = _cumulative_return(market_value, total_invest)
     return df
 
+def rsi_timing_strategy(fund_data: pd.DataFrame, invest_amount: float,
+                        rsi_window: int = 14, rsi_oversold: float = 30):
+    """
+    RSI择时定投：RSI < 超卖点时定投，否则观望
+    """
+    df = calculate_rsi(fund_data.sort_values('date').copy().reset_index(drop=True), window=rsi_window)
+    nav = df['nav'].to_numpy(dtype=float)
+    
+    buy = df['rsi'].to_numpy(dtype=float) < rsi_oversold
+    total_shares = np.cumsum(np.where(buy, invest_amount / nav, 0.0))
+    total_invest = np.cumsum(np.where(buy, float(invest_amount), 0.0))
+    market_value = total_shares * nav
+    
+    df['total_shares'] = total_shares
+    df['total_invest'] = total_invest
+    df['market_value'] = market_value
+    df['return'] = _cumulative_return(market_value, total_invest)
+    return df
+
+def _cumulative_return(market_value: np.ndarray, total_invest: np.ndarray) -> np.ndarray:
+    """累计收益率 (尚未投入时为0)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total_invest > 0, (market_value - total_invest) / total_invest, 0.0)
+
 def calculate_rsi(df: pd.DataFrame, window: int = 14):
     """
     计算RSI指标
@@ -2,19 +2,50 @@
 import json
 import os
 import datetime
+import weakref
 from typing import Dict, List, Tuple
 import numpy as np
 from virtual_trading import VirtualTradingEngine
+from param_optimizer import ParameterOptimizer
+from clock import SystemClock
+from config import Config
 
 
 class StrategyEvaluator:
     """策略评估器 - 计算策略表现"""
     
+    # 指标缓存: engine -> (缓存键, 指标)，引擎释放后自动清除；引擎状态变化时立即丢弃
+    _metrics_cache = weakref.WeakKeyDictionary()
+    _subscribed = weakref.WeakSet()
+    
+    @staticmethod
+    def _watch(engine: VirtualTradingEngine):
+        """订阅引擎的状态变化通知 (每个引擎一次)"""
+        if engine in StrategyEvaluator._subscribed:
+            return
+        ref = weakref.ref(engine)
+        
+        def invalidate(kind, info):
+            target = ref()
+            if target is not None:
+                StrategyEvaluator._metrics_cache.pop(target, None)
+        
+        engine.add_listener(invalidate)
+        StrategyEvaluator._subscribed.add(engine)
+    
+    @staticmethod
+    def _metrics_key(engine: VirtualTradingEngine, current_prices: Dict[str, float]) -> tuple:
+        """缓存键: 状态版本 + 现金 + 持仓 + 持仓基金的价格，计算量只与持仓数有关"""
+        holdings = tuple(sorted(engine.current_holdings.items()))
+        prices = tuple(current_prices.get(code) for code, _ in holdings)
+        return (engine.state_version, engine.current_cash, holdings, prices)
+    
     @staticmethod
     def calculate_metrics(engine: VirtualTradingEngine, 
                          current_prices: Dict[str, float]) -> Dict:
         """
         计算策略性能指标
+        同一状态、同一组持仓价格下重复调用直接返回缓存结果
         
         Args:
             engine: 虚拟交易引擎
@@ -23,6 +54,20 @@ class StrategyEvaluator:
         Returns:
             包含多个性能指标的字典
         """
+        key = StrategyEvaluator._metrics_key(engine, current_prices)
+        cached = StrategyEvaluator._metrics_cache.get(engine)
+        if cached is not None and cached[0] == key:
+            return dict(cached[1])
+        
+        metrics = StrategyEvaluator._compute_metrics(engine, current_prices)
+        StrategyEvaluator._watch(engine)
+        StrategyEvaluator._metrics_cache[engine] = (key, metrics)
+        return dict(metrics)
+    
+    @staticmethod
+    def _compute_metrics(engine: VirtualTradingEngine,
+                         current_prices: Dict[str, float]) -> Dict:
+        """计算指标 (各项均基于引擎的增量统计，不回扫信号历史)"""
         report = engine.get_performance_report(current_prices)
         
         # 总体收益率
@@ -36,12 +81,23 @@ class StrategyEvaluator:
         executed = report['executed_signals']
         execution_rate = executed / total_signals if total_signals > 0 else 0
         
-        # 计算夏普比率 (简化版：基于月度收益)
-        monthly_returns = StrategyEvaluator._get_monthly_returns(engine)
-        sharpe_ratio = StrategyEvaluator._calculate_sharpe(monthly_returns)
-        
-        # 最大回撤
-        max_drawdown = StrategyEvaluator._calculate_max_drawdown(engine, current_prices)
+        curve = engine.equity_curve
+        if len(curve) >= 2:
+            # 基于每日权益曲线，指标在记录快照时已增量更新
+            sharpe_ratio = curve.sharpe_ratio
+            max_drawdown = curve.max_drawdown
+            volatility = curve.volatility
+            rolling_sharpe = curve.rolling_sharpe
+        else:
+            # 快照不足两天时退回简化估算
+            # 计算夏普比率 (简化版：基于月度收益)
+            monthly_returns = StrategyEvaluator._get_monthly_returns(engine)
+            sharpe_ratio = StrategyEvaluator._calculate_sharpe(monthly_returns)
+            
+            # 最大回撤
+            max_drawdown = StrategyEvaluator._calculate_max_drawdown(engine, current_prices)
+            volatility = 0.0
+            rolling_sharpe = sharpe_ratio
         
         return {
             'total_return': total_return,
@@ -49,6 +105,8 @@ class StrategyEvaluator:
             'execution_rate': execution_rate,
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': max_drawdown,
+            'volatility': volatility,
+            'rolling_sharpe': rolling_sharpe,
             'total_signals': total_signals,
             'executed_signals': executed,
             'total_value': report['total_value'],
@@ -58,20 +116,8 @@ class StrategyEvaluator:
     
     @staticmethod
     def _get_monthly_returns(engine: VirtualTradingEngine) -> List[float]:
-        """计算月度收益率"""
-        monthly_data = {}
-        
-        for signal in engine.signals_history:
-            month = signal.date[:7]  # YYYY-MM
-            if month not in monthly_data:
-                monthly_data[month] = {'buy': 0, 'sell': 0, 'count': 0}
-            
-            if signal.execution_date and signal.execution_price:
-                if signal.signal_type == "BUY":
-                    monthly_data[month]['buy'] += signal.execution_amount or 0
-                elif signal.signal_type == "SELL":
-                    monthly_data[month]['sell'] += signal.execution_amount or 0
-                monthly_data[month]['count'] += 1
+        """计算月度收益率 (基于引擎按月累计的成交金额)"""
+        monthly_data = engine.monthly_flows
         
         returns = []
         for month in sorted(monthly_data.keys()):
@@ -122,16 +168,20 @@ class StrategyEvaluator:
 class StrategyEvolver:
     """策略进化器 - 根据表现自动调整参数"""
     
-    def __init__(self, base_params: Dict = None):
+    def __init__(self, base_params: Dict = None, evolution_log: str = "strategy_evolution.json",
+                 clock=None):
         """
         初始化策略进化器
         
         Args:
             base_params: 基础策略参数
+            evolution_log: 进化历史文件，为None时只保存在内存中 (回放模式)
+            clock: 时钟，默认系统时间
         """
         self.base_params = base_params or self._get_default_params()
         self.params_history: List[Tuple[str, Dict]] = []
-        self.evolution_log = "strategy_evolution.json"
+        self.evolution_log = evolution_log
+        self.clock = clock or SystemClock()
         
         self.load_evolution_history()
     
@@ -152,7 +202,7 @@ class StrategyEvolver:
     
     def load_evolution_history(self):
         """加载进化历史"""
-        if os.path.exists(self.evolution_log):
+        if self.evolution_log and os.path.exists(self.evolution_log):
             try:
                 with open(self.evolution_log, 'r', encoding='utf-8') as f:
                     data = json.load(f)
@@ -162,6 +212,8 @@ class StrategyEvolver:
     
     def save_evolution_history(self):
         """保存进化历史"""
+        if not self.evolution_log:
+            return
         with open(self.evolution_log, 'w', encoding='utf-8') as f:
             json.dump({
                 'history': self.params_history,
@@ -212,7 +264,7 @@ class StrategyEvolver:
                 self.base_params['loss_cut_threshold'] - 0.05)
         
         # 记录演进
-        timestamp = datetime.datetime.now().isoformat()
+        timestamp = self.clock.now().isoformat()
         self.params_history.append([timestamp, new_params])
         
         # 更新基础参数用于下一轮演进
@@ -221,50 +273,96 @@ class StrategyEvolver:
         
         return new_params
     
+    def optimize_parameters(self, nav_data: Dict, method: str = 'genetic',
+                            objective: str = 'sharpe', max_workers: int = None,
+                            **search_kwargs) -> Dict:
+        """
+        优化模式: 在历史净值上搜索参数，替代按单日指标的固定步长调整
+        
+        Args:
+            nav_data: 历史净值 {code: DataFrame(date, nav)}
+            method: 'genetic' 遗传算法 / 'random' 随机搜索
+            objective: 'sharpe' / 'total_return' / 'calmar'
+            max_workers: 评估进程数
+            search_kwargs: 传给搜索方法的参数 (种群大小、迭代次数、提前停止等)
+            
+        Returns:
+            优化结果 (best_params 为新的策略参数)
+        """
+        optimizer = ParameterOptimizer(nav_data, objective=objective, max_workers=max_workers)
+        if method == 'genetic':
+            search_kwargs.setdefault('seed_params', self.base_params)
+        result = optimizer.optimize(method, **search_kwargs)
+        
+        new_params = {**self.base_params, **result['best_params']}
+        timestamp = self.clock.now().isoformat()
+        self.params_history.append([timestamp, new_params])
+        self.base_params = new_params
+        self.save_evolution_history()
+        return result
+    
     def get_current_params(self) -> Dict:
         """获取当前策略参数"""
         if self.params_history:
             return self.params_history[-1][1]
         return self.base_params
     
-    def get_params_evolution(self) -> List[Dict]:
-        """获取参数演进历史"""
+    def get_params_evolution(self, last: int = None) -> List[Dict]:
+        """获取参数演进历史 (last 给出时只返回最近 last 次)"""
+        history = self.params_history[-last:] if last else self.params_history
         return [
             {
                 'timestamp': hist[0],
                 'params': hist[1]
             }
-            for hist in self.params_history
+            for hist in history
         ]
 
 
 class AdaptiveStrategyOptimizer:
     """自适应策略优化器 - 综合评估和进化"""
     
-    def __init__(self):
-        self.engine = VirtualTradingEngine()
-        self.evolver = StrategyEvolver()
+    def __init__(self, engine: VirtualTradingEngine = None, evolver: StrategyEvolver = None,
+                 clock=None, risk_simulator=None):
+        """
+        Args:
+            engine: 被评估的虚拟交易引擎，默认新建 (从存储加载)
+            evolver: 策略进化器，默认新建
+            clock: 时钟，默认系统时间
+            risk_simulator: 风险模拟器 (risk_simulator.RiskSimulator)，
+                设置后每日评估附带持仓的模拟VaR/CVaR和回撤分位
+        """
+        self.clock = clock or SystemClock()
+        self.engine = engine or VirtualTradingEngine()
+        self.evolver = evolver or StrategyEvolver(clock=self.clock)
+        self.risk_simulator = risk_simulator
+        if risk_simulator is not None and risk_simulator.clock is None:
+            risk_simulator.clock = self.clock   # 回放时按模拟日期读取历史净值
         self.evaluation_history = []
     
-    def run_daily_optimization(self, current_prices: Dict[str, float]) -> Dict:
+    def run_daily_optimization(self, current_prices: Dict[str, float], date: str = None) -> Dict:
         """
         每日运行一次策略优化
         
         Args:
             current_prices: 当前基金价格
+            date: 快照日期，默认时钟的今天
             
         Returns:
             包含评估结果和新参数的字典
         """
-        # 1. 评估当前策略
+        # 1. 记录当日资产快照并评估当前策略
+        self.engine.record_snapshot(current_prices, date or self.clock.today_str())
         metrics = StrategyEvaluator.calculate_metrics(self.engine, current_prices)
+        if self.risk_simulator is not None:
+            metrics.update(self.assess_risk(current_prices))
         
         # 2. 进化策略参数
         new_params = self.evolver.evolve_parameters(metrics)
         
         # 3. 记录
         evaluation_record = {
-            'date': datetime.datetime.now().isoformat(),
+            'date': self.clock.now().isoformat(),
             'metrics': metrics,
             'new_params': new_params
         }
@@ -276,6 +374,26 @@ class AdaptiveStrategyOptimizer:
             'recommendation': self._get_recommendation(metrics)
         }
     
+    def assess_risk(self, current_prices: Dict[str, float]) -> Dict:
+        """
+        模拟当前持仓的未来风险
+        
+        Returns:
+            {'risk_horizon', 'var_95', 'cvar_95', 'var_95_pct', 'cvar_95_pct',
+             'simulated_drawdown_95'}，未设置风险模拟器时为空字典
+        """
+        if self.risk_simulator is None:
+            return {}
+        report = self.risk_simulator.simulate_engine(self.engine, current_prices)
+        return {
+            'risk_horizon': report['horizon'],
+            'var_95': report['var_95'],
+            'cvar_95': report['cvar_95'],
+            'var_95_pct': report['var_95_pct'],
+            'cvar_95_pct': report['cvar_95_pct'],
+            'simulated_drawdown_95': report['drawdown_p95'],
+        }
+    
     def _get_recommendation(self, metrics: Dict) -> str:
         """根据指标生成建议"""
         recommendations = []
@@ -290,8 +408,16 @@ class AdaptiveStrategyOptimizer:
         elif metrics['total_return'] < -0.10:
             recommendations.append("⚠ 累计亏损>10%，建议补仓或止损")
         
-        if metrics['max_drawdown'] > 0.25:
-            recommendations.append("⚠ 最大回撤超过25%，风险较高")
+        limit = Config.MAX_DRAWDOWN_LIMIT
+        if metrics['max_drawdown'] > limit:
+            recommendations.append(f"⚠ 最大回撤超过{limit:.0%}，风险较高")
+        
+        # 模拟回撤: 当前持仓在未来 risk_horizon 日内的最大回撤95%分位
+        simulated = metrics.get('simulated_drawdown_95')
+        if simulated is not None and simulated > limit:
+            recommendations.append(
+                f"⚠ 模拟未来{metrics['risk_horizon']}日回撤95%分位为{simulated:.0%}，"
+                f"超过{limit:.0%}，建议降低仓位 (CVaR95 {metrics['cvar_95']:.0f}元)")
         
         if not recommendations:
             recommendations.append("继续执行当前策略，持续监控")
@@ -310,9 +436,9 @@ class AdaptiveStrategyOptimizer:
         unrealized_pnl = self.engine.get_unrealized_pnl(current_prices)
         
         return {
-            'timestamp': datetime.datetime.now().isoformat(),
+            'timestamp': self.clock.now().isoformat(),
             'metrics': metrics,
             'current_params': current_params,
             'unrealized_pnl': unrealized_pnl,
-            'params_evolution': self.evolver.get_params_evolution()[-5:],  # 最近5次演进
+            'params_evolution': self.evolver.get_params_evolution(last=5),  # 最近5次演进
         }
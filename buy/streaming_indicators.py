@@ -0,0 +1,196 @@
+# 增量指标 - 用历史净值初始化一次，之后每个新净值 O(1) 更新均线/RSI/布林带
+from collections import deque
+from typing import Dict, Iterable
+import numpy as np
+import pandas as pd
+
+# 每推入多少个值后按窗口内的数据重新求和，消除浮点累计误差 (均摊仍为 O(1))
+RESYNC_EVERY = 1000
+
+
+class RollingWindow:
+    """
+    固定长度滑动窗口的和与平方和
+
+    求和前先减去第一个值 (shift)，方差用平移后的数据计算，避免净值在1附近时的精度损失
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.shift = None
+        self.total = 0.0      # sum(x - shift)
+        self.total_sq = 0.0   # sum((x - shift)^2)
+        self._pushes = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def push(self, x: float):
+        if self.shift is None:
+            self.shift = x
+        if self.full:
+            old = self.values[0] - self.shift
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(x)
+        d = x - self.shift
+        self.total += d
+        self.total_sq += d * d
+
+        self._pushes += 1
+        if self._pushes % RESYNC_EVERY == 0:
+            self._resync()
+
+    def _resync(self):
+        self.shift = self.values[-1]
+        d = np.asarray(self.values) - self.shift
+        self.total = float(d.sum())
+        self.total_sq = float((d * d).sum())
+
+    def _sums(self, x: float = None):
+        """窗口的 (个数, 平移后的和, 平方和)；x 给出时为假设再推入 x 后的值 (不修改状态)"""
+        n, total, total_sq = len(self.values), self.total, self.total_sq
+        if x is not None:
+            shift = x if self.shift is None else self.shift
+            if n == self.window:
+                old = self.values[0] - shift
+                total -= old
+                total_sq -= old * old
+            else:
+                n += 1
+            d = x - shift
+            total += d
+            total_sq += d * d
+        return n, total, total_sq
+
+    def mean(self, x: float = None) -> float:
+        """窗口均值 (未满窗口时为NaN，与 pandas rolling 一致)"""
+        n, total, _ = self._sums(x)
+        if n < self.window:
+            return np.nan
+        shift = x if self.shift is None else self.shift
+        return shift + total / n
+
+    def std(self, x: float = None) -> float:
+        """窗口标准差 (ddof=1)"""
+        n, total, total_sq = self._sums(x)
+        if n < self.window or n < 2:
+            return np.nan
+        var = (total_sq - total * total / n) / (n - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+
+class StreamingRSI:
+    """
+    增量RSI: 涨幅、跌幅的简单滑动平均 (与 strategy.calculate_rsi 的 rolling 算法一致)
+    """
+
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.gains = RollingWindow(window)
+        self.losses = RollingWindow(window)
+        self.last = None
+
+    def push(self, x: float):
+        if self.last is not None:
+            delta = x - self.last
+            self.gains.push(max(delta, 0.0))
+            self.losses.push(max(-delta, 0.0))
+        self.last = x
+
+    def value(self, x: float = None) -> float:
+        """当前RSI；x 给出时为假设下一个净值为 x 时的RSI (不修改状态)"""
+        if x is not None and self.last is not None:
+            delta = x - self.last
+            gain = self.gains.mean(max(delta, 0.0))
+            loss = self.losses.mean(max(-delta, 0.0))
+        else:
+            gain, loss = self.gains.mean(), self.losses.mean()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(gain) / np.float64(loss)
+            return float(100 - 100 / (1 + rs))
+
+
+class FundIndicatorState:
+    """
+    单只基金的增量指标状态: MA5/MA10/MA20、RSI(14)、布林带(20, 2)
+
+    用法:
+        state = FundIndicatorState.from_frame(history)   # 开盘前用历史初始化一次
+        state.preview(est_nav)                           # 盘中: 假设今日净值为估值时的指标
+        state.update(nav)                                # 收盘后: 推入正式净值
+    """
+
+    def __init__(self, navs: Iterable[float] = (), rsi_window: int = 14,
+                 bb_window: int = 20, num_std: int = 2):
+        self.ma5 = RollingWindow(5)
+        self.ma10 = RollingWindow(10)
+        self.ma20 = RollingWindow(20)
+        self.bb = RollingWindow(bb_window)
+        self.rsi = StreamingRSI(rsi_window)
+        self.num_std = num_std
+        self.count = 0
+        self.nav = np.nan
+        self.date = None
+        for nav in navs:
+            self.update(nav)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **kwargs) -> 'FundIndicatorState':
+        """由历史净值 DataFrame(date, nav) 初始化 (按日期排序)"""
+        df = df.dropna(subset=['nav']).sort_values('date')
+        state = cls(df['nav'].to_numpy(dtype=float), **kwargs)
+        if len(df):
+            state.date = df['date'].iloc[-1]
+        return state
+
+    def update(self, nav: float, date=None):
+        """推入一个正式净值 O(1)"""
+        nav = float(nav)
+        for window in (self.ma5, self.ma10, self.ma20, self.bb):
+            window.push(nav)
+        self.rsi.push(nav)
+        self.count += 1
+        self.nav = nav
+        if date is not None:
+            self.date = date
+
+    def _indicators(self, nav: float, x: float = None) -> Dict[str, float]:
+        bb_mid = self.bb.mean(x)
+        bb_std = self.bb.std(x)
+        return {
+            'nav': nav,
+            'ma5': self.ma5.mean(x),
+            'ma10': self.ma10.mean(x),
+            'ma20': self.ma20.mean(x),
+            'rsi': self.rsi.value(x),
+            'bb_mid': bb_mid,
+            'bb_upper': bb_mid + bb_std * self.num_std,
+            'bb_lower': bb_mid - bb_std * self.num_std,
+        }
+
+    def latest(self) -> Dict[str, float]:
+        """最近一个正式净值上的指标"""
+        return self._indicators(self.nav)
+
+    def preview(self, nav: float) -> Dict[str, float]:
+        """假设再推入 nav 时的指标 (盘中估值)，不修改状态"""
+        return self._indicators(float(nav), float(nav))
+
+    def preview_change(self, change_pct: float) -> Dict[str, float]:
+        """按估算涨跌幅(%)预估今日净值后的指标"""
+        return self.preview(self.nav * (1 + float(change_pct) / 100))
+
+
+def seed_states(nav_data: Dict[str, pd.DataFrame], **kwargs) -> Dict[str, FundIndicatorState]:
+    """为多只基金初始化增量指标状态 {code: FundIndicatorState}"""
+    return {
+        code: FundIndicatorState.from_frame(df, **kwargs)
+        for code, df in nav_data.items()
+        if df is not None and not df.empty
+    }
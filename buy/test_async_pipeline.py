@@ -0,0 +1,129 @@
+# 异步信号流水线测试 - 下载重叠、观察列表与异步入口
+import asyncio
+import datetime
+import threading
+import time
+import numpy as np
+import pandas as pd
+import async_pipeline
+import main_integrated
+from async_pipeline import AsyncSignalPipeline
+from monitor import analyze_fund
+from trading_storage import SQLiteStorage
+
+
+def test_async_pipeline(monkeypatch):
+    delay = 0.2
+    rng = np.random.default_rng(29)
+    dates = pd.bdate_range(end=datetime.date.today(), periods=200)
+    histories = {f"{i:06d}": pd.DataFrame({'date': dates, 'nav': 1 + np.cumsum(rng.normal(0, 0.01, len(dates)))})
+                 for i in range(1, 13)}
+    codes = list(histories)
+    groups = {"股票型": codes[2:6], "指数型": codes[5:9], "混合型": codes[9:]}
+    
+    active = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+    
+    def fake_rankings(symbol):
+        time.sleep(delay)
+        return pd.DataFrame({'基金代码': groups[symbol], '近1年': 1.0, '近6月': 1.0,
+                             '近3月': 1.0, '近1月': 1.0})
+    
+    def fake_history(code, start, end):
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        time.sleep(delay)
+        with lock:
+            active['now'] -= 1
+        return histories[code]
+    
+    class FakeClient:
+        batches = []
+        
+        def fetch(self, fund_list, deadline=None):
+            FakeClient.batches.append(list(fund_list))
+            time.sleep(delay)
+            return pd.DataFrame([{'基金代码': c, '基金名称': f'基金{c}', '估算涨跌幅': '-1.50'}
+                                 for c in fund_list])
+    
+    held = {codes[0]: {'cost': 1.0}, codes[2]: {'cost': 1.2}}
+    monkeypatch.setattr(async_pipeline, 'fetch_fund_rankings', fake_rankings)
+    monkeypatch.setattr(async_pipeline, 'fetch_fund_data', fake_history)
+    pipeline = AsyncSignalPipeline(held, fund_list=[codes[1]], max_concurrency=4,
+                                   client=FakeClient(), top_n=4)
+    started = time.perf_counter()
+    result = asyncio.run(pipeline.run())
+    elapsed = time.perf_counter() - started
+    
+    # 结果与逐只调用 analyze_fund 相同，顺序为 持仓、固定列表、排行榜
+    assert pipeline.watch_list == [codes[0], codes[2], codes[1]] + codes[3:]
+    expected = [analyze_fund(c, histories[c], {'基金代码': c, '基金名称': f'基金{c}', '估算涨跌幅': '-1.50'}, held)
+                for c in pipeline.watch_list]
+    assert result.to_dict(orient='records') == expected
+    assert sorted(c for batch in FakeClient.batches for c in batch) == codes   # 每只基金只请求一次估值
+    # 返回时下载线程已全部结束，不留下仍在运行的请求
+    assert not [t for t in threading.enumerate() if t.name.startswith('pipeline-io')]
+    
+    # 同步入口按相同规则选取观察列表
+    monkeypatch.setattr(main_integrated, 'fetch_fund_rankings', fake_rankings)
+    assert main_integrated.build_watch_list(held, [codes[1]], list(groups), top_n=4) == \
+        pipeline.watch_list
+    
+    # 历史净值并发受信号量限制，下载相互重叠
+    assert active['max'] == 4
+    sequential = delay * (len(groups) + len(codes) + len(FakeClient.batches))
+    assert elapsed < sequential / 2, (elapsed, sequential)
+
+
+def test_async_once_sqlite(tmp_path, monkeypatch):
+    """异步入口的会话加载和智能体处理都在同一个专用线程中"""
+    threads = set()
+    
+    class ThreadRecordingStorage(SQLiteStorage):
+        def load(self):
+            threads.add(threading.get_ident())
+            return super().load()
+        
+        def write_events(self, events):
+            threads.add(threading.get_ident())
+            return super().write_events(events)
+        
+        def write_snapshot(self, snapshot):
+            threads.add(threading.get_ident())
+            return super().write_snapshot(snapshot)
+    
+    rng = np.random.default_rng(31)
+    dates = pd.bdate_range(end=datetime.date.today(), periods=120)
+    
+    def fake_history(code, start, end):
+        return pd.DataFrame({'date': dates, 'nav': 1 + np.cumsum(rng.normal(0, 0.01, len(dates)))})
+    
+    def fake_rankings(symbol):
+        return pd.DataFrame({'基金代码': ['110001', '110002'], '近1年': 1.0, '近6月': 1.0,
+                             '近3月': 1.0, '近1月': 1.0})
+    
+    class FakeClient:
+        def __init__(self, *args, **kwargs):
+            pass
+        
+        def fetch(self, fund_list, deadline=None):
+            return pd.DataFrame([{'基金代码': c, '基金名称': f'基金{c}', '估算涨跌幅': '-2.50'}
+                                 for c in fund_list])
+        
+        def close(self):
+            pass
+    
+    monkeypatch.setattr(async_pipeline, 'fetch_fund_rankings', fake_rankings)
+    monkeypatch.setattr(async_pipeline, 'fetch_fund_data', fake_history)
+    monkeypatch.setattr(async_pipeline, 'RealtimeEstimationClient', FakeClient)
+    monkeypatch.chdir(tmp_path)
+    storage = ThreadRecordingStorage(str(tmp_path / 'trading.db'))
+    response = asyncio.run(main_integrated.run_auto_trading_system_once_async(
+        categories=("股票型",), storage=storage))
+    assert response is not None
+    agent_threads = set(threads)
+    assert len(storage.load()['signals']) == len(response['processed_signals']) == 4
+    storage.close()
+    
+    assert len(agent_threads) == 1 and threading.get_ident() not in agent_threads
@@ -0,0 +1,19 @@
+# 参数扫描回测测试 - 多进程与单进程结果一致
+import pandas as pd
+from backtest import run_parameter_sweep
+from benchmark_strategy import make_nav_history
+
+
+def test_parameter_sweep():
+    nav_data = {f"00{i:04d}": make_nav_history(years=3, seed=i) for i in range(4)}
+    grid = {'ma_window': [10, 20], 'rsi_oversold': [25, 35], 'invest_amount': [500, 1000]}
+    
+    serial = run_parameter_sweep(list(nav_data), None, None, param_grid=grid,
+                                 max_workers=1, nav_data=nav_data)
+    parallel = run_parameter_sweep(list(nav_data), None, None, param_grid=grid,
+                                   max_workers=2, nav_data=nav_data)
+    
+    # simple: 2组金额, ma: 2×2, rsi_low: 2×2 (rsi_window取默认) -> 每只基金10组
+    assert len(serial) == 4 * 10
+    assert {'total_return', 'volatility', 'max_drawdown'} <= set(serial.columns)
+    pd.testing.assert_frame_equal(serial, parallel)
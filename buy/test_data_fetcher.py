@@ -0,0 +1,83 @@
+# 数据获取测试 - 本地净值库增量同步与实时估值并发抓取
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+import data_fetcher
+from nav_store import NavStore
+
+
+def test_nav_store_incremental_fetch(monkeypatch):
+    """本地净值库已覆盖的区间不再访问网络"""
+    store = NavStore(":memory:")
+    calls = []
+    today = pd.Timestamp(datetime.date.today())
+    history = pd.DataFrame({
+        'date': pd.date_range(end=today - pd.Timedelta(days=1), periods=60, freq='D'),
+        'nav': [1.0 + i * 0.01 for i in range(60)]
+    })
+    
+    def fake_upstream(fund_code):
+        calls.append(fund_code)
+        return history
+    
+    monkeypatch.setattr(data_fetcher, '_fetch_nav_history', fake_upstream)
+    end = today.strftime('%Y-%m-%d')
+    df = data_fetcher.fetch_fund_data('001001', '2000-01-01', end, store=store)
+    assert len(df) == 60 and len(calls) == 1
+    
+    # 同一天再次请求：直接读本地库，不访问网络
+    df = data_fetcher.fetch_fund_data('001001', '2000-01-01', end, store=store)
+    assert len(df) == 60 and len(calls) == 1
+    
+    # 历史区间回测：本地已覆盖，不访问网络
+    start = history['date'].iloc[10].strftime('%Y-%m-%d')
+    stop = history['date'].iloc[20].strftime('%Y-%m-%d')
+    df = data_fetcher.fetch_fund_data('001001', start, stop, store=store)
+    assert len(df) == 11 and len(calls) == 1
+
+
+def test_realtime_estimation_client():
+    """并发抓取实时估值 (本地模拟估值接口)，失败重试，空响应跳过"""
+    hits = {}
+    
+    class FakeFundgzHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            code = self.path.rsplit('/', 1)[-1].split('.')[0]
+            hits[code] = hits.get(code, 0) + 1
+            if code == '000003' and hits[code] == 1:
+                # 第一次请求失败，验证重试
+                self.send_response(500)
+                self.end_headers()
+                return
+            if code == '000004':
+                body = "jsonpgz();"
+            else:
+                body = ('jsonpgz({"fundcode":"%s","name":"基金%s","gszzl":"-1.23"});'
+                        % (code, code))
+            payload = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeFundgzHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = data_fetcher.RealtimeEstimationClient(
+        max_workers=4, timeout=2, retries=1, backoff=0,
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/js/{{code}}.js"
+    )
+    try:
+        codes = ['000001', '000002', '000003', '000004', '000005']
+        df = data_fetcher.fetch_realtime_estimation(codes, client=client)
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+    
+    assert list(df.columns) == ['基金代码', '基金名称', '估算涨跌幅']
+    assert df['基金代码'].tolist() == ['000001', '000002', '000003', '000005']
+    assert hits['000003'] == 2 and hits['000004'] == 1
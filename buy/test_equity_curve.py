@@ -0,0 +1,101 @@
+# 权益曲线测试 - 每日资产快照、增量风险指标与持久化
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from config import Config
+from equity_curve import EquityCurve
+from strategy_evolution import StrategyEvaluator
+from trading_storage import MemoryStorage, SQLiteStorage, migrate_json_to_sqlite
+from virtual_trading import VirtualTradingEngine, TradeSignal
+
+
+@pytest.fixture
+def totals():
+    rng = np.random.default_rng(3)
+    return 100000 * np.cumprod(1 + rng.normal(0.0005, 0.01, 300))
+
+
+@pytest.fixture
+def dates():
+    return [d.strftime('%Y-%m-%d') for d in pd.bdate_range('2024-01-01', periods=300)]
+
+
+def test_equity_curve_snapshots(tmp_path, monkeypatch, totals, dates):
+    """增量统计与全量计算一致，快照经日志持久化并可迁移到SQLite"""
+    monkeypatch.chdir(tmp_path)
+    engine = VirtualTradingEngine(initial_cash=100000)
+    engine.current_cash = 0
+    engine.current_holdings = {'000001': 1.0}
+    for date, total in zip(dates, totals):
+        # 同一天先记一个错误值，再以最后一次为准
+        engine.record_snapshot({'000001': total * 0.5}, date=date)
+        engine.record_snapshot({'000001': total}, date=date)
+    curve = engine.equity_curve
+    
+    # 与一次性全量计算对比
+    daily = totals[1:] / totals[:-1] - 1 - 0.03 / 250
+    expected_dd = np.max(1 - totals / np.maximum.accumulate(totals))
+    expected_sharpe = daily.mean() / daily.std() * np.sqrt(250)
+    window = daily[-60:]
+    expected_rolling = window.mean() / window.std() * np.sqrt(250)
+    assert len(curve) == 300
+    assert abs(curve.max_drawdown - expected_dd) < 1e-12
+    assert abs(curve.volatility - daily.std() * np.sqrt(250)) < 1e-10
+    assert abs(curve.sharpe_ratio - expected_sharpe) < 1e-8
+    assert abs(curve.rolling_sharpe - expected_rolling) < 1e-6
+    
+    metrics = StrategyEvaluator.calculate_metrics(engine, {'000001': totals[-1]})
+    assert metrics['max_drawdown'] == curve.max_drawdown
+    
+    # 早于最后一天的快照被拒绝，曲线和统计不变
+    with pytest.raises(ValueError):
+        engine.record_snapshot({'000001': 1.0}, date=dates[0])
+    assert len(curve) == 300 and abs(curve.max_drawdown - expected_dd) < 1e-12
+    
+    # 每日快照追加到日志，合并时才写入列式文件
+    with open(Config.DATA_FILES['snapshots'], encoding='utf-8') as f:
+        saved = json.load(f)
+    with open(Config.DATA_FILES['journal'], encoding='utf-8') as f:
+        journaled = [json.loads(line) for line in f]
+    assert 0 < len(saved['date']) < 300
+    assert journaled and all(r['type'] == 'snapshot' for r in journaled)
+    
+    # 重新加载: 列式文件恢复曲线与增量统计，缺失价格沿用上次价格
+    restored = VirtualTradingEngine(initial_cash=0)
+    restored.current_holdings = {'000001': 1.0}
+    assert restored.equity_curve.total_asset == curve.total_asset
+    assert restored.equity_curve.sharpe_ratio == curve.sharpe_ratio
+    assert restored.record_snapshot({}, date=dates[-1]).total_asset == totals[-1]
+    
+    # 迁移到SQLite时权益曲线一并导入
+    migrated = VirtualTradingEngine(initial_cash=0, storage=migrate_json_to_sqlite(
+        str(tmp_path / 'migrated.db')))
+    assert migrated.equity_curve.total_asset == curve.total_asset
+    assert migrated.equity_curve.max_drawdown == curve.max_drawdown
+    assert migrated.last_prices == {'000001': totals[-1]}
+    migrated.storage.close()
+
+
+def test_first_snapshot_values_at_cost():
+    """首次快照当天没有净值: 按持仓成本估值，不按0计"""
+    fresh = VirtualTradingEngine(initial_cash=100000, storage=MemoryStorage())
+    fresh.add_signal(TradeSignal(
+        date='2024-01-02', fund_code='000009', fund_name='', signal_type='BUY',
+        signal_score=2, nav_price=1.2, suggested_amount=10000, reason='测试'))
+    fresh.execute_signal(fresh.get_pending_signals()[0], '2024-01-03', 1.25)
+    snapshot = fresh.record_snapshot({}, date='2024-01-03')
+    cost = fresh.ledger.get('000009').avg_cost
+    assert cost > 0 and snapshot.market_prices == {'000009': cost}
+    assert abs(snapshot.total_asset - (fresh.current_cash + fresh.current_holdings['000009'] * cost)) < 1e-9
+
+
+def test_sqlite_snapshots(tmp_path, totals, dates):
+    storage = SQLiteStorage(str(tmp_path / 'curve.db'))
+    engine = VirtualTradingEngine(initial_cash=0, storage=storage)
+    engine.current_holdings = {'000001': 1.0}
+    for date, total in zip(dates[:50], totals[:50]):
+        engine.record_snapshot({'000001': total}, date=date)
+    reloaded = EquityCurve.from_columns(storage.load_snapshots())
+    assert reloaded.max_drawdown == engine.equity_curve.max_drawdown
+    storage.close()
@@ -0,0 +1,122 @@
+# 接口缓存测试 - LRU / 磁盘 / 收盘过期 / 后台刷新 / 并发未命中
+import datetime
+import threading
+import time
+import pandas as pd
+import pytest
+import pytz
+import data_fetcher
+from config import Config
+from fetch_cache import FetchCache, cached
+from trading_calendar import TradingCalendar
+
+TZ = pytz.timezone(Config.TIMEZONE)
+
+
+def _at(*args) -> float:
+    return TZ.localize(datetime.datetime(*args)).timestamp()
+
+
+@pytest.fixture
+def clock():
+    return {'now': _at(2026, 10, 16, 10, 0)}   # 周五
+
+
+def test_fetch_cache(tmp_path, clock):
+    calls = []
+    network = {'down': False}
+    
+    def rankings(symbol="股票型"):
+        calls.append(symbol)
+        if network['down']:
+            raise IOError("network down")
+        return pd.DataFrame({'基金代码': ['000001'], 'version': [len(calls)]})
+    
+    cache = FetchCache(str(tmp_path), calendar=TradingCalendar(), now=lambda: clock['now'])
+    fetch = cached("rankings", cache=cache)(rankings)
+    
+    # 首次下载，之后命中内存；位置参数和关键字参数是同一条缓存
+    first = fetch("股票型")
+    first['version'] = -1                      # 调用方修改不影响缓存
+    assert fetch(symbol="股票型")['version'].iloc[0] == 1
+    assert fetch()['version'].iloc[0] == 1
+    fetch("指数型")
+    assert calls == ["股票型", "指数型"]
+    assert cache.stats['rankings']['hits'] == 2 and cache.stats['rankings']['misses'] == 2
+    
+    # 当天收盘时过期
+    key = next(iter(cache._memory))
+    assert cache._get(key, "rankings").expires_at == _at(2026, 10, 16, 15, 0)
+    
+    # 其他进程 (新缓存实例) 从磁盘读取
+    other = FetchCache(str(tmp_path), calendar=TradingCalendar(), now=lambda: clock['now'])
+    assert cached("rankings", cache=other)(rankings)("股票型")['version'].iloc[0] == 1
+    assert len(calls) == 2 and other.stats['rankings']['disk_hits'] == 1
+    
+    # 刚过收盘: 先返回旧值，后台刷新；刷新后的数据到下周一收盘才过期
+    clock['now'] = _at(2026, 10, 16, 15, 2)
+    assert fetch("股票型")['version'].iloc[0] == 1
+    deadline = time.time() + 5
+    while cache.stats['rankings']['refreshes'] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.stats['rankings']['stale'] == 1
+    assert fetch("股票型")['version'].iloc[0] == 3
+    assert cache._get(key, "rankings").expires_at == _at(2026, 10, 19, 15, 0)
+    
+    # 下一个交易日14:30的扫描 (过期约一天) 同步下载新数据，不返回前一天的旧值
+    clock['now'] = _at(2026, 10, 20, 14, 30)
+    assert fetch("股票型")['version'].iloc[0] == 4
+    assert cache.stats['rankings']['stale'] == 1
+    
+    # 下载失败: 有旧值时退回旧值，没有时抛出异常
+    network['down'] = True
+    clock['now'] += 4 * 86400
+    assert fetch("股票型")['version'].iloc[0] == 4
+    with pytest.raises(IOError):
+        fetch("混合型")
+
+
+def test_memory_lru(clock):
+    """内存层按最近使用淘汰"""
+    calls = []
+    
+    def rankings(symbol="股票型"):
+        calls.append(symbol)
+        return pd.DataFrame({'基金代码': ['000001']})
+    
+    small = FetchCache(None, max_entries=2, calendar=TradingCalendar(), now=lambda: clock['now'])
+    fetch_small = cached("rankings", cache=small)(rankings)
+    for symbol in ["A", "B", "A", "C", "A", "B"]:
+        fetch_small(symbol)
+    assert calls == ["A", "B", "C", "B"]
+    assert small.stats['rankings'] == {'hits': 2, 'disk_hits': 0, 'misses': 4,
+                                       'stale': 0, 'refreshes': 0, 'errors': 0}
+
+
+def test_concurrent_misses_fetch_once(clock):
+    """并发未命中只下载一次，其余线程等待并复用结果"""
+    downloads = []
+    
+    def slow_rankings(symbol="股票型"):
+        downloads.append(symbol)
+        time.sleep(0.2)
+        return pd.DataFrame({'基金代码': ['000001'], 'version': [len(downloads)]})
+    
+    shared = FetchCache(None, calendar=TradingCalendar(), now=lambda: clock['now'])
+    fetch_shared = cached("rankings", cache=shared)(slow_rankings)
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(fetch_shared("股票型")['version'].iloc[0]))
+               for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert downloads == ["股票型"] and results == [1] * 8
+    assert shared.stats['rankings']['misses'] == 1 and shared.stats['rankings']['hits'] == 7
+    assert shared._key_locks == {}
+
+
+def test_data_fetcher_endpoints_cached():
+    """data_fetcher 的日频接口已接入缓存"""
+    assert data_fetcher.fetch_fund_rankings.__wrapped__.__name__ == 'fetch_fund_rankings'
+    assert data_fetcher.fetch_index_valuation.__wrapped__.__name__ == 'fetch_index_valuation'
@@ -0,0 +1,25 @@
+# 横截面指标引擎测试 - 与逐只计算结果一致
+import pandas as pd
+from indicator_engine import scan_latest
+from strategy import composite_signal_strategy
+
+
+def test_scan_latest_matches_per_fund(synthetic_nav):
+    """一次性打分与 composite_signal_strategy 逐只计算相同"""
+    nav_data = {f"00{i:04d}": synthetic_nav(i, periods=60 + i * 7) for i in range(40)}
+    # 交易日不同的基金 (如QDII) 也应按各自的净值序列计算
+    shifted = synthetic_nav(99)
+    shifted['date'] = shifted['date'] - pd.Timedelta(days=2)
+    nav_data['QDII01'] = shifted
+    nav_data['SHORT1'] = synthetic_nav(7, periods=12)
+    
+    result = scan_latest(nav_data).set_index('基金代码')
+    
+    assert 'SHORT1' not in result.index
+    for code, df in nav_data.items():
+        if code == 'SHORT1':
+            continue
+        suggestion, score, rsi = composite_signal_strategy(df)
+        row = result.loc[code]
+        assert row['基础评分'] == score and row['操作建议'] == suggestion
+        assert abs(row['RSI(14)'] - rsi) < 1e-8
@@ -0,0 +1,72 @@
+# 盘中轮询监控测试
+import numpy as np
+import pandas as pd
+import pytest
+from intraday_monitor import IntradayMonitor
+from monitor import analyze_fund
+
+
+class FakeClient:
+    """按预设估值返回结果的估值客户端"""
+    def __init__(self):
+        self.estimates = {}
+        self.calls = 0
+    
+    def fetch(self, fund_list, deadline=None):
+        self.calls += 1
+        return pd.DataFrame([{'基金代码': c, '基金名称': f'基金{c}', '估算涨跌幅': self.estimates[c]}
+                             for c in fund_list if c in self.estimates])
+
+
+@pytest.fixture
+def nav_data(synthetic_nav):
+    """000001 持续下跌 (RSI 低位)，000002 / 000003 为随机游走"""
+    falling = synthetic_nav(41, 120)
+    falling['nav'] = np.linspace(1.5, 1.0, 120) * (1 + 0.002 * np.sin(np.arange(120)))
+    return {'000001': falling, '000002': synthetic_nav(42, 120), '000003': synthetic_nav(43, 120)}
+
+
+def test_intraday_monitor(nav_data):
+    client = FakeClient()
+    received = []
+    monitor = IntradayMonitor(list(nav_data), held_info={}, client=client, interval=0,
+                              nav_data=nav_data, on_event=received.append)
+    
+    client.estimates = {'000001': '0.10', '000002': '0.20', '000003': '0.30'}
+    monitor.poll_once()
+    assert monitor.stats['rescored'] == 3
+    
+    # 估值不变的基金不重新打分
+    monitor.poll_once()
+    assert monitor.stats['rescored'] == 3 and monitor.stats['unchanged'] == 3
+    
+    # 盘中大跌: 只重新打分变化的基金，并产生 -> 大跌捡漏机会 的事件
+    client.estimates['000001'] = '-2.50'
+    events = monitor.poll_once()
+    assert monitor.stats['rescored'] == 4
+    assert len(events) == 1 and events[0].fund_code == '000001'
+    assert events[0].current == "大跌捡漏机会" and events[0].previous != "大跌捡漏机会"
+    assert received[-1] is events[0]
+    
+    # 估值并入指标: 与把估值当作今日净值追加到历史后调用 analyze_fund 相同 (最新净值仍为昨日收盘)
+    unfolded = IntradayMonitor(list(nav_data), held_info={}, client=client, interval=0,
+                               nav_data=nav_data, on_event=lambda e: None, fold_estimate=False)
+    unfolded.poll_once()
+    for code, df in nav_data.items():
+        est = client.estimates[code]
+        rt_row = {'基金代码': code, '基金名称': f'基金{code}', '估算涨跌幅': est}
+        last = df['nav'].iloc[-1]
+        extended = pd.concat([df, pd.DataFrame({
+            'date': [df['date'].iloc[-1] + pd.Timedelta(days=1)],
+            'nav': [last * (1 + float(est) / 100)]})], ignore_index=True)
+        assert monitor.rows[code] == {**analyze_fund(code, extended, rt_row, {}), '最新净值': last}
+        # 不并入时指标停在昨日收盘，与每日监控相同
+        assert unfolded.rows[code] == analyze_fund(code, df, rt_row, {})
+    assert list(monitor.results()['基金代码']) == list(nav_data)
+    
+    # 持续轮询: 达到次数后停止
+    calls = client.calls
+    monitor.run(until=None, max_polls=3)
+    assert client.calls == calls + 3
+    monitor.close()
+    unfolded.close()
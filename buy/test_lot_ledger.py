@@ -0,0 +1,49 @@
+# 持仓批次账本测试 - 先进先出 / 加权平均成本与引擎集成
+from lot_ledger import LotLedger
+from virtual_trading import VirtualTradingEngine, TradeSignal
+
+
+def test_fifo_ledger():
+    """先进先出: 卖出先消耗最早的批次"""
+    ledger = LotLedger("fifo")
+    ledger.buy('000001', 100, 1.0, '2025-01-01')
+    ledger.buy('000001', 100, 0.8, '2025-01-11')   # 亏损补仓
+    assert abs(ledger.get('000001').avg_cost - 0.9) < 1e-12
+    assert abs(ledger.sell('000001', 150, 1.0) - (150 - 140)) < 1e-9
+    lots = ledger.get('000001')
+    assert abs(lots.shares - 50) < 1e-9 and abs(lots.avg_cost - 0.8) < 1e-12
+    position = ledger.position('000001', 1.1, as_of='2025-01-21')
+    assert abs(position['unrealized_pnl'] - 15) < 1e-9
+    assert abs(position['holding_days'] - 10) < 1e-9
+    assert abs(position['turnover'] - (180 + 150)) < 1e-9
+
+
+def test_average_cost_ledger():
+    """加权平均: 卖出按平均成本结转"""
+    ledger = LotLedger("average")
+    ledger.buy('000001', 100, 1.0, '2025-01-01')
+    ledger.buy('000001', 100, 0.8, '2025-01-11')
+    assert abs(ledger.sell('000001', 150, 1.0) - (150 - 135)) < 1e-9
+    position = ledger.position('000001', 1.1, as_of='2025-01-21')
+    assert abs(position['cost_price'] - 0.9) < 1e-12
+    assert abs(position['holding_days'] - 15) < 1e-9
+
+
+def test_engine_weighted_cost(tmp_path, monkeypatch):
+    """多次买入后成本为真实加权成本，重新加载后一致"""
+    monkeypatch.chdir(tmp_path)
+    engine = VirtualTradingEngine(initial_cash=100000)
+    for day, price in [('2025-02-03', 1.0), ('2025-02-10', 0.8), ('2025-02-17', 0.9)]:
+        signal = TradeSignal(date=day, fund_code='000002', fund_name='', signal_type='BUY',
+                             signal_score=2, nav_price=price, suggested_amount=1000,
+                             reason='补仓')
+        engine.add_signal(signal)
+        engine.execute_signal(signal, day, price)
+    pnl = engine.get_unrealized_pnl({'000002': 1.0}, as_of='2025-02-17')['000002']
+    shares = 1000 / 1.0 + 1000 / 0.8 + 1000 / 0.9
+    assert abs(pnl['cost_price'] - 3000 / shares) < 1e-12
+    assert abs(pnl['pnl'] - (shares - 3000)) < 1e-9
+    
+    restored = VirtualTradingEngine(initial_cash=100000)
+    again = restored.get_unrealized_pnl({'000002': 1.0}, as_of='2025-02-17')['000002']
+    assert again == pnl
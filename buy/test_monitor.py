@@ -0,0 +1,35 @@
+# 信号监控测试 - 并行分析与顺序模式一致
+import pandas as pd
+import monitor
+
+
+def test_parallel_check_signals(monkeypatch, synthetic_nav):
+    """并行模式结果与顺序模式相同，异常和数据不足的基金被跳过"""
+    codes = [f"00{i:04d}" for i in range(12)] + ['BROKEN', 'SHORT']
+    
+    def fake_fetch_fund_data(code, start, end):
+        if code == 'BROKEN':
+            raise ValueError("模拟接口异常")
+        if code == 'SHORT':
+            return synthetic_nav(0, periods=10)
+        return synthetic_nav(int(code))
+    
+    def fake_realtime(fund_list, max_workers=8):
+        return pd.DataFrame([
+            {"基金代码": c, "基金名称": f"基金{c}", "估算涨跌幅": "-2.10"}
+            for c in fund_list[::2]
+        ])
+    
+    monkeypatch.setattr(monitor, 'fetch_fund_data', fake_fetch_fund_data)
+    monkeypatch.setattr(monitor, 'fetch_realtime_estimation', fake_realtime)
+    progress = []
+    held = {codes[1]: {'cost': 1.05}, codes[2]: {'cost': 0.0}}
+    sequential = monitor.check_signals(codes, held_info=held)
+    parallel = monitor.check_signals(
+        codes, held_info=held, parallel=True, max_workers=4,
+        progress_callback=lambda stage, done, total, code: progress.append((stage, done))
+    )
+    
+    assert parallel['基金代码'].tolist() == codes[:12]
+    pd.testing.assert_frame_equal(sequential, parallel)
+    assert ('fetch', len(codes)) in progress and ('score', 13) in progress
@@ -0,0 +1,37 @@
+# 策略参数优化器测试 - 规则回测、并行一致性与评估缓存
+import pytest
+from param_optimizer import ParameterOptimizer, PARAM_SPACE
+from rule_backtest import IndicatorCache, evaluate_rules
+
+
+@pytest.fixture
+def nav_data(synthetic_nav):
+    return {code: synthetic_nav(seed, 600) for seed, code in enumerate(['000001', '000002', '000003'])}
+
+
+def test_threshold_above_max_score_never_trades(nav_data):
+    cache = IndicatorCache.from_frame(nav_data['000001'])
+    assert evaluate_rules(cache, {'buy_score_threshold': 99})['trades'] == 0
+
+
+def test_parallel_matches_serial(nav_data):
+    """同一随机种子下多进程与单进程结果一致"""
+    serial = ParameterOptimizer(nav_data, max_workers=1, seed=7).optimize(
+        'genetic', population=10, generations=4)
+    parallel = ParameterOptimizer(nav_data, max_workers=2, seed=7).optimize(
+        'genetic', population=10, generations=4)
+    assert serial['best_params'] == parallel['best_params']
+    assert serial['best_score'] == parallel['best_score']
+    assert serial['history'] == sorted(serial['history'])
+
+
+def test_evaluation_cache_and_early_stop(nav_data):
+    optimizer = ParameterOptimizer(nav_data, max_workers=1, seed=1)
+    candidate = {k: v[0] for k, v in PARAM_SPACE.items()}
+    first = optimizer.evaluate([candidate, dict(candidate)])
+    assert optimizer.evaluations == 1 and optimizer.cache_hits == 1
+    assert optimizer.evaluate([candidate]) == first[:1]
+    
+    # 随机搜索在连续无提升时提前停止
+    result = optimizer.random_search(n_iter=400, batch_size=4, patience=2)
+    assert result['evaluations'] < 400
@@ -0,0 +1,54 @@
+# 多基金组合回测测试
+import numpy as np
+import pandas as pd
+from indicator_engine import compute_indicators
+from main_integrated import convert_monitor_results_to_signals
+from monitor import analyze_fund
+from portfolio_backtest import estimate_matrix, entry_units, exit_signal, run_portfolio_backtest
+
+
+def test_rules_match_monitor(synthetic_nav):
+    """买卖规则与 monitor.analyze_fund + 信号转换一致"""
+    df = synthetic_nav(11, 400)
+    matrix = df['nav'].to_numpy().reshape(-1, 1)
+    ind = compute_indicators(matrix)
+    est = estimate_matrix(matrix)
+    units = entry_units(ind, est)
+    rsi_prev = ind['rsi'][:-1, 0]
+    for t in range(40, 400, 3):
+        rt_row = {'基金代码': '000001', '估算涨跌幅': est[t, 0]}
+        row = analyze_fund('000001', df.iloc[:t], rt_row)
+        signal = convert_monitor_results_to_signals([row])['signals'][0]
+        expected = signal['suggested_amount'] if signal['signal'] == 'BUY' else 0.0
+        assert units[t, 0] == expected, (t, row)
+        
+        cost = df['nav'].iloc[t] / (1 + (t % 7 - 3) * 0.06)
+        row = analyze_fund('000001', df.iloc[:t], rt_row, {'000001': {'cost': cost}})
+        signal = convert_monitor_results_to_signals([row])['signals'][0]
+        profit = (df['nav'].iloc[t] - cost) / cost * 100
+        assert exit_signal(rsi_prev[t - 1], profit) == (signal['signal'] == 'SELL'), (t, row)
+
+
+def test_portfolio_limits():
+    """100只基金、5年: 现金不为负，买入后仓位不超过限制"""
+    rng = np.random.default_rng(0)
+    nav_data = {
+        f'{i:06d}': pd.DataFrame({
+            'date': pd.bdate_range(end='2026-01-01', periods=1250 - i * 5),
+            'nav': np.cumprod(1 + rng.normal(0.0002, 0.013, 1250 - i * 5)),
+        })
+        for i in range(100)
+    }
+    result = run_portfolio_backtest(nav_data, initial_cash=100000, unit_amount=5000)
+    daily = result['daily']
+    assert len(daily) == 1250 and result['summary']['buys'] > 0 and result['summary']['sells'] > 0
+    assert (daily['cash'] >= -1e-6).all()
+    assert abs(daily['total_asset'].iloc[-1] - result['summary']['final_value']) < 1e-6
+    
+    # 总仓位上限为0时不买入；单只上限限制首笔买入
+    none = run_portfolio_backtest(nav_data, total_position_limit=0)
+    assert none['summary']['buys'] == 0
+    single = run_portfolio_backtest({'000001': nav_data['000001']}, initial_cash=10000,
+                                    unit_amount=100000, max_position_size=0.3)
+    first_buy = single['daily'][single['daily']['holdings_value'] > 0].iloc[0]
+    assert abs(first_buy['holdings_value'] / first_buy['total_asset'] - 0.3) < 1e-9
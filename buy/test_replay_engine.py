@@ -0,0 +1,59 @@
+# 历史回放引擎测试
+import os
+from replay_engine import ReplayEngine
+from risk_simulator import RiskSimulator
+
+
+def test_replay_engine(tmp_path, monkeypatch, synthetic_nav):
+    """按模拟日期逐日运行完整流程，不产生任何文件"""
+    nav_data = {'000001': synthetic_nav(21, 160), '000002': synthetic_nav(22, 160)}
+    dates = nav_data['000001']['date']
+    start = str(dates.iloc[60].date())
+    
+    monkeypatch.chdir(tmp_path)
+    replay = ReplayEngine(nav_data, initial_cash=100000, unit_amount=5000, start=start)
+    result = replay.run()
+    # 内存存储 + 不落盘的进化历史: 回放过程不产生任何文件
+    assert os.listdir(tmp_path) == []
+    
+    daily = result['daily']
+    engine = replay.engine
+    assert len(daily) == 100 and daily['date'].iloc[0] == start
+    # 每个模拟日一个快照，日期为模拟日期而不是今天
+    assert engine.equity_curve.dates == daily['date'].tolist()
+    assert abs(daily['total_asset'].iloc[-1] - result['summary']['final_value']) < 1e-9
+    
+    # 信号在次日按当日净值成交
+    executed = [s for s in engine.signals_history if s.execution_date]
+    assert executed and result['summary']['trades'] == len(executed)
+    for s in executed:
+        assert s.execution_date > s.date
+        nav = nav_data[s.fund_code]
+        assert s.execution_price == nav.loc[nav['date'] == s.execution_date, 'nav'].iloc[0]
+    assert engine.storage.events_written == len(engine.signals_history) + len(executed)
+    
+    # 进化记录使用模拟时钟
+    history = replay.agent.optimizer.evolver.params_history
+    assert len(history) == 100 and history[-1][0].startswith(daily['date'].iloc[-1])
+    
+    timings = result['timings'].set_index('stage')
+    for stage in ('execute', 'monitor', 'convert', 'ingest', 'optimize', 'dashboard'):
+        assert timings.loc[stage, 'calls'] == 100
+
+
+def test_replay_risk_uses_history_until_day(synthetic_nav):
+    """回放: 每日只用截至当日的净值模拟持仓风险"""
+    nav_data = {'000001': synthetic_nav(21, 90), '000002': synthetic_nav(22, 90)}
+    start = str(nav_data['000001']['date'].iloc[60].date())
+    replay = ReplayEngine(nav_data, initial_cash=100000, unit_amount=5000, start=start,
+                          risk_simulator=RiskSimulator(n_paths=500, seed=0))
+    held_days = 0
+    for day in replay.dates:
+        replay.step(day)
+        history = replay.risk_simulator.nav_data
+        assert set(history) == set(replay.engine.current_holdings)
+        assert all(df['date'].max() <= day for df in history.values())
+        if history:
+            held_days += 1
+            assert replay.agent.optimizer.evaluation_history[-1]['metrics']['var_95'] > 0
+    assert held_days > 0
@@ -0,0 +1,100 @@
+# 蒙特卡洛风险模拟测试
+import numpy as np
+import pandas as pd
+import pytest
+from auto_agent import AutoTradingAgent
+from clock import SimulatedClock
+from config import Config
+from nav_store import NavStore
+from risk_simulator import RiskSimulator, simulate_paths, risk_report
+from strategy_evolution import StrategyEvolver, AdaptiveStrategyOptimizer
+from trading_session import TradingSession
+from trading_storage import MemoryStorage
+from virtual_trading import VirtualTradingEngine, TradeSignal
+
+
+@pytest.fixture
+def volatile():
+    """高波动基金的净值"""
+    rng = np.random.default_rng(1)
+    return {'000001': pd.DataFrame({'date': pd.bdate_range(end='2026-01-01', periods=500),
+                                    'nav': np.cumprod(1 + rng.normal(0, 0.04, 500))})}
+
+
+@pytest.fixture
+def engine():
+    """九成资金持有 000001 的账户"""
+    engine = VirtualTradingEngine(100000, storage=MemoryStorage())
+    signal = TradeSignal(date='2026-01-01', fund_code='000001', fund_name='测试', signal_type='BUY',
+                         signal_score=3, nav_price=1.0, suggested_amount=90000, reason='测试')
+    engine.add_signal(signal)
+    engine.execute_signal(signal, '2026-01-02', 1.0)
+    return engine
+
+
+def test_simulate_paths():
+    # 单日、块长1时即为对历史收益的独立抽样，VaR 接近正态分位
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0005, 0.01, size=(5000, 1))
+    pnl, drawdown = simulate_paths(returns, np.array([100000.0]), 0.0, horizon=1,
+                                   n_paths=40000, block_size=1, seed=1)
+    report = risk_report(pnl, drawdown, 100000.0)
+    assert abs(report['var_95'] - 100000 * (1.645 * 0.01 - 0.0005)) < 60
+    assert report['cvar_95'] > report['var_95'] and report['cvar_99'] > report['var_99']
+    assert report['drawdown_p50'] <= report['drawdown_p95'] <= report['drawdown_p99']
+    
+    # 相同种子结果相同，与进程数无关
+    a = simulate_paths(returns, np.array([5000.0]), 1000.0, 20, 12000, 5, seed=7)
+    b = simulate_paths(returns, np.array([5000.0]), 1000.0, 20, 12000, 5, seed=7, max_workers=2)
+    assert np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])
+
+
+def test_riskless_portfolios():
+    """只涨不跌的基金没有回撤；全部为现金时没有风险"""
+    steady = {'000001': pd.DataFrame({'date': pd.bdate_range(end='2026-01-01', periods=300),
+                                      'nav': 1.001 ** np.arange(300)})}
+    simulator = RiskSimulator(nav_data=steady, n_paths=2000, seed=0)
+    report = simulator.simulate({'000001': 1000.0}, 500.0, {'000001': 1.2})
+    assert report['drawdown_p99'] == 0 and report['var_99'] < 0 and report['prob_loss'] == 0
+    report = simulator.simulate({}, 500.0, {})
+    assert report['var_95'] == 0 and report['initial_value'] == 500.0
+
+
+def test_daily_optimization_warns(volatile, engine):
+    """接入每日优化: 高波动持仓触发模拟回撤警告"""
+    optimizer = AdaptiveStrategyOptimizer(
+        engine=engine, evolver=StrategyEvolver(evolution_log=None),
+        risk_simulator=RiskSimulator(nav_data=volatile, n_paths=5000, seed=0))
+    result = optimizer.run_daily_optimization({'000001': 1.0}, '2026-01-02')
+    metrics = result['metrics']
+    assert metrics['risk_horizon'] == Config.RISK_HORIZON_DAYS
+    assert metrics['simulated_drawdown_95'] > Config.MAX_DRAWDOWN_LIMIT
+    assert "模拟未来" in result['recommendation']
+
+
+def test_session_wiring(monkeypatch, volatile, engine):
+    """交易会话默认不模拟，按配置开启或传入模拟器；模拟器使用会话的时钟"""
+    assert TradingSession(storage=MemoryStorage(),
+                          evolver=StrategyEvolver(evolution_log=None)).risk_simulator is None
+    monkeypatch.setattr(Config, 'RISK_SIMULATION_ENABLED', True)
+    clock = SimulatedClock('2025-12-31')
+    session = TradingSession(storage=MemoryStorage(), clock=clock,
+                             evolver=StrategyEvolver(evolution_log=None, clock=clock))
+    assert isinstance(session.risk_simulator, RiskSimulator)
+    assert session.optimizer.risk_simulator is session.risk_simulator
+    assert session.risk_simulator.clock is clock
+    
+    session = TradingSession(engine=engine, evolver=StrategyEvolver(evolution_log=None),
+                             risk_simulator=RiskSimulator(nav_data=volatile, n_paths=2000, seed=0))
+    metrics = AutoTradingAgent(session=session).on_monitor_completion(
+        {'date': '2026-01-05', 'signals': [], 'prices': {'000001': 1.0}})['optimization_result']['metrics']
+    assert metrics['var_95'] > 0 and metrics['simulated_drawdown_95'] > 0
+
+
+def test_store_history_ends_at_clock_today(tmp_path, volatile):
+    """从净值库读取的区间截至模拟时钟的今天，不读取之后的净值"""
+    store = NavStore(str(tmp_path / 'nav.db'))
+    store.append('000001', volatile['000001'])
+    history = RiskSimulator(store=store, clock=SimulatedClock('2025-12-31'))._history(['000001'])
+    assert history['000001']['date'].max() == pd.Timestamp('2025-12-31')
+    store.close()
@@ -0,0 +1,249 @@
+# 定时调度器测试 - 准时触发、重叠策略、停机补跑
+import datetime
+import json
+import threading
+import time
+import pytest
+from auto_agent import AutoTradingAgent
+from config import Config
+from scheduler import DailyScheduler, ScheduledJob
+from strategy_evolution import StrategyEvolver
+from trading_calendar import TradingCalendar
+from trading_session import TradingSession
+from trading_storage import MemoryStorage
+
+# 9月28日之后停机，10月9日14:00重启 (中间有国庆休市)
+RESTART = datetime.datetime(2026, 10, 9, 14, 0)
+DAYS = [datetime.date(2026, 9, 29), datetime.date(2026, 9, 30), datetime.date(2026, 10, 8)]
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    scheduler = DailyScheduler(timezone='Asia/Shanghai', calendar=TradingCalendar())
+    scheduler.execution_log = str(tmp_path / 'scheduler_execution.json')
+    scheduler.state_file = str(tmp_path / 'scheduler_state.json')
+    yield scheduler
+    scheduler.stop()
+
+
+def _write_state(scheduler, state):
+    with open(scheduler.state_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+
+def _restart(scheduler, at=RESTART):
+    """按重启时间重新排定各任务"""
+    restart = scheduler.timezone.localize(at)
+    for job in scheduler.jobs.values():
+        job.next_run = scheduler._next_run(job, restart)
+
+
+def test_next_run_in_scheduler_timezone(scheduler):
+    scheduler.schedule_daily_job("收盘执行", "15:00", lambda: None)
+    next_run = scheduler.next_run_time("收盘执行")
+    assert next_run.strftime('%H:%M') == '15:00' and next_run.utcoffset().total_seconds() == 8 * 3600
+    assert next_run > scheduler.now()
+    
+    # 非交易日不安排
+    after = scheduler.timezone.localize(datetime.datetime(2026, 9, 30, 15, 0))
+    assert scheduler._next_run(scheduler.jobs["收盘执行"], after).date() == datetime.date(2026, 10, 8)
+
+
+def test_next_run_keeps_local_time_across_dst():
+    ny = DailyScheduler(timezone='America/New_York')
+    job = ScheduledJob("nyc", datetime.time(14, 30), lambda: None, (), {}, "skip",
+                       trading_days_only=False)
+    before = ny._next_run(job, ny.timezone.localize(datetime.datetime(2026, 3, 6, 15, 0)))
+    after = ny._next_run(job, before)
+    assert before.hour == after.hour == 14
+    assert (after - before).total_seconds() == 23 * 3600
+
+
+def test_jobs_fire_on_time(scheduler):
+    """到点准时触发，慢任务不推迟同一时刻的其他任务"""
+    fired = {}
+    release = threading.Event()
+    
+    def slow_job():
+        fired['slow'] = time.time()
+        release.wait(5)
+    
+    def fast_job():
+        fired['fast'] = time.time()
+    
+    due = scheduler.now().replace(microsecond=0) + datetime.timedelta(seconds=2)
+    at = due.strftime('%H:%M:%S')
+    scheduler.schedule_daily_job("慢任务", at, slow_job, trading_days_only=False)
+    scheduler.schedule_daily_job("快任务", at, fast_job, trading_days_only=False)
+    scheduler.start_background()
+    deadline = time.time() + 5
+    while len(fired) < 2 and time.time() < deadline:
+        time.sleep(0.05)
+    release.set()
+    lateness = {k: v - due.timestamp() for k, v in fired.items()}
+    assert set(lateness) == {'slow', 'fast'}
+    assert all(0 <= late < 0.5 for late in lateness.values()), lateness
+    assert scheduler.next_run_time("快任务") == due + datetime.timedelta(days=1)
+
+
+@pytest.mark.parametrize("policy, expected_runs, status", [
+    ('skip', 1, '跳过'), ('queue', 2, '成功'), ('cancel', 2, '已取消')])
+def test_overlap_policies(scheduler, policy, expected_runs, status):
+    gate, runs = threading.Event(), []
+    
+    def job(cancel_event=None):
+        runs.append(cancel_event)
+        gate.wait(5)
+        return 'cancelled' if cancel_event.is_set() else 'done'
+    
+    scheduler.schedule_daily_job(policy, "03:00", job, overlap=policy)
+    scheduler.run_job_now(policy)
+    while not runs:
+        time.sleep(0.01)
+    scheduler.run_job_now(policy)
+    if policy == 'cancel':
+        while len(runs) < 2:
+            time.sleep(0.01)
+        assert runs[0].is_set() and not runs[1].is_set()
+    gate.set()
+    while scheduler.jobs[policy].running or scheduler.jobs[policy].queued:
+        time.sleep(0.01)
+    assert len(runs) == expected_runs
+    
+    scheduler.stop()
+    with open(scheduler.execution_log, encoding='utf-8') as f:
+        assert status in [entry['status'] for entry in json.load(f)]
+
+
+def test_unknown_overlap_policy(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.schedule_daily_job("bad", "10:00", lambda: None, overlap="ignore")
+
+
+def test_restart_after_stop(scheduler):
+    """停止后可以再次启动，重复启动报错"""
+    scheduler.start_background()
+    scheduler.stop()
+    restarted = threading.Event()
+    due = scheduler.now().replace(microsecond=0) + datetime.timedelta(seconds=2)
+    scheduler.schedule_daily_job("重启后", due.strftime('%H:%M:%S'), restarted.set,
+                                 trading_days_only=False)
+    scheduler.start_background()
+    with pytest.raises(RuntimeError):
+        scheduler.start_background()
+    assert restarted.wait(5), "停止后重新启动的调度器应按时触发任务"
+
+
+def test_catch_up_missed_trading_days(scheduler):
+    runs = []
+    
+    def cycle(run_date=None):
+        runs.append(('cycle', run_date))
+    
+    def trades(run_date=None):
+        runs.append(('trades', run_date))
+    
+    scheduler.schedule_daily_job("cycle", "14:30", cycle, catch_up=True)
+    scheduler.schedule_daily_job("trades", "15:00", trades, catch_up=True)
+    scheduler.schedule_daily_job("other", "15:00", trades)
+    
+    # 首次运行没有记录，不补跑
+    assert scheduler.missed_runs() == []
+    
+    _write_state(scheduler, {"cycle": "2026-09-28", "trades": "2026-09-28"})   # 旧格式
+    _restart(scheduler)
+    missed = scheduler.missed_runs()
+    assert [(t.strftime('%m-%d %H:%M'), name) for t, name in missed] == [
+        ('09-29 14:30', 'cycle'), ('09-29 15:00', 'trades'),
+        ('09-30 14:30', 'cycle'), ('09-30 15:00', 'trades'),
+        ('10-08 14:30', 'cycle'), ('10-08 15:00', 'trades')]
+    
+    scheduler.catch_up()
+    assert runs == [(name, day) for day in DAYS for name in ('cycle', 'trades')]
+    with open(scheduler.state_file, encoding='utf-8') as f:
+        assert json.load(f) == {"last_runs": {"cycle": "2026-10-08", "trades": "2026-10-08"},
+                                "missed": {}}
+    assert scheduler.missed_runs() == []     # 补跑过的不会重复
+
+
+def test_failed_and_skipped_days_replayed(scheduler):
+    """失败或跳过的日期在之后的成功运行后仍会补跑，补跑成功后移除"""
+    runs = []
+    
+    def flaky(run_date=None):
+        runs.append(run_date)
+        if run_date == DAYS[0]:
+            raise RuntimeError("数据源超时")
+    
+    scheduler.schedule_daily_job("flaky", "14:30", flaky, catch_up=True)
+    job = scheduler.jobs["flaky"]
+    _restart(scheduler)
+    job.running += 1
+    scheduler._run(job, threading.Event(), DAYS[0])      # 09-29 失败
+    job.running += 1
+    scheduler._dispatch(job, DAYS[1])                     # 09-30 上次仍在运行，跳过
+    job.running -= 1
+    job.running += 1
+    scheduler._run(job, threading.Event(), DAYS[2])      # 10-08 成功
+    with open(scheduler.state_file, encoding='utf-8') as f:
+        state = json.load(f)
+    assert state['last_runs']['flaky'] == "2026-10-08"
+    assert state['missed'] == {"flaky": ["2026-09-29", "2026-09-30"]}
+    assert [(t.date(), name) for t, name in scheduler.missed_runs()] == \
+        [(DAYS[0], 'flaky'), (DAYS[1], 'flaky')]
+    
+    job.func = lambda run_date=None: runs.append(run_date)
+    scheduler.catch_up()
+    assert runs[-2:] == DAYS[:2]
+    assert scheduler.missed_runs() == []
+
+
+def test_background_catch_up_keeps_schedule(scheduler):
+    """积压的补跑在后台进行，不推迟当天其他任务的准时执行"""
+    today = scheduler.now().date()
+    _write_state(scheduler, {"last_runs": {"backlog": (today - datetime.timedelta(days=3)).isoformat()}})
+    release, backlog_days, fired = threading.Event(), [], threading.Event()
+    
+    def backlog(run_date=None):
+        backlog_days.append(run_date)
+        release.wait(5)
+    
+    scheduler.schedule_daily_job("backlog", "00:00:01", backlog, trading_days_only=False,
+                                 catch_up=True)
+    due = scheduler.now().replace(microsecond=0) + datetime.timedelta(seconds=1)
+    scheduler.schedule_daily_job("today", due.strftime('%H:%M:%S'), fired.set,
+                                 trading_days_only=False)
+    scheduler.start_background()
+    try:
+        assert fired.wait(3), "补跑期间当天的任务应准时执行"
+        assert backlog_days == [today - datetime.timedelta(days=2)]   # 第一次补跑仍在进行
+        release.set()
+        deadline = time.time() + 5
+        while scheduler.jobs["backlog"].catching_up and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        release.set()
+        scheduler.stop()
+    assert backlog_days == [today - datetime.timedelta(days=n) for n in (2, 1, 0)]
+
+
+def test_catch_up_limited_to_recent_days(scheduler):
+    """停机过久时只补跑最近几次"""
+    scheduler.schedule_daily_job("cycle", "14:30", lambda run_date=None: None, catch_up=True)
+    _write_state(scheduler, {"cycle": "2026-01-05"})
+    _restart(scheduler)
+    missed = scheduler.missed_runs()
+    assert len(missed) == Config.MAX_CATCHUP_DAYS
+    assert missed[-1][0].date() == datetime.date(2026, 10, 8)
+
+
+def test_agent_jobs_catch_up(tmp_path):
+    """智能体的每日任务按交易日运行并支持补跑"""
+    agent = AutoTradingAgent(session=TradingSession(
+        initial_cash=100000, storage=MemoryStorage(), evolver=StrategyEvolver(evolution_log=None)))
+    agent.scheduler.state_file = str(tmp_path / 'scheduler_state.json')
+    agent.setup_daily_automation()
+    assert all(job.catch_up and job.trading_days_only and job.accepts_run_date
+               for job in agent.scheduler.jobs.values())
+    result = agent.execute_daily_trades(run_date=datetime.date(2026, 10, 8))
+    assert result['executed_count'] == 0
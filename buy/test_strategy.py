@@ -0,0 +1,13 @@
+# 定投策略测试 - 向量化实现与原循环实现数值一致
+from benchmark_strategy import (simple_dca_strategy_loop, ma_timing_strategy_loop,
+                                make_nav_history, assert_identical)
+from strategy import simple_dca_strategy, ma_timing_strategy
+
+
+def test_vectorized_dca_strategies():
+    data = make_nav_history(years=10)
+    for amount in (1000, 333.33):
+        assert_identical(simple_dca_strategy_loop(data, amount), simple_dca_strategy(data, amount))
+        assert_identical(ma_timing_strategy_loop(data, amount), ma_timing_strategy(data, amount))
+        assert_identical(ma_timing_strategy_loop(data, amount, ma_window=60),
+                         ma_timing_strategy(data, amount, ma_window=60))
@@ -0,0 +1,65 @@
+# 策略评估与进化测试 - 增量统计、指标缓存与参数优化模式
+import numpy as np
+from clock import SimulatedClock
+from strategy_evolution import StrategyEvaluator, StrategyEvolver
+from virtual_trading import VirtualTradingEngine, TradeSignal
+
+
+def test_incremental_metrics_cache(tmp_path, monkeypatch):
+    """增量统计与全量扫描一致，同一状态和价格只计算一次"""
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(5)
+    engine = VirtualTradingEngine(initial_cash=1000000)
+    with engine.batch():
+        for i in range(300):
+            signal = TradeSignal(
+                date=f'2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}', fund_code=f'{i % 9:06d}',
+                fund_name='', signal_type='BUY' if i % 4 else 'SELL',
+                signal_score=2, nav_price=float(rng.uniform(0.9, 1.1)),
+                suggested_amount=1000, reason='测试')
+            engine.add_signal(signal)
+            if i % 3:
+                engine.execute_signal(signal, '2025-12-31', float(rng.uniform(0.9, 1.1)))
+    prices = {f'{i:06d}': 1.05 for i in range(9)}
+    
+    executed = [s for s in engine.signals_history if s.execution_date]
+    winning = sum(1 for s in executed if s.signal_type == 'BUY' and
+                  s.nav_price > s.execution_price)
+    report = engine.get_performance_report(prices)
+    assert report['executed_signals'] == len(executed)
+    assert abs(report['win_rate'] - winning / len(executed)) < 1e-12
+    
+    restored = VirtualTradingEngine(initial_cash=1000000)
+    assert StrategyEvaluator._get_monthly_returns(restored) == \
+        StrategyEvaluator._get_monthly_returns(engine)
+    
+    calls = []
+    original = StrategyEvaluator._compute_metrics
+    
+    def counting(engine, current_prices):
+        calls.append(1)
+        return original(engine, current_prices)
+    
+    monkeypatch.setattr(StrategyEvaluator, '_compute_metrics', staticmethod(counting))
+    first = StrategyEvaluator.calculate_metrics(engine, prices)
+    again = StrategyEvaluator.calculate_metrics(engine, dict(prices))
+    assert first == again and len(calls) == 1
+    StrategyEvaluator.calculate_metrics(engine, {**prices, '000001': 1.2})
+    assert len(calls) == 2
+    # 直接追加信号也会使缓存失效
+    engine.signals_history.append(TradeSignal(
+        date='2026-01-01', fund_code='000001', fund_name='', signal_type='BUY',
+        signal_score=2, nav_price=1.0, suggested_amount=100, reason='直接追加'))
+    metrics = StrategyEvaluator.calculate_metrics(engine, prices)
+    assert len(calls) == 3 and metrics['total_signals'] == 301
+
+
+def test_evolver_optimize_parameters(tmp_path, monkeypatch, synthetic_nav):
+    """进化器的优化模式更新策略参数，进化记录使用进化器的时钟"""
+    monkeypatch.chdir(tmp_path)
+    nav_data = {code: synthetic_nav(seed, 600) for seed, code in enumerate(['000001', '000002', '000003'])}
+    evolver = StrategyEvolver(clock=SimulatedClock('2025-06-30'))
+    result = evolver.optimize_parameters(nav_data, method='random', max_workers=1,
+                                         n_iter=20, batch_size=10)
+    assert evolver.get_current_params() == result['best_params']
+    assert evolver.params_history[-1][0].startswith('2025-06-30')
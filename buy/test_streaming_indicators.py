@@ -0,0 +1,50 @@
+# 增量指标测试 - 滑动窗口、逐日状态打分与盘中预览
+import numpy as np
+import pandas as pd
+from monitor import analyze_fund, analyze_fund_state
+from streaming_indicators import RollingWindow, FundIndicatorState, seed_states
+
+
+def test_rolling_window_matches_pandas():
+    """滑动窗口与 pandas rolling 一致 (包括定期重新求和之后)"""
+    values = 1 + np.cumsum(np.random.default_rng(0).normal(0, 0.01, 2500))
+    window = RollingWindow(20)
+    means, stds = [], []
+    for v in values:
+        window.push(v)
+        means.append(window.mean())
+        stds.append(window.std())
+    series = pd.Series(values)
+    assert np.allclose(means, series.rolling(20).mean(), equal_nan=True, rtol=0, atol=1e-12)
+    assert np.allclose(stds, series.rolling(20).std(), equal_nan=True, rtol=0, atol=1e-12)
+
+
+def test_state_scoring_matches_analyze_fund(synthetic_nav):
+    """逐日更新的状态打分与 analyze_fund 对整段历史打分完全相同"""
+    df = synthetic_nav(31, 300)
+    state = FundIndicatorState.from_frame(df.iloc[:30])
+    for t in range(30, 300):
+        for est in (None, -2.0, 0.8):
+            rt_row = None if est is None else {'基金代码': '000001', '估算涨跌幅': est}
+            cost = df['nav'].iloc[t - 1] * (1 + (t % 5 - 2) * 0.06)
+            for held in ({}, {'000001': {'cost': cost}}):
+                expected = analyze_fund('000001', df.iloc[:t], rt_row, held)
+                assert analyze_fund_state('000001', state, rt_row, held) == expected, t
+        # 预览 (盘中估值) 不修改状态，且与正式推入后的指标一致
+        rsi_before = state.latest()['rsi']
+        preview = state.preview(df['nav'].iloc[t])
+        assert np.isclose(state.latest()['rsi'], rsi_before, equal_nan=True)
+        state.update(df['nav'].iloc[t])
+        latest = state.latest()
+        for key, value in preview.items():
+            assert np.isclose(value, latest[key], rtol=0, atol=1e-12, equal_nan=True), key
+
+
+def test_seed_states_rescoring(synthetic_nav):
+    """由历史净值初始化的状态对整个观察列表重新打分"""
+    nav_data = {f'{i:06d}': synthetic_nav(100 + i, 250) for i in range(50)}
+    states = seed_states(nav_data)
+    rows = [analyze_fund_state(code, s, {'基金代码': code, '估算涨跌幅': -1.6})
+            for code, s in states.items()]
+    full = [analyze_fund(code, df, {'基金代码': code, '估算涨跌幅': -1.6}) for code, df in nav_data.items()]
+    assert rows == full
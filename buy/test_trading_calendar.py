@@ -0,0 +1,24 @@
+# 交易日历测试 - 内置节假日与本地覆盖文件
+import datetime
+import json
+from trading_calendar import TradingCalendar
+
+
+def test_builtin_holidays():
+    calendar = TradingCalendar()
+    assert calendar.is_trading_day('2026-09-30')
+    assert not calendar.is_trading_day('2026-10-01')     # 国庆
+    assert not calendar.is_trading_day('2026-10-10')     # 周六 (调休也不开市)
+    assert calendar.next_trading_day('2026-09-30') == datetime.date(2026, 10, 8)
+    assert calendar.previous_trading_day('2026-10-08') == datetime.date(2026, 9, 30)
+    assert len(calendar.trading_days('2026-02-09', '2026-02-27')) == 9    # 15个工作日，春节休市6天
+
+
+def test_override_file_replaces_year(tmp_path):
+    """本地文件按年份覆盖内置数据"""
+    override = tmp_path / 'trading_holidays.json'
+    override.write_text(json.dumps({"2026": ["2026-10-01"], "2027": [["2027-02-08", "2027-02-12"]]}),
+                        encoding='utf-8')
+    custom = TradingCalendar(override_file=str(override))
+    assert not custom.is_trading_day('2026-10-01') and custom.is_trading_day('2026-10-02')
+    assert custom.next_trading_day('2027-02-05') == datetime.date(2027, 2, 15)
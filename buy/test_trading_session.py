@@ -0,0 +1,56 @@
+# 共享交易会话测试 - 智能体与优化器共用引擎，状态变化通知
+from auto_agent import AutoTradingAgent
+from integration import MonitorIntegration
+from strategy_evolution import StrategyEvaluator, StrategyEvolver
+from trading_session import TradingSession
+from trading_storage import MemoryStorage
+
+
+def test_shared_trading_session():
+    class CountingStorage(MemoryStorage):
+        loads = 0
+        
+        def load(self):
+            CountingStorage.loads += 1
+            return super().load()
+    
+    # 智能体与优化器共用同一个引擎，账户状态只加载一次
+    session = TradingSession(initial_cash=100000, storage=CountingStorage(),
+                             evolver=StrategyEvolver(evolution_log=None))
+    agent = AutoTradingAgent(session=session)
+    integration = MonitorIntegration(agent)
+    assert CountingStorage.loads == 1
+    assert agent.engine is agent.optimizer.engine is session.engine
+    assert integration.session is session
+    
+    events = []
+    session.subscribe(lambda kind, info: events.append(kind))
+    
+    # 智能体写入信号后，优化器立即看到最新状态
+    metrics = StrategyEvaluator.calculate_metrics(session.engine, {})
+    assert metrics['total_signals'] == 0
+    agent.on_monitor_completion({'date': '2026-01-05', 'signals': [
+        {'fund_code': '000001', 'fund_name': '测试', 'signal': 'BUY', 'score': 3,
+         'current_price': 1.0, 'suggested_amount': 5000, 'reason': '测试'}]})
+    assert 'signals' in events and 'snapshot' in events
+    assert session.optimizer.get_performance_dashboard({})['metrics']['total_signals'] == 1
+    
+    # 状态变化时指标缓存被立即丢弃
+    StrategyEvaluator.calculate_metrics(session.engine, {'000001': 1.0})
+    assert session.engine in StrategyEvaluator._metrics_cache
+    result = agent.execute_pending_signals({'000001': 1.0})
+    assert result['executed_count'] == 1 and events[-1] == 'execution'
+    assert session.engine not in StrategyEvaluator._metrics_cache
+    assert StrategyEvaluator.calculate_metrics(session.engine, {'000001': 1.0})['executed_signals'] == 1
+    
+    # 回调出错不影响交易
+    session.subscribe(lambda kind, info: 1 / 0)
+    session.engine.record_snapshot({'000001': 1.1}, '2026-01-06')
+    assert len(session.engine.equity_curve) == 2
+
+
+def test_default_agent_single_engine(tmp_path, monkeypatch):
+    """默认构造的智能体也只有一个引擎"""
+    monkeypatch.chdir(tmp_path)
+    default_agent = AutoTradingAgent(initial_cash=50000)
+    assert default_agent.optimizer.engine is default_agent.engine
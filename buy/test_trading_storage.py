@@ -0,0 +1,78 @@
+# 存储后端测试 - SQLite存储的状态恢复、跨线程写入与整体重写
+import os
+import threading
+from dataclasses import asdict
+import pytest
+from trading_storage import SQLiteStorage, TradingStorage
+from virtual_trading import VirtualTradingEngine, TradeSignal
+
+
+def test_sqlite_storage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db_path = str(tmp_path / 'trading.db')
+    engine = VirtualTradingEngine(initial_cash=100000, storage=SQLiteStorage(db_path))
+    for i in range(30):
+        engine.add_signal(TradeSignal(
+            date=f'2025-05-{i % 28 + 1:02d}', fund_code=f'{i % 3:06d}', fund_name='',
+            signal_type='BUY', signal_score=2, nav_price=1.1 if i % 2 else 0.9,
+            suggested_amount=100, reason='测试'))
+    for s in engine.get_pending_signals()[:20]:
+        engine.execute_signal(s, '2025-06-01', 1.0)
+    engine.add_signal(TradeSignal(
+        date='2025-06-02', fund_code='000000', fund_name='', signal_type='SELL',
+        signal_score=2, nav_price=1.0, suggested_amount=0, reason='测试'))
+    engine.execute_signal(engine.get_pending_signals()[-1], '2025-06-02', 1.2)
+    
+    report = engine.get_performance_report({'000001': 1.0, '000002': 1.0})
+    assert report['executed_signals'] == 21 and report['pending_signals'] == 10
+    assert abs(report['win_rate'] - 10 / 21) < 1e-12
+    assert not os.path.exists('virtual_signals.json')
+    
+    restored = VirtualTradingEngine(initial_cash=100000, storage=SQLiteStorage(db_path))
+    assert [asdict(s) for s in restored.signals_history] == \
+        [asdict(s) for s in engine.signals_history]
+    assert restored.current_holdings == engine.current_holdings
+    assert restored.current_cash == engine.current_cash
+    executions = restored.storage._conn.execute("SELECT COUNT(*) FROM executions").fetchone()[0]
+    assert executions == 21
+    
+    # 在其他线程 (调度器线程池) 中写入
+    errors = []
+    
+    def add_from_worker(i):
+        try:
+            restored.add_signal(TradeSignal(
+                date='2025-06-03', fund_code=f'{i:06d}', fund_name='', signal_type='BUY',
+                signal_score=2, nav_price=1.0, suggested_amount=100, reason='线程'))
+        except Exception as e:
+            errors.append(e)
+    
+    workers = [threading.Thread(target=add_from_worker, args=(i,)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert not errors, errors
+    assert len(restored.storage.load()['signals']) == 35
+    
+    # 整体重写 (迁移/压缩) 后成交表按新的信号下标重建
+    state = restored.storage.load()
+    state['signals'] = state['signals'][1:]
+    restored.storage.compact(state)
+    rows = restored.storage._conn.execute("""
+        SELECT COUNT(*), SUM(s.execution_date = e.execution_date AND s.fund_code = e.fund_code)
+        FROM executions e JOIN signals s ON s.id = e.signal_id
+    """).fetchone()
+    assert rows == (20, 20), rows
+    engine.storage.close()
+    restored.storage.close()
+
+
+def test_incomplete_storage_rejected():
+    """未实现 write_events 的后端在构造时即报错"""
+    class ReadOnlyStorage(TradingStorage):
+        def load(self):
+            return {'signals': [], 'holdings': {}, 'cash': None}
+    
+    with pytest.raises(TypeError):
+        ReadOnlyStorage()
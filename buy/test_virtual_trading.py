@@ -0,0 +1,95 @@
+# 虚拟交易引擎测试 - 追加式信号日志、信号索引与批量提交
+import os
+from trading_storage import SQLiteStorage
+from virtual_trading import VirtualTradingEngine, TradeSignal
+
+
+def _buy(date, fund_code, amount=100, nav_price=1.0, reason='测试'):
+    return TradeSignal(date=date, fund_code=fund_code, fund_name='', signal_type='BUY',
+                       signal_score=2, nav_price=nav_price, suggested_amount=amount, reason=reason)
+
+
+def test_signal_journal_replay(tmp_path, monkeypatch):
+    """重启后从快照 + 日志重放账户状态，合并后日志清空"""
+    monkeypatch.chdir(tmp_path)
+    engine = VirtualTradingEngine(initial_cash=100000, compact_every=5)
+    for i in range(3):
+        engine.add_signal(_buy(f'2025-02-{i+1:02d}', f'00100{i}', amount=1000))
+    engine.execute_signal(engine.signals_history[1], '2025-02-03', 1.25)
+    
+    # 4条事件尚未合并，快照文件不存在，全部来自日志
+    assert not os.path.exists(engine.storage.signals_file)
+    restored = VirtualTradingEngine(initial_cash=100000, compact_every=5)
+    assert len(restored.signals_history) == 3
+    assert restored.signals_history[1].execution_price == 1.25
+    assert restored.current_holdings == {'001001': 800.0}
+    assert restored.current_cash == 99000
+    
+    # 第5条事件触发合并：写快照并清空日志
+    engine.add_signal(TradeSignal(
+        date='2025-02-04', fund_code='001001', fund_name='基金1',
+        signal_type='SELL', signal_score=-1, nav_price=1.3,
+        suggested_amount=0, reason='测试'))
+    assert os.path.getsize(engine.storage.journal_file) == 0
+    engine.execute_signal(engine.signals_history[3], '2025-02-05', 1.5)
+    
+    restored = VirtualTradingEngine(initial_cash=100000)
+    assert len(restored.signals_history) == 4
+    assert restored.current_holdings == {}
+    assert restored.current_cash == 99000 + 800 * 1.5
+
+
+def test_indexed_signal_lookup(tmp_path, monkeypatch):
+    """待执行信号由索引维护，已执行的信号不会重复成交"""
+    monkeypatch.chdir(tmp_path)
+    engine = VirtualTradingEngine(initial_cash=100000)
+    for i in range(200):
+        engine.add_signal(_buy(f'2025-03-{i % 28 + 1:02d}', f'{i % 7:06d}'))
+    # 直接追加到列表的信号也会被补建索引
+    engine.signals_history.append(_buy('2025-04-01', '000001', reason='直接追加'))
+    
+    pending = engine.get_pending_signals()
+    assert len(pending) == 201
+    executed = sum(engine.execute_signal(s, '2025-04-02', 1.0) for s in pending)
+    assert executed == 201 and engine.get_pending_signals() == []
+    
+    assert not engine.execute_signal(pending[0], '2025-04-03', 1.0)
+    assert engine.current_cash == 100000 - 201 * 100
+    
+    restored = VirtualTradingEngine(initial_cash=100000)
+    assert restored.get_pending_signals() == []
+
+
+def test_batch_commit(tmp_path, monkeypatch):
+    """批次内的事件一次落盘，半条批次记录不会被重放"""
+    monkeypatch.chdir(tmp_path)
+    engine = VirtualTradingEngine(initial_cash=100000)
+    journal = engine.storage.journal_file
+    with engine.batch():
+        for i in range(50):
+            engine.add_signal(_buy('2025-07-01', f'{i:06d}'))
+        # 批次结束前不落盘
+        assert not os.path.exists(journal)
+    with open(journal, encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+    
+    with engine.batch():
+        for s in engine.get_pending_signals()[:10]:
+            engine.execute_signal(s, '2025-07-02', 1.0)
+    
+    # 模拟写到一半崩溃: 残留的半条批次记录被整体忽略
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"seq": 3, "type": "batch", "events": [{"type": "sig')
+    restored = VirtualTradingEngine(initial_cash=100000)
+    assert len(restored.signals_history) == 50
+    assert len(restored.get_pending_signals()) == 40
+    assert restored.current_cash == 100000 - 10 * 100
+    
+    # SQLite后端: 一个事务
+    storage = SQLiteStorage(str(tmp_path / 'batch.db'))
+    engine = VirtualTradingEngine(initial_cash=100000, storage=storage)
+    with engine.batch():
+        for i in range(50):
+            engine.add_signal(_buy('2025-07-01', f'{i:06d}'))
+    assert len(storage.load()['signals']) == 50
+    storage.close()
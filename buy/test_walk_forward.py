@@ -0,0 +1,29 @@
+# 滚动样本外验证测试
+import numpy as np
+import pandas as pd
+from rule_backtest import IndicatorCache, evaluate_rules
+from walk_forward import make_windows, walk_forward
+
+
+def test_make_windows():
+    assert make_windows(10, 4, 2) == [(0, 4, 4, 6), (2, 6, 6, 8), (4, 8, 8, 10)]
+
+
+def test_walk_forward_validation(synthetic_nav):
+    nav_data = {code: synthetic_nav(seed, 900) for seed, code in enumerate(['000001', '000002'])}
+    kwargs = dict(train_days=300, test_days=150, search_kwargs={'n_iter': 12, 'batch_size': 6})
+    serial = walk_forward(nav_data, max_workers=1, **kwargs)
+    parallel = walk_forward(nav_data, max_workers=2, **kwargs)
+    assert len(serial) == 4
+    pd.testing.assert_frame_equal(serial, parallel)
+    
+    # 测试区间紧接训练区间，且样本外得分等于在全区间指标上切片模拟的结果
+    assert (serial['test_start'] == serial['train_end']).all()
+    last = serial.iloc[-1]
+    params = {k[len('param_'):]: last[k] for k in serial.columns if k.startswith('param_')}
+    scores = []
+    for df in nav_data.values():
+        dates = df['date'].to_numpy()
+        start = int(np.searchsorted(dates, last['test_start'].to_datetime64()))
+        scores.append(evaluate_rules(IndicatorCache.from_frame(df), params, 1000.0, start, len(df))['sharpe'])
+    assert abs(np.mean(scores) - last['test_score']) < 1e-12
@@ -0,0 +1,142 @@
+# 交易日历 - 沪深交易所休市安排 (内置 + 本地文件覆盖)，供调度器跳过非交易日
+import datetime
+import json
+import os
+from typing import Dict, Iterable, List, Set
+from config import Config
+
+
+# 沪深交易所休市日 (周末另外排除，调休的周末也不开市)
+# 每项为单个日期或 [开始, 结束] 闭区间
+CN_HOLIDAYS: Dict[str, list] = {
+    "2024": [
+        "2024-01-01",                       # 元旦
+        ["2024-02-09", "2024-02-16"],       # 春节
+        ["2024-04-04", "2024-04-05"],       # 清明节
+        ["2024-05-01", "2024-05-03"],       # 劳动节
+        "2024-06-10",                       # 端午节
+        ["2024-09-16", "2024-09-17"],       # 中秋节
+        ["2024-10-01", "2024-10-07"],       # 国庆节
+    ],
+    "2025": [
+        "2025-01-01",
+        ["2025-01-28", "2025-02-04"],
+        "2025-04-04",
+        ["2025-05-01", "2025-05-05"],
+        "2025-06-02",
+        ["2025-10-01", "2025-10-08"],       # 国庆节、中秋节
+    ],
+    "2026": [
+        ["2026-01-01", "2026-01-02"],
+        ["2026-02-16", "2026-02-23"],
+        "2026-04-06",
+        ["2026-05-01", "2026-05-05"],
+        "2026-06-19",
+        "2026-09-25",
+        ["2026-10-01", "2026-10-07"],
+    ],
+}
+
+
+def _expand(entries: Iterable) -> Set[datetime.date]:
+    """展开日期/区间列表"""
+    days = set()
+    for entry in entries:
+        if isinstance(entry, (list, tuple)):
+            start, end = (datetime.date.fromisoformat(d) for d in entry)
+        else:
+            start = end = datetime.date.fromisoformat(entry)
+        while start <= end:
+            days.add(start)
+            start += datetime.timedelta(days=1)
+    return days
+
+
+class TradingCalendar:
+    """
+    交易日历
+
+    交易日 = 非周末且不在休市表中的日期。休市表以年为单位，本地文件
+    (格式同 CN_HOLIDAYS: {"2027": ["2027-01-01", ["2027-02-05", "2027-02-12"], ...]})
+    中出现的年份整体替换内置数据，用于补充新年度或修正安排。
+    表中没有的年份只排除周末 (首次查询时提示)
+    """
+
+    def __init__(self, holidays: Dict[str, list] = None, override_file: str = None):
+        """
+        Args:
+            holidays: 休市表，默认 CN_HOLIDAYS
+            override_file: 本地覆盖文件，不存在时忽略
+        """
+        table = dict(CN_HOLIDAYS if holidays is None else holidays)
+        if override_file and os.path.exists(override_file):
+            try:
+                with open(override_file, 'r', encoding='utf-8') as f:
+                    table.update({str(year): entries for year, entries in json.load(f).items()})
+                print(f"✓ 已加载交易日历覆盖文件: {override_file}")
+            except Exception as e:
+                print(f"⚠️ 交易日历文件 {override_file} 读取失败，使用内置数据: {e}")
+
+        self.years = {int(year) for year in table}
+        self.holidays: Set[datetime.date] = set()
+        for entries in table.values():
+            self.holidays |= _expand(entries)
+        self._warned: Set[int] = set()
+
+    @classmethod
+    def default(cls) -> 'TradingCalendar':
+        """内置数据 + Config 中的本地覆盖文件"""
+        return cls(override_file=Config.DATA_FILES['trading_calendar'])
+
+    @staticmethod
+    def _to_date(day) -> datetime.date:
+        if isinstance(day, str):
+            return datetime.date.fromisoformat(day[:10])
+        if isinstance(day, datetime.datetime):   # 包括 pandas.Timestamp
+            return day.date()
+        return day
+
+    def is_trading_day(self, day) -> bool:
+        day = self._to_date(day)
+        if day.weekday() >= 5:
+            return False
+        if day.year not in self.years and day.year not in self._warned:
+            self._warned.add(day.year)
+            print(f"⚠️ 交易日历缺少 {day.year} 年休市安排，仅排除周末 "
+                  f"(可在 {Config.DATA_FILES['trading_calendar']} 中补充)")
+        return day not in self.holidays
+
+    def next_trading_day(self, day, inclusive: bool = False) -> datetime.date:
+        """day 之后的第一个交易日 (inclusive=True 时 day 本身是交易日则返回 day)"""
+        day = self._to_date(day)
+        if not inclusive:
+            day += datetime.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += datetime.timedelta(days=1)
+        return day
+
+    def previous_trading_day(self, day, inclusive: bool = False) -> datetime.date:
+        """day 之前的最后一个交易日"""
+        day = self._to_date(day)
+        if not inclusive:
+            day -= datetime.timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= datetime.timedelta(days=1)
+        return day
+
+    def trading_days(self, start, end) -> List[datetime.date]:
+        """[start, end] 内的交易日 (升序)"""
+        day, end = self._to_date(start), self._to_date(end)
+        days = []
+        while day <= end:
+            if self.is_trading_day(day):
+                days.append(day)
+            day += datetime.timedelta(days=1)
+        return days
+
+
+if __name__ == "__main__":
+    calendar = TradingCalendar.default()
+    today = datetime.date.today()
+    print(f"今天 {today} {'是' if calendar.is_trading_day(today) else '不是'}交易日")
+    print(f"下一个交易日: {calendar.next_trading_day(today)}")
@@ -0,0 +1,65 @@
+# 交易会话 - 智能体、优化器、仪表板、集成器共享的单一引擎实例
+from typing import Callable, Dict
+from config import Config
+from clock import SystemClock
+from virtual_trading import VirtualTradingEngine
+from trading_storage import TradingStorage
+from strategy_evolution import AdaptiveStrategyOptimizer, StrategyEvolver
+from risk_simulator import RiskSimulator
+
+
+class TradingSession:
+    """
+    交易会话
+
+    一个进程内只加载一次虚拟账户状态，所有组件读写同一个引擎:
+    智能体写入的信号和成交，优化器、仪表板立即可见，不再各自维护一份副本
+    """
+
+    def __init__(self, initial_cash: float = None, storage: TradingStorage = None,
+                 engine: VirtualTradingEngine = None, optimizer: AdaptiveStrategyOptimizer = None,
+                 evolver: StrategyEvolver = None, clock=None,
+                 risk_simulator: RiskSimulator = None):
+        """
+        Args:
+            initial_cash: 初始资金，默认 Config.INITIAL_CASH
+            storage: 存储后端，默认按配置创建
+            engine: 已有的引擎，默认新建 (只加载一次)
+            optimizer: 已有的优化器，默认新建并评估同一个引擎
+            evolver: 策略进化器，默认新建 (从进化历史文件加载)
+            clock: 时钟，默认系统时间
+            risk_simulator: 新建优化器使用的风险模拟器，
+                默认只在 Config.RISK_SIMULATION_ENABLED 为真时新建 (从净值库读取持仓基金)
+        """
+        initial_cash = Config.INITIAL_CASH if initial_cash is None else initial_cash
+        self.clock = clock or (optimizer.clock if optimizer is not None else SystemClock())
+        if engine is None:
+            engine = optimizer.engine if optimizer is not None else \
+                VirtualTradingEngine(initial_cash, storage=storage)
+        self.engine = engine
+        if optimizer is None:
+            if risk_simulator is None and Config.RISK_SIMULATION_ENABLED:
+                risk_simulator = RiskSimulator()
+            optimizer = AdaptiveStrategyOptimizer(
+                engine=self.engine, evolver=evolver, clock=self.clock,
+                risk_simulator=risk_simulator)
+        self.optimizer = optimizer
+        self.evolver = self.optimizer.evolver
+        self.risk_simulator = self.optimizer.risk_simulator
+
+    @property
+    def state_version(self) -> int:
+        """引擎状态版本号"""
+        return self.engine.state_version
+
+    def subscribe(self, callback: Callable[[str, Dict], None]) -> Callable[[str, Dict], None]:
+        """注册状态变化回调 callback(kind, info)，见 VirtualTradingEngine.add_listener"""
+        return self.engine.add_listener(callback)
+
+    def unsubscribe(self, callback: Callable[[str, Dict], None]):
+        self.engine.remove_listener(callback)
+
+    def close(self):
+        """把完整状态写回存储并释放资源"""
+        self.engine.save_to_file()
+        self.engine.storage.close()
@@ -0,0 +1,501 @@
+# 虚拟交易存储层 - VirtualTradingEngine 的可插拔持久化后端
+import json
+import os
+import sqlite3
+import datetime
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+from config import Config, DatabaseConfig
+
+# 信号字段 (与 virtual_trading.TradeSignal 一致)
+SIGNAL_FIELDS = (
+    'date', 'fund_code', 'fund_name', 'signal_type', 'signal_score', 'nav_price',
+    'suggested_amount', 'reason', 'execution_date', 'execution_price',
+    'execution_amount', 'execution_shares',
+)
+
+
+class TradingStorage(ABC):
+    """
+    存储后端接口 (子类必须实现 load 和 write_events)
+
+    引擎的每次状态变更都以事件形式交给存储层:
+      {'type': 'signal', 'signal': {...}}
+      {'type': 'execution', 'index': 信号下标, 'fund_code': ..., 'execution': {...},
+       'holding': 成交后该基金份额(清仓为None), 'cash': 成交后现金}
+    """
+
+    @abstractmethod
+    def load(self) -> Dict:
+        """
+        加载全部状态
+
+        Returns:
+            {'signals': [信号字典], 'holdings': {code: shares}, 'cash': 现金或None}
+        """
+
+    @abstractmethod
+    def write_events(self, events: List[Dict]) -> None:
+        """持久化一批事件 (同一批事件一次性写入)"""
+
+    def load_snapshots(self) -> Dict:
+        """
+        加载每日资产快照 (列式)
+
+        Returns:
+            {'date': [...], 'cash': [...], 'total_asset': [...], 'last_prices': 最近一次的价格}
+        """
+        return {'date': [], 'cash': [], 'total_asset': [], 'last_prices': {}}
+
+    def write_snapshot(self, snapshot: Dict) -> None:
+        """
+        保存一条每日资产快照 (与已保存的最后一条同日时覆盖)
+
+        Args:
+            snapshot: PortfolioSnapshot 字典
+        """
+        pass
+
+    def needs_compaction(self) -> bool:
+        """是否需要把完整状态重新写成快照"""
+        return False
+
+    def compact(self, state: Dict) -> None:
+        """写入完整状态快照，state 格式与 load() 的返回值相同"""
+        pass
+
+    def close(self) -> None:
+        """释放资源"""
+        pass
+
+
+class JsonFileStorage(TradingStorage):
+    """JSON快照 + 追加式日志 (JSONL)"""
+
+    def __init__(self, signals_file: str = None, positions_file: str = None,
+                 journal_file: str = None, snapshots_file: str = None,
+                 compact_every: int = 500):
+        """
+        Args:
+            signals_file: 信号快照文件
+            positions_file: 持仓快照文件
+            journal_file: 事件日志文件
+            snapshots_file: 每日资产快照文件 (列式)
+            compact_every: 日志累计多少条事件后合并进快照文件
+        """
+        self.signals_file = signals_file or Config.DATA_FILES['signals']
+        self.positions_file = positions_file or Config.DATA_FILES['positions']
+        self.journal_file = journal_file or Config.DATA_FILES['journal']
+        self.snapshots_file = snapshots_file or Config.DATA_FILES['snapshots']
+        self.compact_every = compact_every
+        self._journal_seq = 0          # 最后一条事件的序号
+        self._journal_pending = 0      # 上次合并后追加的事件数
+
+    def load(self) -> Dict:
+        """先读快照，再重放快照之后的日志事件"""
+        state = {'signals': [], 'holdings': {}, 'cash': None}
+        signals_seq = 0
+        positions_seq = 0
+
+        if os.path.exists(self.signals_file):
+            try:
+                with open(self.signals_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    state['signals'] = data.get('signals', [])
+                    signals_seq = data.get('journal_seq', 0)
+            except:
+                pass
+
+        if os.path.exists(self.positions_file):
+            try:
+                with open(self.positions_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    state['holdings'] = data.get('holdings', {})
+                    state['cash'] = data.get('cash')
+                    positions_seq = data.get('journal_seq', 0)
+            except:
+                pass
+
+        # 两个快照文件各自记录已包含的最后序号，只重放更新的事件
+        self._journal_seq = max(signals_seq, positions_seq)
+        self._journal_pending = 0
+        for record in self._read_journal():
+            seq = record['seq']
+            # 批量写入的事件合在一行记录中，整批要么完整重放要么整批丢弃
+            events = record['events'] if record['type'] == 'batch' else [record]
+            for event in events:
+                if seq > signals_seq:
+                    self._apply_signal_event(state, event)
+                if seq > positions_seq:
+                    self._apply_position_event(state, event)
+            self._journal_seq = max(self._journal_seq, seq)
+            self._journal_pending += len(events)
+        return state
+
+    def _read_journal(self) -> List[Dict]:
+        """读取日志事件 (进程崩溃时可能残留半行，忽略无法解析的行)"""
+        events = []
+        if not os.path.exists(self.journal_file):
+            return events
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+        return events
+
+    @staticmethod
+    def _apply_signal_event(state: Dict, event: Dict):
+        """重放事件中与信号历史相关的部分"""
+        signals = state['signals']
+        if event['type'] == 'signal':
+            signals.append(dict(event['signal']))
+        elif event['type'] == 'execution' and event['index'] < len(signals):
+            signals[event['index']].update(event['execution'])
+
+    @staticmethod
+    def _apply_position_event(state: Dict, event: Dict):
+        """重放事件中与持仓/现金相关的部分"""
+        if event['type'] == 'execution':
+            code = event['fund_code']
+            if event['holding'] is None:
+                state['holdings'].pop(code, None)
+            else:
+                state['holdings'][code] = event['holding']
+            state['cash'] = event['cash']
+
+    def write_events(self, events: List[Dict]) -> None:
+        """
+        把一批事件追加到日志，整批只写一次、fsync一次
+        多条事件合并为一行 batch 记录: 崩溃时残留的半行会被忽略，不会只写入半批
+        """
+        if not events:
+            return
+        self._journal_seq += 1
+        if len(events) == 1:
+            record = {'seq': self._journal_seq, **events[0]}
+        else:
+            record = {'seq': self._journal_seq, 'type': 'batch', 'events': events}
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_pending += len(events)
+
+    def needs_compaction(self) -> bool:
+        return self._journal_pending >= self.compact_every
+
+    def load_snapshots(self) -> Dict:
+        """先读列式快照文件，再按顺序并入其后追加到日志中的每日快照"""
+        columns = super().load_snapshots()
+        snapshots_seq = 0
+        if os.path.exists(self.snapshots_file):
+            try:
+                with open(self.snapshots_file, 'r', encoding='utf-8') as f:
+                    columns.update(json.load(f))
+                snapshots_seq = columns.pop('journal_seq', 0)
+            except:
+                pass
+        for record in self._read_journal():
+            if record['type'] == 'snapshot' and record['seq'] > snapshots_seq:
+                self._fold_snapshot(columns, record['snapshot'])
+        return columns
+
+    @staticmethod
+    def _fold_snapshot(columns: Dict, snapshot: Dict):
+        """把一条快照并入列式数据 (与最后一天同日时覆盖)"""
+        if columns['date'] and columns['date'][-1] == snapshot['date']:
+            for key in ('date', 'cash', 'total_asset'):
+                columns[key].pop()
+        columns['date'].append(snapshot['date'])
+        columns['cash'].append(snapshot['cash'])
+        columns['total_asset'].append(snapshot['total_asset'])
+        columns['last_prices'] = snapshot['market_prices']
+        columns['last_holdings'] = snapshot['holdings']
+
+    def write_snapshot(self, snapshot: Dict) -> None:
+        """快照作为一条事件追加到日志 (每天 O(1))，合并时再写入列式快照文件"""
+        self.write_events([{'type': 'snapshot', 'snapshot': snapshot}])
+
+    @staticmethod
+    def _write_json_atomic(path: str, data: Dict):
+        """先写临时文件再替换，避免写到一半时崩溃留下损坏的JSON"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def compact(self, state: Dict) -> None:
+        """将完整状态和日志中的每日快照写成快照文件并清空日志"""
+        timestamp = datetime.datetime.now().isoformat()
+        # 保存权益曲线 (并入日志中的每日快照)
+        self._write_json_atomic(self.snapshots_file, {
+            **self.load_snapshots(),
+            'journal_seq': self._journal_seq,
+        })
+
+        # 保存信号历史
+        self._write_json_atomic(self.signals_file, {
+            'signals': state['signals'],
+            'journal_seq': self._journal_seq,
+            'timestamp': timestamp
+        })
+
+        # 保存虚拟持仓
+        self._write_json_atomic(self.positions_file, {
+            'holdings': state['holdings'],
+            'cash': state['cash'],
+            'journal_seq': self._journal_seq,
+            'timestamp': timestamp
+        })
+
+        # 快照已包含全部事件，日志可以安全截断 (快照中的序号保证不会重复重放)
+        open(self.journal_file, 'w', encoding='utf-8').close()
+        self._journal_pending = 0
+
+
+class SQLiteStorage(TradingStorage):
+    """
+    SQLite存储: 信号、成交、持仓、快照分表存放并建立索引
+
+    连接可跨线程使用 (调度器线程池、异步入口)，所有读写由同一把锁串行化
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Args:
+            db_path: 数据库文件路径，默认 DatabaseConfig.DB_PATH (":memory:" 表示仅内存)
+        """
+        self.db_path = db_path or DatabaseConfig.DB_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signals (
+                id INTEGER PRIMARY KEY,            -- 信号下标 (从0开始)
+                date TEXT NOT NULL,
+                fund_code TEXT NOT NULL,
+                fund_name TEXT,
+                signal_type TEXT NOT NULL,
+                signal_score REAL,
+                nav_price REAL,
+                suggested_amount REAL,
+                reason TEXT,
+                execution_date TEXT,
+                execution_price REAL,
+                execution_amount REAL,
+                execution_shares REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_signals_key
+                ON signals (date, fund_code, signal_type);
+            CREATE INDEX IF NOT EXISTS idx_signals_pending
+                ON signals (execution_date);
+
+            CREATE TABLE IF NOT EXISTS executions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                signal_id INTEGER NOT NULL REFERENCES signals (id),
+                fund_code TEXT NOT NULL,
+                execution_date TEXT NOT NULL,
+                price REAL,
+                amount REAL,
+                shares REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_executions_fund
+                ON executions (fund_code, execution_date);
+
+            CREATE TABLE IF NOT EXISTS holdings (
+                fund_code TEXT PRIMARY KEY,
+                shares REAL NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS account (
+                key TEXT PRIMARY KEY,
+                value REAL
+            );
+
+            CREATE TABLE IF NOT EXISTS snapshots (
+                date TEXT PRIMARY KEY,
+                cash REAL NOT NULL,
+                total_asset REAL NOT NULL,
+                holdings TEXT NOT NULL,
+                market_prices TEXT NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def load(self) -> Dict:
+        columns = ', '.join(SIGNAL_FIELDS)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {columns} FROM signals ORDER BY id").fetchall()
+            holdings = dict(self._conn.execute("SELECT fund_code, shares FROM holdings").fetchall())
+            row = self._conn.execute("SELECT value FROM account WHERE key = 'cash'").fetchone()
+        signals = [dict(zip(SIGNAL_FIELDS, r)) for r in rows]
+        return {'signals': signals, 'holdings': holdings, 'cash': row[0] if row else None}
+
+    def write_events(self, events: List[Dict]) -> None:
+        """一批事件在同一个事务中写入"""
+        if not events:
+            return
+        with self._lock, self._conn:
+            for event in events:
+                self._apply_event(event)
+
+    def _apply_event(self, event: Dict):
+        if event['type'] == 'signal':
+            sig = event['signal']
+            next_id = self._conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM signals").fetchone()[0]
+            self._conn.execute(
+                f"INSERT INTO signals (id, {', '.join(SIGNAL_FIELDS)}) "
+                f"VALUES (?, {', '.join('?' * len(SIGNAL_FIELDS))})",
+                [next_id] + [sig.get(k) for k in SIGNAL_FIELDS]
+            )
+        elif event['type'] == 'execution':
+            ex = event['execution']
+            self._conn.execute(
+                "UPDATE signals SET execution_date = ?, execution_price = ?, "
+                "execution_amount = ?, execution_shares = ? WHERE id = ?",
+                (ex['execution_date'], ex['execution_price'], ex['execution_amount'],
+                 ex['execution_shares'], event['index'])
+            )
+            self._conn.execute(
+                "INSERT INTO executions (signal_id, fund_code, execution_date, price, amount, shares) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (event['index'], event['fund_code'], ex['execution_date'],
+                 ex['execution_price'], ex['execution_amount'], ex['execution_shares'])
+            )
+            self._set_position(event['fund_code'], event['holding'], event['cash'])
+
+    def _set_position(self, fund_code: str, shares: Optional[float], cash: float):
+        if shares is None:
+            self._conn.execute("DELETE FROM holdings WHERE fund_code = ?", (fund_code,))
+        else:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO holdings (fund_code, shares) VALUES (?, ?)",
+                (fund_code, shares)
+            )
+        self._conn.execute("INSERT OR REPLACE INTO account (key, value) VALUES ('cash', ?)", (cash,))
+
+    def compact(self, state: Dict) -> None:
+        """用完整状态覆盖数据库 (用于从JSON迁移或整体保存)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM executions")
+            self._conn.execute("DELETE FROM signals")
+            self._conn.execute("DELETE FROM holdings")
+            self._conn.executemany(
+                f"INSERT INTO signals (id, {', '.join(SIGNAL_FIELDS)}) "
+                f"VALUES (?, {', '.join('?' * len(SIGNAL_FIELDS))})",
+                [[i] + [sig.get(k) for k in SIGNAL_FIELDS] for i, sig in enumerate(state['signals'])]
+            )
+            # 成交表按新的信号下标重建
+            self._conn.executemany(
+                "INSERT INTO executions (signal_id, fund_code, execution_date, price, amount, shares) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(i, sig['fund_code'], sig['execution_date'], sig.get('execution_price'),
+                  sig.get('execution_amount'), sig.get('execution_shares'))
+                 for i, sig in enumerate(state['signals']) if sig.get('execution_date')]
+            )
+            self._conn.executemany(
+                "INSERT INTO holdings (fund_code, shares) VALUES (?, ?)",
+                list(state['holdings'].items())
+            )
+            self._conn.execute("INSERT OR REPLACE INTO account (key, value) VALUES ('cash', ?)",
+                               (state['cash'],))
+
+    def load_snapshots(self) -> Dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, cash, total_asset, market_prices FROM snapshots ORDER BY date"
+            ).fetchall()
+        return {
+            'date': [r[0] for r in rows],
+            'cash': [r[1] for r in rows],
+            'total_asset': [r[2] for r in rows],
+            'last_prices': json.loads(rows[-1][3]) if rows else {},
+        }
+
+    def write_snapshot(self, snapshot: Dict) -> None:
+        """只写入当天一行 (同日覆盖)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots (date, cash, total_asset, holdings, market_prices) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (snapshot['date'], snapshot['cash'], snapshot['total_asset'],
+                 json.dumps(snapshot['holdings']), json.dumps(snapshot['market_prices']))
+            )
+
+    def import_snapshots(self, columns: Dict) -> None:
+        """
+        导入整条权益曲线 (格式同 load_snapshots 的返回值)
+
+        列式数据只保存了最后一天的持仓和价格，其余日期的 holdings/market_prices 记为空
+        """
+        dates = columns.get('date', [])
+        rows = []
+        for i, date in enumerate(dates):
+            last = i == len(dates) - 1
+            rows.append((date, columns['cash'][i], columns['total_asset'][i],
+                         json.dumps(columns.get('last_holdings', {}) if last else {}),
+                         json.dumps(columns.get('last_prices', {}) if last else {})))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO snapshots (date, cash, total_asset, holdings, market_prices) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryStorage(TradingStorage):
+    """
+    内存存储: 不读写任何文件，用于历史回放和测试
+
+    状态全部保存在引擎内存中，这里只统计写入量，便于回放时分析持久化开销
+    """
+
+    def __init__(self):
+        self.events_written = 0
+        self.snapshots_written = 0
+
+    def load(self) -> Dict:
+        return {'signals': [], 'holdings': {}, 'cash': None}
+
+    def write_events(self, events: List[Dict]) -> None:
+        self.events_written += len(events)
+
+    def write_snapshot(self, snapshot: Dict) -> None:
+        self.snapshots_written += 1
+
+
+def create_storage(backend: str = None) -> TradingStorage:
+    """
+    按配置创建存储后端
+
+    Args:
+        backend: "json" / "sqlite" / "memory"，默认读取 DatabaseConfig.STORAGE_BACKEND
+    """
+    backend = backend or DatabaseConfig.STORAGE_BACKEND
+    if backend == "sqlite":
+        return SQLiteStorage(DatabaseConfig.DB_PATH)
+    if backend == "memory":
+        return MemoryStorage()
+    return JsonFileStorage()
+
+
+def migrate_json_to_sqlite(db_path: str = None) -> SQLiteStorage:
+    """把现有JSON文件中的虚拟交易状态和权益曲线导入SQLite数据库"""
+    source = JsonFileStorage()
+    state = source.load()
+    if state['cash'] is None:
+        state['cash'] = Config.INITIAL_CASH
+    snapshots = source.load_snapshots()
+    storage = SQLiteStorage(db_path)
+    storage.compact(state)
+    storage.import_snapshots(snapshots)
+    print(f"✓ 已导入 {len(state['signals'])} 条信号、{len(snapshots['date'])} 条资产快照到 {storage.db_path}")
+    return storage
@@ -1,10 +1,13 @@
 # 虚拟交易系统 - 记录并追踪策略的历史建议
-import json
-import os
 import datetime
+from contextlib import contextmanager
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import pandas as pd
+from config import Config
+from equity_curve import EquityCurve
+from lot_ledger import LotLedger
+from trading_storage import TradingStorage, JsonFileStorage, create_storage
 
 
 @dataclass
@@ -39,64 +42,286 @@ class PortfolioSnapshot:
 class VirtualTradingEngine:
     """虚拟交易引擎"""
     
-    def __init__(self, initial_cash: float = 100000):
+    def __init__(self, initial_cash: float = 100000, storage: TradingStorage = None,
+                 compact_every: int = 500, lot_method: str = None):
         """
         初始化虚拟账户
         
         Args:
             initial_cash: 初始现金
+            storage: 存储后端，默认按 DatabaseConfig.STORAGE_BACKEND 创建
+            compact_every: JSON存储时日志累计多少条事件后合并进快照文件
+            lot_method: 持仓成本核算方式 "fifo" / "average"，默认 Config.LOT_METHOD
         """
         self.initial_cash = initial_cash
         self.signals_history: List[TradeSignal] = []
-        self.portfolio_snapshots: List[PortfolioSnapshot] = []
+        
+        # 每日资产快照 (列式权益曲线) 及最近一次记录的价格
+        self.equity_curve = EquityCurve()
+        self.last_prices: Dict[str, float] = {}
         
         # 虚拟账户当前状态
         self.current_holdings: Dict[str, float] = {}  # {code: shares}
         self.current_cash = initial_cash
         
-        self.signals_file = "virtual_signals.json"
-        self.snapshots_file = "virtual_snapshots.json"
-        self.positions_file = "virtual_positions.json"
+        # 新信号和成交以事件形式交给存储层持久化
+        self.storage = storage or create_storage()
+        if isinstance(self.storage, JsonFileStorage):
+            self.storage.compact_every = compact_every
+        
+        # 信号索引: (date, fund_code, signal_type) -> signals_history中的下标列表
+        self._signal_index: Dict[Tuple[str, str, str], List[int]] = {}
+        self._pending: Dict[int, None] = {}   # 待执行信号下标 (有序集合)
+        self._indexed_count = 0               # 已建立索引的信号数
+        
+        # 增量统计: 随信号添加/成交更新，报告和评估无需回扫信号历史
+        self._state_version = 0               # 状态每变化一次加1 (用于指标缓存)
+        self._executed_count = 0
+        self._winning_count = 0
+        self._monthly_flows: Dict[str, Dict[str, float]] = {}   # {YYYY-MM: {buy, sell}}
+        self._listeners: List[Callable[[str, Dict], None]] = []  # 状态变化通知
+        
+        # 持仓批次账本: 成本、已实现/未实现盈亏、持有天数
+        self.lot_method = lot_method or Config.LOT_METHOD
+        self.ledger = LotLedger(self.lot_method)
+        
+        self._batch_events: Optional[List[Dict]] = None  # 批量模式下缓存的事件
         
         self.load_from_file()
     
     def load_from_file(self):
-        """从文件加载历史数据"""
-        if os.path.exists(self.signals_file):
-            try:
-                with open(self.signals_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.signals_history = [
-                        TradeSignal(**d) for d in data.get('signals', [])
-                    ]
-            except:
-                pass
-        
-        if os.path.exists(self.positions_file):
+        """从存储后端加载历史数据"""
+        state = self.storage.load()
+        self.signals_history = [TradeSignal(**d) for d in state['signals']]
+        self.current_holdings = state['holdings']
+        if state['cash'] is not None:
+            self.current_cash = state['cash']
+        self._rebuild_index()
+        
+        columns = self.storage.load_snapshots()
+        self.equity_curve = EquityCurve.from_columns(columns)
+        self.last_prices = columns.get('last_prices', {})
+    
+    def record_snapshot(self, current_prices: Dict[str, float],
+                        date: str = None) -> PortfolioSnapshot:
+        """
+        记录当日资产快照 (同一天多次记录时以最后一次为准)
+        
+        Args:
+            current_prices: 当前各基金价格，缺失的持仓沿用上次记录的价格，
+                            从未记录过价格时用持仓成本或最近一次成交价
+            date: 快照日期，默认今天
+            
+        Returns:
+            PortfolioSnapshot
+        
+        Raises:
+            ValueError: 日期早于最近一次快照 (不修改曲线也不写入存储)
+        """
+        date = date or datetime.date.today().strftime('%Y-%m-%d')
+        prices = {
+            code: current_prices.get(code) or self.last_prices.get(code) or self._fallback_price(code)
+            for code in self.current_holdings
+        }
+        snapshot = PortfolioSnapshot(
+            date=date,
+            holdings=dict(self.current_holdings),
+            cash=self.current_cash,
+            total_asset=self.get_portfolio_value(prices),
+            market_prices=prices,
+        )
+        self.equity_curve.append(date, snapshot.cash, snapshot.total_asset)
+        self.last_prices = prices
+        self._changed('snapshot', date=date)
+        self.storage.write_snapshot(asdict(snapshot))
+        if self.storage.needs_compaction():
+            self.compact()
+        return snapshot
+    
+    def _fallback_price(self, fund_code: str) -> float:
+        """没有任何市价时的估值价格: 持仓平均成本，其次最近一次成交价 (避免按0估值造成虚假回撤)"""
+        lots = self.ledger.get(fund_code)
+        if lots is not None and lots.avg_cost:
+            return lots.avg_cost
+        for signal in reversed(self.signals_history):
+            if signal.fund_code == fund_code and signal.execution_date and signal.execution_price:
+                return signal.execution_price
+        return 0
+    
+    @staticmethod
+    def _signal_key(signal: TradeSignal) -> Tuple[str, str, str]:
+        """信号的唯一标识"""
+        return (signal.date, signal.fund_code, signal.signal_type)
+    
+    def _rebuild_index(self):
+        """重建信号索引和待执行集合"""
+        self._signal_index = {}
+        self._pending = {}
+        self._indexed_count = 0
+        self._executed_count = 0
+        self._winning_count = 0
+        self._monthly_flows = {}
+        self.ledger = LotLedger(self.lot_method)
+        self._changed('reload')
+        self._sync_index()
+    
+    def _sync_index(self):
+        """
+        为尚未建立索引的信号补建索引
+        兼容直接向 signals_history 追加信号的用法；列表被整体替换时全量重建
+        """
+        if len(self.signals_history) < self._indexed_count:
+            self._rebuild_index()
+            return
+        executed = []
+        for i in range(self._indexed_count, len(self.signals_history)):
+            s = self.signals_history[i]
+            self._signal_index.setdefault(self._signal_key(s), []).append(i)
+            if s.execution_date:
+                self._count_execution(i, s)
+                executed.append((s.execution_date, i))
+            else:
+                self._pending[i] = None
+        # 账本按成交顺序记账 (成交日期相同时按信号顺序)
+        for _, i in sorted(executed):
+            self._book_execution(self.signals_history[i])
+        if self._indexed_count < len(self.signals_history):
+            added = len(self.signals_history) - self._indexed_count
+            self._indexed_count = len(self.signals_history)
+            self._changed('signals', count=added)
+    
+    def _count_execution(self, index: int, s: TradeSignal):
+        """把一笔成交计入增量统计"""
+        self._executed_count += 1
+        if (s.signal_type == "BUY" and s.execution_price and s.nav_price and
+                s.nav_price > s.execution_price):
+            self._winning_count += 1
+        
+        if s.execution_price:
+            flows = self._monthly_flows.setdefault(s.date[:7], {'buy': 0.0, 'sell': 0.0})
+            if s.signal_type == "BUY":
+                flows['buy'] += s.execution_amount or 0
+            elif s.signal_type == "SELL":
+                flows['sell'] += s.execution_amount or 0
+    
+    def _book_execution(self, s: TradeSignal):
+        """把一笔成交记入批次账本"""
+        if not s.execution_price or not s.execution_shares:
+            return
+        if s.signal_type == "BUY":
+            self.ledger.buy(s.fund_code, s.execution_shares, s.execution_price, s.execution_date)
+        elif s.signal_type == "SELL":
+            self.ledger.sell(s.fund_code, s.execution_shares, s.execution_price)
+    
+    def add_listener(self, callback: Callable[[str, Dict], None]) -> Callable[[str, Dict], None]:
+        """
+        注册状态变化回调 callback(kind, info)，派生缓存可据此失效
+        
+        kind: 'signals' 新增信号 / 'execution' 成交 / 'snapshot' 资产快照 / 'reload' 重新加载
+        
+        Returns:
+            callback (便于之后 remove_listener)
+        """
+        self._listeners.append(callback)
+        return callback
+    
+    def remove_listener(self, callback: Callable[[str, Dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _changed(self, kind: str, **info):
+        """状态变化: 版本号加1并通知监听者 (回调出错不影响交易)"""
+        self._state_version += 1
+        for callback in list(self._listeners):
             try:
-                with open(self.positions_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.current_holdings = data.get('holdings', {})
-                    self.current_cash = data.get('cash', self.initial_cash)
-            except:
-                pass
+                callback(kind, info)
+            except Exception as e:
+                print(f"⚠️ 状态变化回调出错: {e}")
+    
+    @property
+    def state_version(self) -> int:
+        """状态版本号: 信号、成交或快照变化时递增"""
+        self._sync_index()
+        return self._state_version
+    
+    @property
+    def monthly_flows(self) -> Dict[str, Dict[str, float]]:
+        """按信号月份汇总的成交金额 {YYYY-MM: {'buy': 买入额, 'sell': 卖出额}}"""
+        self._sync_index()
+        return self._monthly_flows
+    
+    def get_pending_signals(self) -> List[TradeSignal]:
+        """按生成顺序返回所有待执行信号"""
+        self._sync_index()
+        return [self.signals_history[i] for i in self._pending]
+    
+    def _append_event(self, event: Dict):
+        """持久化一条事件 (批量模式下先缓存，退出批量时统一写入)"""
+        if self._batch_events is not None:
+            self._batch_events.append(event)
+            return
+        self._write_events([event])
+    
+    def _write_events(self, events: List[Dict]):
+        """写入事件，需要时把完整状态合并成快照"""
+        self.storage.write_events(events)
+        if self.storage.needs_compaction():
+            self.compact()
+    
+    @contextmanager
+    def batch(self):
+        """
+        批量提交: 块内的信号和成交只改内存，退出时一次性持久化
+        (JSON存储为一行日志记录 + 一次fsync，SQLite为一个事务)
+        
+        用法:
+            with engine.batch():
+                for signal in signals:
+                    engine.add_signal(signal)
+        """
+        if self._batch_events is not None:
+            # 嵌套时并入外层批次
+            yield self
+            return
+        self._batch_events = []
+        try:
+            yield self
+        finally:
+            events, self._batch_events = self._batch_events, None
+            if events:
+                self._write_events(events)
+    
+    def _execution_event(self, index: int, s: TradeSignal) -> Dict:
+        """构造成交事件: 记录成交信息以及成交后的持仓和现金"""
+        return {
+            'type': 'execution',
+            'index': index,
+            'fund_code': s.fund_code,
+            'execution': {
+                'execution_date': s.execution_date,
+                'execution_price': s.execution_price,
+                'execution_amount': s.execution_amount,
+                'execution_shares': s.execution_shares,
+            },
+            'holding': self.current_holdings.get(s.fund_code),
+            'cash': self.current_cash,
+        }
+    
+    def _state(self) -> Dict:
+        """当前完整状态 (格式同 TradingStorage.load)"""
+        return {
+            'signals': [asdict(s) for s in self.signals_history],
+            'holdings': self.current_holdings,
+            'cash': self.current_cash,
+        }
     
     def save_to_file(self):
-        """保存数据到文件"""
-        # 保存信号历史
-        with open(self.signals_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'signals': [asdict(s) for s in self.signals_history],
-                'timestamp': datetime.datetime.now().isoformat()
-            }, f, ensure_ascii=False, indent=2)
-        
-        # 保存虚拟持仓
-        with open(self.positions_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'holdings': self.current_holdings,
-                'cash': self.current_cash,
-                'timestamp': datetime.datetime.now().isoformat()
-            }, f, ensure_ascii=False, indent=2)
+        """保存完整快照"""
+        self.storage.compact(self._state())
+    
+    def compact(self):
+        """将日志合并进快照"""
+        self.save_to_file()
     
     def add_signal(self, signal: TradeSignal) -> None:
         """
@@ -106,7 +331,8 @@ class VirtualTradingEngine:
             signal: TradeSignal对象
         """
         self.signals_history.append(signal)
-        self.save_to_file()
+        self._sync_index()
+        self._append_event({'type': 'signal', 'signal': asdict(signal)})
     
     def execute_signal(self, signal: TradeSignal, execution_date: str, 
                       execution_price: float) -> bool:
@@ -121,10 +347,11 @@ class VirtualTradingEngine:
         Returns:
             是否成交成功
         """
-        # 找到对应的信号
-        for s in self.signals_history:
-            if (s.date == signal.date and s.fund_code == signal.fund_code 
-                and s.signal_type == signal.signal_type):
+        # 通过索引找到对应的待执行信号
+        self._sync_index()
+        for i in self._signal_index.get(self._signal_key(signal), []):
+            if i in self._pending:
+                s = self.signals_history[i]
                 
                 if signal.signal_type == "BUY":
                     # 买入：使用建议金额
@@ -140,8 +367,12 @@ class VirtualTradingEngine:
                         s.execution_price = execution_price
                         s.execution_amount = spend
                         s.execution_shares = shares
+                        del self._pending[i]
+                        self._count_execution(i, s)
+                        self._book_execution(s)
+                        self._changed('execution', index=i, fund_code=s.fund_code)
                         
-                        self.save_to_file()
+                        self._append_event(self._execution_event(i, s))
                         return True
                 
                 elif signal.signal_type == "SELL":
@@ -157,8 +388,12 @@ class VirtualTradingEngine:
                         s.execution_price = execution_price
                         s.execution_amount = proceeds
                         s.execution_shares = shares
+                        del self._pending[i]
+                        self._count_execution(i, s)
+                        self._book_execution(s)
+                        self._changed('execution', index=i, fund_code=s.fund_code)
                         
-                        self.save_to_file()
+                        self._append_event(self._execution_event(i, s))
                         return True
         
         return False
@@ -186,18 +421,13 @@ class VirtualTradingEngine:
         Returns:
             包含收益率、胜率、最大回撤等指标的报告
         """
+        self._sync_index()
         total_value = self.get_portfolio_value(current_prices)
         total_return = (total_value - self.initial_cash) / self.initial_cash
         
-        # 计算已成交信号的胜率
-        executed_signals = [s for s in self.signals_history if s.execution_date]
-        
-        if executed_signals:
-            winning_trades = sum(1 for s in executed_signals 
-                               if s.signal_type == "BUY" and 
-                               s.execution_price and s.nav_price and
-                               s.nav_price > s.execution_price)
-            win_rate = winning_trades / len(executed_signals)
+        # 计算已成交信号的胜率 (计数在成交时增量维护)
+        if self._executed_count:
+            win_rate = self._winning_count / self._executed_count
         else:
             win_rate = 0.0
         
@@ -205,31 +435,32 @@ class VirtualTradingEngine:
             'total_return': total_return,
             'total_value': total_value,
             'win_rate': win_rate,
-            'executed_signals': len(executed_signals),
-            'pending_signals': len([s for s in self.signals_history 
-                                   if not s.execution_date]),
+            'executed_signals': self._executed_count,
+            'pending_signals': len(self._pending),
             'current_holdings': self.current_holdings,
             'current_cash': self.current_cash
         }
     
-    def get_unrealized_pnl(self, current_prices: Dict[str, float]) -> Dict[str, Dict]:
+    def get_unrealized_pnl(self, current_prices: Dict[str, float],
+                           as_of: str = None) -> Dict[str, Dict]:
         """
-        获取未实现盈亏
+        获取未实现盈亏 (成本取自批次账本，每只基金 O(1))
+        
+        Args:
+            current_prices: 当前各基金价格
+            as_of: 计算持有天数的日期，默认今天
         
         Returns:
-            {code: {shares, cost, current_price, pnl, pnl_percent}}
+            {code: {shares, cost_price, current_price, total_cost, current_value,
+                    pnl, pnl_percent, realized_pnl, holding_days, turnover}}
         """
+        self._sync_index()
+        as_of = as_of or datetime.date.today().strftime('%Y-%m-%d')
         result = {}
         
-        # 查找买入成本
-        buy_prices = {}
-        for s in self.signals_history:
-            if (s.signal_type == "BUY" and s.execution_date and 
-                s.execution_price and s.fund_code not in buy_prices):
-                buy_prices[s.fund_code] = s.execution_price
-        
         for code, shares in self.current_holdings.items():
-            cost_price = buy_prices.get(code, 0)
+            lots = self.ledger.get(code)
+            cost_price = lots.avg_cost if lots else 0
             current_price = current_prices.get(code, 0)
             cost = shares * cost_price if cost_price > 0 else 0
             current_value = shares * current_price
@@ -243,7 +474,10 @@ class VirtualTradingEngine:
                 'total_cost': cost,
                 'current_value': current_value,
                 'pnl': pnl,
-                'pnl_percent': pnl_percent
+                'pnl_percent': pnl_percent,
+                'realized_pnl': lots.realized_pnl if lots else 0.0,
+                'holding_days': lots.holding_days(as_of) if lots else 0.0,
+                'turnover': lots.turnover if lots else 0.0,
             }
         
         return result
@@ -0,0 +1,168 @@
+# 滚动样本外验证 (walk-forward) - 训练窗口上优化参数，紧随其后的测试窗口上评分
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from config import Config
+from rule_backtest import IndicatorCache
+from param_optimizer import ParameterOptimizer, _set_optimizer_state, _evaluate_candidate
+
+
+def make_windows(n_dates: int, train_days: int, test_days: int,
+                 step: int = None) -> List[Tuple[int, int, int, int]]:
+    """
+    生成滚动窗口
+
+    Args:
+        n_dates: 日期总数
+        train_days: 训练窗口长度
+        test_days: 测试窗口长度
+        step: 窗口每次前移的天数，默认等于 test_days (测试窗口首尾相接、互不重叠)
+
+    Returns:
+        [(train_start, train_end, test_start, test_end)]，均为左闭右开的日期下标
+    """
+    step = step or test_days
+    windows = []
+    start = 0
+    while start + train_days + test_days <= n_dates:
+        train_end = start + train_days
+        windows.append((start, train_end, train_end, train_end + test_days))
+        start += step
+    return windows
+
+
+# 工作进程中只读共享的指标缓存和日期 (每个进程只构建一次，所有窗口复用)
+_WF_FUNDS: Dict[str, IndicatorCache] = {}
+_WF_DATES: Dict[str, np.ndarray] = {}
+
+
+def _init_walk_forward_worker(nav_arrays: Dict[str, np.ndarray], date_arrays: Dict[str, np.ndarray]):
+    """工作进程初始化：指标在全区间上计算一次，各窗口按行区间切片使用"""
+    global _WF_FUNDS, _WF_DATES
+    _WF_FUNDS = {code: IndicatorCache(nav) for code, nav in nav_arrays.items()}
+    _WF_DATES = date_arrays
+
+
+def _row_ranges(start_date, end_date) -> Dict[str, tuple]:
+    """日期区间 [start_date, end_date) 在每只基金自身序列中的行区间"""
+    return {
+        code: (int(np.searchsorted(dates, start_date, 'left')),
+               int(np.searchsorted(dates, end_date, 'left')))
+        for code, dates in _WF_DATES.items()
+    }
+
+
+def _score(params: Dict, ranges: Dict[str, tuple], settings: Dict) -> float:
+    """在给定行区间上评估一组参数"""
+    _set_optimizer_state(_WF_FUNDS, {**settings, 'ranges': ranges})
+    return _evaluate_candidate(params)
+
+
+def _run_window(task: tuple) -> Dict:
+    """执行一个窗口: 训练区间上搜索参数，测试区间上评分"""
+    window_id, bounds, settings = task
+    train_start, train_end, test_start, test_end = bounds
+    train_ranges = _row_ranges(train_start, train_end)
+    test_ranges = _row_ranges(test_start, test_end)
+
+    optimizer = ParameterOptimizer(
+        caches=_WF_FUNDS, ranges=train_ranges, objective=settings['objective'],
+        invest_amount=settings['invest_amount'], max_workers=1,
+        seed=settings['seed'] + window_id)
+    result = optimizer.optimize(settings['method'], **settings['search_kwargs'])
+    best = result['best_params']
+
+    return {
+        'window': window_id,
+        'train_start': train_start, 'train_end': train_end,
+        'test_start': test_start, 'test_end': test_end,
+        'train_score': result['best_score'],
+        'test_score': _score(best, test_ranges, settings),
+        # 基准: 默认参数在同一测试区间上的得分
+        'baseline_test_score': _score(Config.DEFAULT_STRATEGY_PARAMS, test_ranges, settings),
+        'evaluations': result['evaluations'],
+        **{f'param_{k}': v for k, v in best.items()},
+    }
+
+
+def walk_forward(nav_data: Dict[str, pd.DataFrame], train_days: int = 500, test_days: int = 125,
+                 step: int = None, method: str = 'random', objective: str = 'sharpe',
+                 search_kwargs: Dict = None, invest_amount: float = 1000.0,
+                 max_workers: int = None, seed: int = 0) -> pd.DataFrame:
+    """
+    滚动样本外验证
+
+    所有基金的日期合并成统一日期轴后切分窗口；每个窗口独立搜索参数，
+    窗口之间并行执行，每个工作进程的指标只在全区间上计算一次
+
+    Args:
+        nav_data: 历史净值 {code: DataFrame(date, nav)}
+        train_days, test_days, step: 窗口设置 (交易日)，见 make_windows
+        method: 参数搜索方法 'random' / 'genetic'
+        objective: 优化目标 'sharpe' / 'total_return' / 'calmar'
+        search_kwargs: 传给搜索方法的参数
+        invest_amount: 每次买入金额
+        max_workers: 并行窗口数，默认CPU核数；为1时在当前进程内顺序执行
+        seed: 随机种子 (第i个窗口使用 seed+i)
+
+    Returns:
+        每个窗口一行: 区间、训练得分、样本外得分、默认参数的样本外得分、最优参数
+    """
+    nav_arrays, date_arrays = {}, {}
+    for code, df in nav_data.items():
+        if df is None or df.empty:
+            continue
+        df = df.dropna(subset=['nav']).sort_values('date')
+        nav_arrays[code] = df['nav'].to_numpy(dtype=float)
+        date_arrays[code] = pd.to_datetime(df['date']).to_numpy()
+    if not nav_arrays:
+        return pd.DataFrame()
+
+    all_dates = np.unique(np.concatenate(list(date_arrays.values())))
+    # 右端点取下一个日期 (最后一个窗口取一个足够大的日期)，保证区间左闭右开
+    edges = np.append(all_dates, all_dates[-1] + np.timedelta64(1, 'D'))
+    windows = make_windows(len(all_dates), train_days, test_days, step)
+    if not windows:
+        print(f"⚠️ 日期数 {len(all_dates)} 不足一个训练+测试窗口")
+        return pd.DataFrame()
+
+    settings = {
+        'method': method, 'objective': objective, 'invest_amount': invest_amount,
+        'search_kwargs': dict(search_kwargs or {}), 'seed': seed,
+    }
+    tasks = [
+        (i, tuple(edges[b] for b in bounds), settings)
+        for i, bounds in enumerate(windows)
+    ]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers == 1:
+        _init_walk_forward_worker(nav_arrays, date_arrays)
+        rows = [_run_window(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_walk_forward_worker,
+                                 initargs=(nav_arrays, date_arrays)) as pool:
+            rows = list(pool.map(_run_window, tasks))
+
+    result = pd.DataFrame(rows)
+    for col in ('train_start', 'train_end', 'test_start', 'test_end'):
+        result[col] = pd.to_datetime(result[col])
+    print(f"✓ walk-forward {len(result)} 个窗口: "
+          f"训练均值 {result['train_score'].mean():.3f}, "
+          f"样本外均值 {result['test_score'].mean():.3f}, "
+          f"默认参数样本外均值 {result['baseline_test_score'].mean():.3f}")
+    return result
+
+
+if __name__ == "__main__":
+    from data_fetcher import fetch_fund_data
+    import datetime
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=365 * 5)
+    codes = ['110022', '161725', '005827']
+    nav_data = {c: fetch_fund_data(c, start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+                for c in codes}
+    print(walk_forward(nav_data, search_kwargs={'n_iter': 100}))